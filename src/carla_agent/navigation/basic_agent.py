@@ -9,14 +9,18 @@ waypoints and avoiding other vehicles. The agent also responds to traffic lights
 It can also make use of the global route planner to follow a specifed route
 """
 
+import math
+import numpy as np
 import carla
-from shapely.geometry import Polygon
+from shapely.geometry import MultiPoint, Polygon
 
 from agents.navigation.local_planner import LocalPlanner, RoadOption
-from agents.navigation.global_route_planner import GlobalRoutePlanner
+from agents.navigation.global_route_planner import GlobalRoutePlanner, get_global_route_planner
 from agents.tools.misc import (get_speed, is_within_distance,
                                get_trafficlight_trigger_location,
                                compute_distance)
+from agents.tools.waypoint_cache import WaypointCache
+from agents.tools.world_state_cache import WorldStateCache
 
 
 class BasicAgent(object):
@@ -94,14 +98,23 @@ class BasicAgent(object):
                 self._global_planner = grp_inst
             else:
                 print("Warning: Ignoring the given map as it is not a 'carla.Map'")
-                self._global_planner = GlobalRoutePlanner(self._map, self._sampling_resolution)
+                self._global_planner = get_global_route_planner(self._map, self._sampling_resolution)
         else:
-            self._global_planner = GlobalRoutePlanner(self._map, self._sampling_resolution)
+            self._global_planner = get_global_route_planner(self._map, self._sampling_resolution)
+
+        # State of the world actors, shared with the rest of agents
+        self._world_state = WorldStateCache.get(self._world)
+        self._waypoint_cache = WaypointCache.get(self._map)
 
         # Get the static elements of the scene
-        self._lights_list = self._world.get_actors().filter("*traffic_light*")
+        self._lights_list = self._world_state.get_actors("*traffic_light*")
         self._lights_map = {}  # Dictionary mapping a traffic light to a wp corrspoing to its trigger volume location
 
+        # Caches of the obstacle detection
+        self._actor_arrays = None  # Poses of the last checked actors, with the frame they belong to
+        self._actor_sizes = {}  # Dictionary mapping an actor id to its bounding box length and radius
+        self._route_polygon = None  # Last route polygon, with the ego pose and plan used to build it
+
     def add_emergency_stop(self, control):
         """
         Overwrites the throttle a brake values of a control to perform an emergency stop.
@@ -191,9 +204,9 @@ class BasicAgent(object):
         hazard_detected = False
 
         # Retrieve all relevant actors
-        vehicle_list = self._world.get_actors().filter("*vehicle*")
+        vehicle_list = self._world_state.get_actors("*vehicle*")
 
-        vehicle_speed = get_speed(self._vehicle) / 3.6
+        vehicle_speed = get_speed(self._vehicle, self._world_state) / 3.6
 
         # Check for possible vehicle obstacles
         max_vehicle_distance = self._base_vehicle_threshold + self._speed_ratio * vehicle_speed
@@ -268,26 +281,26 @@ class BasicAgent(object):
             return (False, None)
 
         if not lights_list:
-            lights_list = self._world.get_actors().filter("*traffic_light*")
+            lights_list = self._world_state.get_actors("*traffic_light*")
 
         if not max_distance:
             max_distance = self._base_tlight_threshold
 
         if self._last_traffic_light:
-            if self._last_traffic_light.state != carla.TrafficLightState.Red:
+            if self._world_state.get_traffic_light_state(self._last_traffic_light) != carla.TrafficLightState.Red:
                 self._last_traffic_light = None
             else:
                 return (True, self._last_traffic_light)
 
         ego_vehicle_location = self._vehicle.get_location()
-        ego_vehicle_waypoint = self._map.get_waypoint(ego_vehicle_location)
+        ego_vehicle_waypoint = self._waypoint_cache.get_waypoint(ego_vehicle_location)
 
         for traffic_light in lights_list:
             if traffic_light.id in self._lights_map:
                 trigger_wp = self._lights_map[traffic_light.id]
             else:
                 trigger_location = get_trafficlight_trigger_location(traffic_light)
-                trigger_wp = self._map.get_waypoint(trigger_location)
+                trigger_wp = self._waypoint_cache.get_waypoint(trigger_location)
                 self._lights_map[traffic_light.id] = trigger_wp
 
             if trigger_wp.transform.location.distance(ego_vehicle_location) > max_distance:
@@ -303,7 +316,7 @@ class BasicAgent(object):
             if dot_ve_wp < 0:
                 continue
 
-            if traffic_light.state != carla.TrafficLightState.Red:
+            if self._world_state.get_traffic_light_state(traffic_light) != carla.TrafficLightState.Red:
                 continue
 
             if is_within_distance(trigger_wp.transform, self._vehicle.get_transform(), max_distance, [0, 90]):
@@ -321,36 +334,11 @@ class BasicAgent(object):
             :param max_distance: max freespace to check for obstacles.
                 If None, the base threshold value is used
         """
-        def get_route_polygon():
-            route_bb = []
-            extent_y = self._vehicle.bounding_box.extent.y
-            r_ext = extent_y + self._offset
-            l_ext = -extent_y + self._offset
-            r_vec = ego_transform.get_right_vector()
-            p1 = ego_location + carla.Location(r_ext * r_vec.x, r_ext * r_vec.y)
-            p2 = ego_location + carla.Location(l_ext * r_vec.x, l_ext * r_vec.y)
-            route_bb.extend([[p1.x, p1.y, p1.z], [p2.x, p2.y, p2.z]])
-
-            for wp, _ in self._local_planner.get_plan():
-                if ego_location.distance(wp.transform.location) > max_distance:
-                    break
-
-                r_vec = wp.transform.get_right_vector()
-                p1 = wp.transform.location + carla.Location(r_ext * r_vec.x, r_ext * r_vec.y)
-                p2 = wp.transform.location + carla.Location(l_ext * r_vec.x, l_ext * r_vec.y)
-                route_bb.extend([[p1.x, p1.y, p1.z], [p2.x, p2.y, p2.z]])
-
-            # Two points don't create a polygon, nothing to check
-            if len(route_bb) < 3:
-                return None
-
-            return Polygon(route_bb)
-
         if self._ignore_vehicles:
             return (False, None, -1)
 
         if not vehicle_list:
-            vehicle_list = self._world.get_actors().filter("*vehicle*")
+            vehicle_list = self._world_state.get_actors("*vehicle*")
 
         if not max_distance:
             max_distance = self._base_vehicle_threshold
@@ -372,11 +360,16 @@ class BasicAgent(object):
         use_bbs = self._use_bbs_detection or opposite_invasion or ego_wpt.is_junction
 
         # Get the route bounding box
-        route_polygon = get_route_polygon()
+        route = self._get_route_polygon(ego_transform, ego_location, max_distance)
+        route_polygon = route[0] if route else None
 
-        for target_vehicle in vehicle_list:
-            if target_vehicle.id == self._vehicle.id:
-                continue
+        # Discard most of the vehicles at once, only the remaining ones are checked one by one
+        vehicle_list = list(vehicle_list)
+        candidates = self._get_obstacle_candidates(
+            vehicle_list, ego_location, ego_front_transform, max_distance, [low_angle_th, up_angle_th], route)
+
+        for index in candidates:
+            target_vehicle = vehicle_list[index]
 
             target_transform = target_vehicle.get_transform()
             if target_transform.location.distance(ego_location) > max_distance:
@@ -418,6 +411,162 @@ class BasicAgent(object):
 
         return (False, None, -1)
 
+    def _get_route_polygon(self, ego_transform, ego_location, max_distance):
+        """
+        Returns the polygon covering the plan up to max_distance, together with the normals of
+        its convex hull edges and the projection intervals of the hull on them.
+        Returns None if the plan is too short. The result is kept until the ego or the plan change.
+
+            :param ego_transform: transform of the ego
+            :param ego_location: location of the ego
+            :param max_distance: max distance of the plan to be covered
+        """
+        plan = self._local_planner.get_plan()
+        key = (ego_location.x, ego_location.y, ego_location.z, ego_transform.rotation.yaw,
+               self._offset, max_distance, len(plan), plan[0][0].id if plan else None)
+        if self._route_polygon is not None and self._route_polygon[0] == key:
+            return self._route_polygon[1]
+
+        route_bb = []
+        extent_y = self._vehicle.bounding_box.extent.y
+        r_ext = extent_y + self._offset
+        l_ext = -extent_y + self._offset
+        r_vec = ego_transform.get_right_vector()
+        p1 = ego_location + carla.Location(r_ext * r_vec.x, r_ext * r_vec.y)
+        p2 = ego_location + carla.Location(l_ext * r_vec.x, l_ext * r_vec.y)
+        route_bb.extend([[p1.x, p1.y, p1.z], [p2.x, p2.y, p2.z]])
+
+        for wp, _ in plan:
+            if ego_location.distance(wp.transform.location) > max_distance:
+                break
+
+            r_vec = wp.transform.get_right_vector()
+            p1 = wp.transform.location + carla.Location(r_ext * r_vec.x, r_ext * r_vec.y)
+            p2 = wp.transform.location + carla.Location(l_ext * r_vec.x, l_ext * r_vec.y)
+            route_bb.extend([[p1.x, p1.y, p1.z], [p2.x, p2.y, p2.z]])
+
+        # Two points don't create a polygon, nothing to check
+        route = None
+        if len(route_bb) >= 3:
+            route_polygon = Polygon(route_bb)
+
+            hull = MultiPoint([(x, y) for x, y, _ in route_bb]).convex_hull
+            if hull.geom_type == 'Polygon':
+                hull_points = np.array(hull.exterior.coords)
+                edges = np.diff(hull_points, axis=0)
+                normals = np.stack([-edges[:, 1], edges[:, 0]], axis=1)
+                normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-9)[:, np.newaxis]
+                projections = hull_points.dot(normals.T)
+                route = (route_polygon, normals, projections.min(axis=0), projections.max(axis=0))
+            else:
+                # Degenerated hull, every vehicle close enough is checked
+                route = (route_polygon, None, None, None)
+
+        self._route_polygon = (key, route)
+        return route
+
+    def _get_actor_arrays(self, actor_list):
+        """
+        Returns the ids, locations, forward vectors, bounding box half lengths and bounding radius
+        of a list of actors as arrays. The poses are read from the world state cache if it knows
+        all the actors, and queried once per frame and actor list otherwise.
+
+            :param actor_list (list of carla.Actor): actors to be checked
+        """
+        ids = tuple(actor.id for actor in actor_list)
+        frame = self._world_state.update().frame
+        if self._actor_arrays is not None and self._actor_arrays[0] == (frame, ids):
+            return self._actor_arrays[1]
+
+        # Forget the sizes of the destroyed actors, once there are more sizes than actors alive
+        if len(self._actor_sizes) > len(self._world_state):
+            alive_ids = set(self._world_state.ids.tolist())
+            self._actor_sizes = {
+                actor_id: size for actor_id, size in self._actor_sizes.items() if actor_id in alive_ids}
+
+        for actor in actor_list:
+            if actor.id not in self._actor_sizes:
+                bounding_box = actor.bounding_box
+                extent = bounding_box.extent
+                offset = bounding_box.location
+                self._actor_sizes[actor.id] = (
+                    extent.x,
+                    math.sqrt(extent.x ** 2 + extent.y ** 2 + extent.z ** 2) +
+                    math.sqrt(offset.x ** 2 + offset.y ** 2 + offset.z ** 2))
+        sizes = np.array([self._actor_sizes[actor_id] for actor_id in ids]).reshape(-1, 2)
+
+        try:
+            indexes = self._world_state.get_indexes(actor_list)
+        except KeyError:
+            indexes = None
+
+        if indexes is not None:
+            arrays = (np.array(ids, dtype=int), self._world_state.locations[indexes],
+                      self._world_state.forward_vectors[indexes, :2], sizes[:, 0], sizes[:, 1])
+            self._actor_arrays = ((frame, ids), arrays)
+            return arrays
+
+        locations = np.zeros((len(ids), 3))
+        forwards = np.zeros((len(ids), 2))
+        for i, actor in enumerate(actor_list):
+            transform = actor.get_transform()
+            locations[i] = (transform.location.x, transform.location.y, transform.location.z)
+
+            yaw = math.radians(transform.rotation.yaw)
+            pitch = math.radians(transform.rotation.pitch)
+            forwards[i] = (math.cos(pitch) * math.cos(yaw), math.cos(pitch) * math.sin(yaw))
+
+        arrays = (np.array(ids, dtype=int), locations, forwards, sizes[:, 0], sizes[:, 1])
+        self._actor_arrays = ((frame, ids), arrays)
+        return arrays
+
+    def _get_obstacle_candidates(self, actor_list, ego_location, ego_front_transform, max_distance,
+                                 angle_interval, route, tolerance=0.01):
+        """
+        Returns the indexes of the actors that might be obstacles, discarding the ones that are too far,
+        or that are neither in front of the ego nor close to the route. Vehicles are only discarded
+        if they are more than a tolerance (in meters and degrees) away of being detected.
+
+            :param actor_list (list of carla.Actor): actors to be checked
+            :param ego_location: location of the ego
+            :param ego_front_transform: transform of the front of the ego
+            :param max_distance: max freespace to check for obstacles
+            :param angle_interval: only actors between [min, max] angles are in front of the ego
+            :param route: route polygon and its convex hull, as given by _get_route_polygon
+        """
+        ids, locations, forwards, lengths, radius = self._get_actor_arrays(actor_list)
+        if len(ids) == 0:
+            return []
+
+        ego = np.array([ego_location.x, ego_location.y, ego_location.z])
+        candidates = ids != self._vehicle.id
+        candidates &= np.linalg.norm(locations - ego, axis=1) <= max_distance + tolerance
+
+        # Simplified approach, the rear of the vehicle has to be in front of the ego
+        front = ego_front_transform.location
+        fwd = ego_front_transform.get_forward_vector()
+        target_vectors = locations[:, :2] - lengths[:, np.newaxis] * forwards - (front.x, front.y)
+        norms = np.linalg.norm(target_vectors, axis=1)
+        cosines = target_vectors.dot((fwd.x, fwd.y)) / np.maximum(norms, 1e-9)
+        angles = np.degrees(np.arccos(np.clip(cosines, -1., 1.)))
+        in_front = (norms <= max_distance + tolerance) & (angles > angle_interval[0] - tolerance) & \
+            (angles < angle_interval[1] + tolerance)
+        in_front |= norms < 0.001 + tolerance
+
+        # Bounding box approach, the bounding sphere of the vehicle has to overlap the hull of the route
+        close_to_route = np.zeros_like(candidates)
+        if route is not None:
+            _, normals, hull_min, hull_max = route
+            if normals is None:
+                close_to_route[:] = True
+            else:
+                projections = locations[:, :2].dot(normals.T)
+                separated = (projections - radius[:, np.newaxis] > hull_max + tolerance) | \
+                    (projections + radius[:, np.newaxis] < hull_min - tolerance)
+                close_to_route = ~separated.any(axis=1)
+
+        return np.flatnonzero(candidates & (in_front | close_to_route)).tolist()
+
     def _generate_lane_change_path(self, waypoint, direction='left', distance_same_lane=10,
                                 distance_other_lane=25, lane_change_distance=25,
                                 check=True, lane_changes=1, step_distance=2):
@@ -66,7 +66,7 @@ class BehaviorAgent(BasicAgent):
         This method updates the information regarding the ego
         vehicle based on the surrounding world.
         """
-        self._speed = get_speed(self._vehicle)
+        self._speed = get_speed(self._vehicle, self._world_state)
         self._speed_limit = self._vehicle.get_speed_limit()
         self._local_planner.set_speed(self._speed_limit)
         self._direction = self._local_planner.target_road_option
@@ -84,8 +84,7 @@ class BehaviorAgent(BasicAgent):
         """
         This method is in charge of behaviors for red lights.
         """
-        actor_list = self._world.get_actors()
-        lights_list = actor_list.filter("*traffic_light*")
+        lights_list = self._world_state.get_actors("*traffic_light*")
         affected, _ = self._affected_by_traffic_light(lights_list)
 
         return affected
@@ -107,7 +106,7 @@ class BehaviorAgent(BasicAgent):
 
         behind_vehicle_state, behind_vehicle, _ = self._vehicle_obstacle_detected(vehicle_list, max(
             self._behavior.min_proximity_threshold, self._speed_limit / 2), up_angle_th=180, low_angle_th=160)
-        if behind_vehicle_state and self._speed < get_speed(behind_vehicle):
+        if behind_vehicle_state and self._speed < get_speed(behind_vehicle, self._world_state):
             if (right_turn == carla.LaneChange.Right or right_turn ==
                     carla.LaneChange.Both) and waypoint.lane_id * right_wpt.lane_id > 0 and right_wpt.lane_type == carla.LaneType.Driving:
                 new_vehicle_state, _, _ = self._vehicle_obstacle_detected(vehicle_list, max(
@@ -140,9 +139,8 @@ class BehaviorAgent(BasicAgent):
             :return distance: distance to nearby vehicle
         """
 
-        vehicle_list = self._world.get_actors().filter("*vehicle*")
-        def dist(v): return v.get_location().distance(waypoint.transform.location)
-        vehicle_list = [v for v in vehicle_list if dist(v) < 45 and v.id != self._vehicle.id]
+        vehicle_list = self._world_state.get_actors_in_radius(waypoint.transform.location, 45, "*vehicle*")
+        vehicle_list = [v for v in vehicle_list if v.id != self._vehicle.id]
 
         if self._direction == RoadOption.CHANGELANELEFT:
             vehicle_state, vehicle, distance = self._vehicle_obstacle_detected(
@@ -177,9 +175,7 @@ class BehaviorAgent(BasicAgent):
             :return distance: distance to nearby walker
         """
 
-        walker_list = self._world.get_actors().filter("*walker.pedestrian*")
-        def dist(w): return w.get_location().distance(waypoint.transform.location)
-        walker_list = [w for w in walker_list if dist(w) < 10]
+        walker_list = self._world_state.get_actors_in_radius(waypoint.transform.location, 10, "*walker.pedestrian*")
 
         if self._direction == RoadOption.CHANGELANELEFT:
             walker_state, walker, distance = self._vehicle_obstacle_detected(walker_list, max(
@@ -204,7 +200,7 @@ class BehaviorAgent(BasicAgent):
             :return control: carla.VehicleControl
         """
 
-        vehicle_speed = get_speed(vehicle)
+        vehicle_speed = get_speed(vehicle, self._world_state)
         delta_v = max(1, (self._speed - vehicle_speed) / 3.6)
         ttc = distance / delta_v if delta_v != 0 else distance / np.nextafter(0., 1.)
 
@@ -85,9 +85,8 @@ class ConstantVelocityAgent(BasicAgent):
         hazard_detected = False
 
         # Retrieve all relevant actors
-        actor_list = self._world.get_actors()
-        vehicle_list = actor_list.filter("*vehicle*")
-        lights_list = actor_list.filter("*traffic_light*")
+        vehicle_list = self._world_state.get_actors("*vehicle*")
+        lights_list = self._world_state.get_actors("*traffic_light*")
 
         vehicle_speed = self._vehicle.get_velocity().length()
 
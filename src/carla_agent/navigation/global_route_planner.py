@@ -8,7 +8,12 @@
 This module provides GlobalRoutePlanner implementation.
 """
 
+import hashlib
 import math
+import os
+import pickle
+import threading
+from collections import OrderedDict
 import numpy as np
 import networkx as nx
 
@@ -16,12 +21,150 @@ import carla
 from agents.navigation.local_planner import RoadOption
 from agents.tools.misc import vector
 
+# Version of the cached planner data, to be increased whenever the graph building changes
+CACHE_VERSION = 1
+
+# Keys of the topology segments and graph edges holding waypoints
+SEGMENT_WAYPOINT_KEYS = ('entry', 'exit', 'path')
+EDGE_WAYPOINT_KEYS = ('entry_waypoint', 'exit_waypoint', 'change_waypoint', 'path')
+
+
+def waypoint_to_record(waypoint):
+    """
+    Returns the compact (road_id, section_id, lane_id, s, x, y, z) record of a waypoint
+    """
+    location = waypoint.transform.location
+    return (waypoint.road_id, waypoint.section_id, waypoint.lane_id, waypoint.s,
+            location.x, location.y, location.z)
+
+
+def record_to_waypoint(wmap, record):
+    """
+    Gets back the waypoint of a record, falling back to its location if
+    the OpenDRIVE coordinates don't give the same road section
+    """
+    road_id, section_id, lane_id, s, x, y, z = record
+    waypoint = wmap.get_waypoint_xodr(road_id, lane_id, s)
+    if waypoint is None or waypoint.section_id != section_id:
+        waypoint = wmap.get_waypoint(carla.Location(x, y, z), lane_type=carla.LaneType.Any)
+    return waypoint
+
+
+class LazyWaypointDict(dict):
+    """
+    Dictionary whose waypoint values are stored as records, and only turned
+    into carla.Waypoints the first time they are accessed
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(LazyWaypointDict, self).__init__(*args, **kwargs)
+        self._wmap = None
+        self._pending = set()
+
+    def bind(self, wmap, waypoint_keys):
+        """
+        Sets the map used to materialize the records stored at waypoint_keys
+        """
+        self._wmap = wmap
+        self._pending = set(key for key in waypoint_keys if dict.get(self, key) is not None)
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            self._pending.discard(key)
+            value = dict.__getitem__(self, key)
+            if key == 'path':
+                value = [record_to_waypoint(self._wmap, record) for record in value]
+            else:
+                value = record_to_waypoint(self._wmap, value)
+            dict.__setitem__(self, key, value)
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        self._pending.discard(key)
+        dict.__setitem__(self, key, value)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+
+class LazyWaypointGraph(nx.DiGraph):
+    """
+    networkx.DiGraph whose edge attributes are LazyWaypointDicts
+    """
+    edge_attr_dict_factory = LazyWaypointDict
+
+
+_planners = {}
+_planners_lock = threading.Lock()
+_map_hashes = OrderedDict()  # id of the map - map and the hash of its OpenDRIVE content
+
+
+def get_map_hash(wmap):
+    """
+    Returns the hash of the OpenDRIVE content of a map, computed once per carla.Map object
+
+    :param wmap: carla.Map of the world
+    """
+    with _planners_lock:
+        entry = _map_hashes.get(id(wmap), None)
+        if entry is not None and entry[0] is wmap:
+            return entry[1]
+
+    map_hash = hashlib.sha1(wmap.to_opendrive().encode('utf-8')).hexdigest()
+    with _planners_lock:
+        _map_hashes[id(wmap)] = (wmap, map_hash)
+        while len(_map_hashes) > 8:
+            _map_hashes.popitem(last=False)
+    return map_hash
+
+
+def get_global_route_planner(wmap, sampling_resolution, route_cache_size=1024):
+    """
+    Returns the planner shared by the whole process for a map and sampling resolution,
+    building it the first time. Planners are identified by the OpenDRIVE content of the map,
+    as maps generated from different OpenDRIVE files share the same name.
+
+    :param wmap: carla.Map of the world
+    :param sampling_resolution: distance between the waypoints of the graph edges
+    :param route_cache_size: number of trace_route results kept by a newly built planner
+    """
+    key = (get_map_hash(wmap), float(sampling_resolution))
+    with _planners_lock:
+        planner = _planners.get(key, None)
+        if planner is None:
+            planner = GlobalRoutePlanner(wmap, sampling_resolution, route_cache_size=route_cache_size)
+            _planners[key] = planner
+    return planner
+
+
+def clear_global_route_planners():
+    """
+    Forgets all the shared planners
+    """
+    with _planners_lock:
+        _planners.clear()
+        _map_hashes.clear()
+
+
 class GlobalRoutePlanner(object):
     """
     This class provides a very high level route plan.
     """
 
-    def __init__(self, wmap, sampling_resolution):
+    # Size of the grid the route end points are snapped to when looking for a cached route
+    ROUTE_CACHE_RESOLUTION = 0.01
+
+    def __init__(self, wmap, sampling_resolution, cache_dir=None, route_cache_size=0):
+        """
+        :param wmap: carla.Map of the world
+        :param sampling_resolution: distance between the waypoints of the graph edges
+        :param cache_dir: directory where the built topology and graph are stored, keyed by the
+            OpenDRIVE content and the sampling resolution. Defaults to the CARLA_GRP_CACHE_DIR
+            environment variable, caching is disabled if neither is set.
+        :param route_cache_size: number of trace_route results kept in a LRU cache, 0 to disable it
+        """
         self._sampling_resolution = sampling_resolution
         self._wmap = wmap
         self._topology = None
@@ -32,17 +175,69 @@ class GlobalRoutePlanner(object):
         self._intersection_end_node = -1
         self._previous_decision = RoadOption.VOID
 
+        self._route_cache_size = route_cache_size
+        self._route_cache = OrderedDict()
+        self._route_lock = threading.RLock()
+        self.route_cache_hits = 0
+        self.route_cache_misses = 0
+
+        if cache_dir is None:
+            cache_dir = os.environ.get('CARLA_GRP_CACHE_DIR', None)
+        cache_path = self._get_cache_path(cache_dir) if cache_dir else None
+        if cache_path is not None and self._load_cache(cache_path):
+            return
+
         # Build the graph
         self._build_topology()
         self._build_graph()
         self._find_loose_ends()
         self._lane_change_link()
 
+        if cache_path is not None:
+            self._save_cache(cache_path)
+
     def trace_route(self, origin, destination):
         """
         This method returns list of (carla.Waypoint, RoadOption)
         from origin to destination
         """
+        with self._route_lock:
+            if self._route_cache_size <= 0:
+                return self._trace_route(origin, destination)
+
+            key = self._get_route_key(origin, destination)
+            route_trace = self._route_cache.get(key, None)
+            if route_trace is not None:
+                self.route_cache_hits += 1
+                self._route_cache.move_to_end(key)
+                return list(route_trace)
+
+            self.route_cache_misses += 1
+            route_trace = self._trace_route(origin, destination)
+            self._route_cache[key] = route_trace
+            while len(self._route_cache) > self._route_cache_size:
+                self._route_cache.popitem(last=False)
+            return list(route_trace)
+
+    def _get_route_key(self, origin, destination):
+        """
+        Returns the route cache key, made of the graph edges of origin and destination
+        and their locations snapped to a grid of ROUTE_CACHE_RESOLUTION
+        """
+        def quantize(location):
+            return tuple(int(round(value / self.ROUTE_CACHE_RESOLUTION))
+                         for value in (location.x, location.y, location.z))
+
+        return (self._localize(origin), self._localize(destination), quantize(origin), quantize(destination))
+
+    def _trace_route(self, origin, destination):
+        """
+        Computes the route of trace_route. The turn decisions don't depend
+        on the routes previously traced by this planner.
+        """
+        self._intersection_end_node = -1
+        self._previous_decision = RoadOption.VOID
+
         route_trace = []
         route = self._path_search(origin, destination)
         current_waypoint = self._wmap.get_waypoint(origin)
@@ -81,6 +276,79 @@ class GlobalRoutePlanner(object):
 
         return route_trace
 
+    def _get_cache_path(self, cache_dir):
+        """
+        Returns the cache file of the current map and sampling resolution
+        """
+        map_hash = get_map_hash(self._wmap)
+        map_name = os.path.basename(self._wmap.name)
+        file_name = '{}_{}_{}.grp'.format(map_name, map_hash, float(self._sampling_resolution))
+        return os.path.join(cache_dir, file_name)
+
+    def _save_cache(self, cache_path):
+        """
+        Stores the topology, graph and maps of the planner, with the waypoints as records
+        """
+        def to_records(attributes, waypoint_keys):
+            attributes = dict(attributes)
+            for key in waypoint_keys:
+                value = attributes.get(key, None)
+                if value is None:
+                    continue
+                if key == 'path':
+                    attributes[key] = [waypoint_to_record(waypoint) for waypoint in value]
+                else:
+                    attributes[key] = waypoint_to_record(value)
+            return attributes
+
+        cached_data = {
+            'version': CACHE_VERSION,
+            'topology': [to_records(segment, SEGMENT_WAYPOINT_KEYS) for segment in self._topology],
+            'nodes': list(self._graph.nodes(data='vertex')),
+            'edges': [(n1, n2, to_records(data, EDGE_WAYPOINT_KEYS))
+                      for n1, n2, data in self._graph.edges(data=True)],
+            'id_map': self._id_map,
+            'road_id_to_edge': self._road_id_to_edge,
+        }
+
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(cached_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+
+    def _load_cache(self, cache_path):
+        """
+        Restores the topology, graph and maps of the planner. The waypoints
+        are only materialized when they are first used.
+        Returns whether a valid cache was found.
+        """
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_data = pickle.load(f)
+        except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+            return False
+        if cached_data.get('version', None) != CACHE_VERSION:
+            return False
+
+        self._topology = []
+        for records in cached_data['topology']:
+            segment = LazyWaypointDict(records)
+            segment.bind(self._wmap, SEGMENT_WAYPOINT_KEYS)
+            self._topology.append(segment)
+
+        # Nodes and edges are added in the original order, keeping the same path search results
+        self._graph = LazyWaypointGraph()
+        for node, vertex in cached_data['nodes']:
+            self._graph.add_node(node, vertex=vertex)
+        for n1, n2, records in cached_data['edges']:
+            self._graph.add_edge(n1, n2, **records)
+            self._graph.edges[n1, n2].bind(self._wmap, EDGE_WAYPOINT_KEYS)
+
+        self._id_map = cached_data['id_map']
+        self._road_id_to_edge = cached_data['road_id_to_edge']
+        return True
+
     def _build_topology(self):
         """
         This function retrieves topology from the server as a list of
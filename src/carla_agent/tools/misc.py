@@ -28,13 +28,17 @@ def draw_waypoints(world, waypoints, z=0.5):
         world.debug.draw_arrow(begin, end, arrow_size=0.3, life_time=1.0)
 
 
-def get_speed(vehicle):
+def get_speed(vehicle, world_state=None):
     """
     Compute speed of a vehicle in Km/h.
 
         :param vehicle: the vehicle for which speed is calculated
+        :param world_state: optional WorldStateCache the velocity is read from
         :return: speed as a float in Km/h
     """
+    if world_state is not None and world_state.has_actor(vehicle):
+        return 3.6 * world_state.get_speed(vehicle)
+
     vel = vehicle.get_velocity()
 
     return 3.6 * math.sqrt(vel.x ** 2 + vel.y ** 2 + vel.z ** 2)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides a cache of the carla.Map.get_waypoint lookups, shared by the whole process.
+"""
+
+import threading
+from collections import OrderedDict
+
+from agents.navigation.global_route_planner import get_map_hash
+
+
+class WaypointCache(object):
+    """
+    Thread-safe LRU cache of carla.Map.get_waypoint. By default, lookups are keyed by their exact
+    location, so the results are the same as the ones of the map. With a positive 'resolution',
+    locations are snapped to a grid of that size in meters and the waypoint of the grid point is
+    returned, which lets slowly moving actors reuse the same lookups at the cost of an error
+    of up to resolution / 2 along each axis.
+
+    Use WaypointCache.get(wmap) to access the instance shared by the whole process, and
+    WaypointCache.clear() when the world is reloaded.
+    """
+
+    _caches = {}
+    _caches_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, wmap, resolution=0.0, max_size=100000):
+        """
+        Returns the cache shared by the whole process for a map. Caches are identified by the
+        OpenDRIVE content of the map, as the planners are, since maps generated from different
+        OpenDRIVE files share the same name. The resolution and size are only used the first time
+        the cache of the map is requested.
+
+            :param wmap (carla.Map): map of the waypoints
+            :param resolution (float): size of the grid the locations are snapped to, in meters. 0 uses exact locations
+            :param max_size (int): max number of lookups kept
+        """
+        key = get_map_hash(wmap)
+        with cls._caches_lock:
+            cache = cls._caches.get(key, None)
+            if cache is None:
+                cache = WaypointCache(wmap, resolution, max_size)
+                cls._caches[key] = cache
+        return cache
+
+    @classmethod
+    def clear(cls):
+        """
+        Forgets all the shared caches, to be called when the world is reloaded
+        """
+        with cls._caches_lock:
+            cls._caches.clear()
+
+    def __init__(self, wmap, resolution=0.0, max_size=100000):
+        """
+            :param wmap (carla.Map): map of the waypoints
+            :param resolution (float): size of the grid the locations are snapped to, in meters. 0 uses exact locations
+            :param max_size (int): max number of lookups kept
+        """
+        self._map = wmap
+        self._resolution = resolution
+        self._max_size = max_size
+        self._waypoints = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """
+        Returns the ratio of lookups answered by the cache
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get_waypoint(self, location, project_to_road=True, lane_type=None):
+        """
+        Cached version of carla.Map.get_waypoint
+
+            :param location (carla.Location): location of the waypoint
+            :param project_to_road (bool): whether or not to project the location to the closest lane
+            :param lane_type (carla.LaneType): lane types allowed. If None, the map default is used
+        """
+        if self._resolution > 0:
+            key = (int(round(location.x / self._resolution)),
+                   int(round(location.y / self._resolution)),
+                   int(round(location.z / self._resolution)),
+                   project_to_road, lane_type)
+        else:
+            key = (location.x, location.y, location.z, project_to_road, lane_type)
+
+        with self._lock:
+            if key in self._waypoints:
+                self.hits += 1
+                self._waypoints.move_to_end(key)
+                return self._waypoints[key]
+            self.misses += 1
+
+        if self._resolution > 0:
+            location = type(location)(key[0] * self._resolution, key[1] * self._resolution, key[2] * self._resolution)
+
+        if lane_type is None and project_to_road:
+            waypoint = self._map.get_waypoint(location)
+        elif lane_type is None:
+            waypoint = self._map.get_waypoint(location, project_to_road=project_to_road)
+        else:
+            waypoint = self._map.get_waypoint(location, project_to_road=project_to_road, lane_type=lane_type)
+
+        with self._lock:
+            self._waypoints[key] = waypoint
+            while len(self._waypoints) > self._max_size:
+                self._waypoints.popitem(last=False)
+
+        return waypoint
+
+    def reset(self):
+        """
+        Removes all the lookups and resets the counters
+        """
+        with self._lock:
+            self._waypoints.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._waypoints)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides a cache of the state of the world actors, shared by all the agents
+of the process. It is refreshed at most once per world tick, from a single snapshot.
+"""
+
+import fnmatch
+import threading
+
+import numpy as np
+
+
+class WorldStateCache(object):
+    """
+    Cache of the actor ids, types, poses, velocities and bounding box extents of a world,
+    together with the state of its traffic lights. Use WorldStateCache.get(world) to access
+    the instance shared by all the agents of the world.
+
+    The cache is refreshed the first time it is accessed after a world tick, so all the
+    agents of a tick read the same values and only the first one pays for them.
+    """
+
+    _caches = {}
+    _caches_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, world):
+        """
+        Returns the cache shared by all the agents of a world
+
+            :param world (carla.World): world of the cache
+        """
+        with cls._caches_lock:
+            cache = cls._caches.get(world.id, None)
+            if cache is None:
+                cache = WorldStateCache(world)
+                cls._caches[world.id] = cache
+        return cache
+
+    @classmethod
+    def clear(cls):
+        """
+        Forgets all the caches, needed if a world is reloaded keeping its id
+        """
+        with cls._caches_lock:
+            cls._caches.clear()
+
+    def __init__(self, world):
+        """
+            :param world (carla.World): world whose actors are cached
+        """
+        self._world = world
+        self._lock = threading.RLock()
+
+        self.frame = None
+        self.snapshot = None
+
+        self._actors = []
+        self._index = {}
+        self._extents = {}  # Bounding box extents never change, keep them for the whole episode
+        self._filters = {}
+        self._traffic_light_states = {}
+
+        self.ids = np.zeros(0, dtype=int)
+        self.type_ids = []
+        self.locations = np.zeros((0, 3))
+        self.rotations = np.zeros((0, 3))  # pitch, yaw, roll in degrees
+        self.forward_vectors = np.zeros((0, 3))
+        self.velocities = np.zeros((0, 3))
+        self.extents = np.zeros((0, 3))
+
+    def update(self):
+        """
+        Refreshes the cache if the world has ticked since the last update
+        """
+        snapshot = self._world.get_snapshot()
+        with self._lock:
+            if self.frame == snapshot.frame and self.snapshot is not None:
+                return self
+            self._refresh(snapshot)
+        return self
+
+    def _refresh(self, snapshot):
+        """
+        Reads the state of all the actors from the snapshot, asking the server
+        for the actor list only when actors have been spawned or destroyed
+        """
+        snapshot_ids = set(actor_snapshot.id for actor_snapshot in snapshot)
+        if snapshot_ids != set(self._index):
+            self._actors = [actor for actor in self._world.get_actors() if actor.id in snapshot_ids]
+            self._index = {actor.id: i for i, actor in enumerate(self._actors)}
+            self.ids = np.array([actor.id for actor in self._actors], dtype=int)
+            self.type_ids = [actor.type_id for actor in self._actors]
+            self.extents = np.zeros((len(self._actors), 3))
+            for i, actor in enumerate(self._actors):
+                if actor.id not in self._extents:
+                    extent = actor.bounding_box.extent
+                    self._extents[actor.id] = (extent.x, extent.y, extent.z)
+                self.extents[i] = self._extents[actor.id]
+
+        locations = np.zeros((len(self._actors), 3))
+        rotations = np.zeros((len(self._actors), 3))
+        velocities = np.zeros((len(self._actors), 3))
+        for i, actor in enumerate(self._actors):
+            actor_snapshot = snapshot.find(actor.id)
+            transform = actor_snapshot.get_transform()
+            velocity = actor_snapshot.get_velocity()
+            locations[i] = (transform.location.x, transform.location.y, transform.location.z)
+            rotations[i] = (transform.rotation.pitch, transform.rotation.yaw, transform.rotation.roll)
+            velocities[i] = (velocity.x, velocity.y, velocity.z)
+
+        pitch = np.radians(rotations[:, 0])
+        yaw = np.radians(rotations[:, 1])
+        self.forward_vectors = np.stack(
+            [np.cos(pitch) * np.cos(yaw), np.cos(pitch) * np.sin(yaw), np.sin(pitch)], axis=1)
+
+        self.locations = locations
+        self.rotations = rotations
+        self.velocities = velocities
+        self.snapshot = snapshot
+        self.frame = snapshot.frame
+        self._filters = {}
+        self._traffic_light_states = {}
+
+    def get_actors(self, wildcard_pattern=None):
+        """
+        Returns the list of actors, optionally filtered by their type id as carla.ActorList.filter does
+
+            :param wildcard_pattern (str): pattern of the type ids
+        """
+        self.update()
+        with self._lock:
+            if wildcard_pattern is None:
+                return list(self._actors)
+            if wildcard_pattern not in self._filters:
+                self._filters[wildcard_pattern] = [
+                    actor for actor, type_id in zip(self._actors, self.type_ids)
+                    if fnmatch.fnmatchcase(type_id, wildcard_pattern)]
+            return list(self._filters[wildcard_pattern])
+
+    def get_actors_in_radius(self, location, radius, wildcard_pattern=None):
+        """
+        Returns the actors closer than radius to a location, optionally filtered by their type id
+
+            :param location (carla.Location): center of the search
+            :param radius (float): max distance to the location
+            :param wildcard_pattern (str): pattern of the type ids
+        """
+        actors = self.get_actors(wildcard_pattern)
+        if not actors:
+            return actors
+        with self._lock:
+            indexes = self.get_indexes(actors)
+            distances = np.linalg.norm(self.locations[indexes] - (location.x, location.y, location.z), axis=1)
+        return [actor for actor, distance in zip(actors, distances) if distance < radius]
+
+    def get_indexes(self, actors):
+        """
+        Returns the position of the actors in the cache arrays, refreshing them if needed.
+        Actors unknown to the snapshot raise a KeyError.
+
+            :param actors (list of carla.Actor): actors to be found
+        """
+        self.update()
+        with self._lock:
+            return np.array([self._index[actor.id] for actor in actors], dtype=int)
+
+    def get_speed(self, actor):
+        """
+        Returns the speed of an actor in m/s at the cached frame
+
+            :param actor (carla.Actor): actor of the speed
+        """
+        self.update()
+        with self._lock:
+            return float(np.linalg.norm(self.velocities[self._index[actor.id]]))
+
+    def get_traffic_light_state(self, traffic_light):
+        """
+        Returns the state of a traffic light at the cached frame
+
+            :param traffic_light (carla.TrafficLight): traffic light of the state
+        """
+        self.update()
+        with self._lock:
+            if traffic_light.id not in self._traffic_light_states:
+                self._traffic_light_states[traffic_light.id] = traffic_light.state
+            return self._traffic_light_states[traffic_light.id]
+
+    def has_actor(self, actor):
+        """
+        Returns whether or not the actor is part of the cached frame
+
+            :param actor (carla.Actor): actor to be checked
+        """
+        self.update()
+        with self._lock:
+            return actor.id in self._index
+
+    def __len__(self):
+        return len(self._actors)
+
@@ -8,15 +8,21 @@ FilePath: /carla-interactive-script/src/replay_parser.py
 """
 from __future__ import annotations
 
+import bisect
 import functools
 import glob
+import hashlib
+import io
 import math
 import os
+import pickle
 import re
 import sys
 import weakref
 from collections import namedtuple
+from collections.abc import Sequence
 from dataclasses import dataclass
+from typing import Iterable, Iterator
 
 try:
     sys.path.append(
@@ -35,6 +41,15 @@ except IndexError:
 
 import carla
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+PARSER_VERSION = 1
+"""Version of the parsed form of a replay file, bump it whenever parsing results change"""
+
 
 def weak_lru(maxsize: int = 128, typed: bool = False):
     """LRU Cache decorator that keeps a weak reference to 'self'"""
@@ -377,19 +392,366 @@ class Frame:
         return hash((self.frame_id, self.frame_time))
 
 
+class TrajectoryStore(Sequence):
+    """Columnar storage of the actors' kinematics over a whole replay
+
+    Poses and their derivatives are kept in one frame-major array of shape (frames, actors, 12),
+    whose last axis is [x, y, z, pitch, yaw, roll, vx, vy, vz, ax, ay, az]. Entries of frames in
+    which an actor was not recorded are NaN. Indexing the store still gives `Frame` objects,
+    which are built on demand from the arrays.
+    """
+
+    FIELDS = ("x", "y", "z", "pitch", "yaw", "roll", "vx", "vy", "vz", "ax", "ay", "az")
+
+    def __init__(self, frame_ids, frame_times, actor_ids, data, extras: list[tuple], present=None):
+        """Wrap already computed columns
+
+        Args:
+            frame_ids (array-like): Id of each frame
+            frame_times (array-like): Time of each frame in seconds
+            actor_ids (array-like): Id of the actor stored in each column
+            data (np.ndarray): Kinematics array of shape (frames, actors, 12), may be memory-mapped
+            extras (list[tuple]): (collision, traffic_light, action) of each frame
+            present (np.ndarray, optional): Mask of shape (frames, actors) of the recorded entries.
+                Defaults to the non NaN entries of data.
+        """
+        if np is None:
+            raise RuntimeError("cannot import numpy, make sure numpy package is installed")
+
+        self.frame_ids = np.asarray(frame_ids, dtype=np.int64)
+        self.frame_times = np.asarray(frame_times, dtype=np.float64)
+        self.actor_ids = np.asarray(actor_ids, dtype=np.int64)
+        self.data = data
+        self.present = ~np.isnan(data[:, :, 0]) if present is None else np.asarray(present, dtype=bool)
+        self._extras = extras
+        self._column = {id: i for i, id in enumerate(self.actor_ids.tolist())}
+
+    @classmethod
+    def from_frames(cls, frames: Iterable[Frame], actor_ids: Iterable[int]) -> TrajectoryStore:
+        """Build the store from parsed frames
+
+        Velocity and acceleration are computed here over the whole array, so the frames
+        do not need to carry them (see `Replay.iter_frames`).
+
+        Args:
+            frames (Iterable[Frame]): Frames in recording order
+            actor_ids (Iterable[int]): Ids of the actors to store
+
+        Returns:
+            TrajectoryStore: The columnar store
+        """
+        if np is None:
+            raise RuntimeError("cannot import numpy, make sure numpy package is installed")
+
+        actor_ids = sorted(set(actor_ids))
+        column = {id: i for i, id in enumerate(actor_ids)}
+        frame_ids, frame_times, poses, extras = [], [], [], []
+        for frame in frames:
+            pose = np.full((len(actor_ids), 6), np.nan)
+            for id, transform in frame.transform.items():
+                if id in column:
+                    pose[column[id], 0:3] = transform.location
+                    pose[column[id], 3:6] = transform.rotation
+            frame_ids.append(frame.frame_id)
+            frame_times.append(frame.frame_time)
+            poses.append(pose)
+            extras.append((frame.collision, frame.traffic_light, frame.action))
+
+        data = np.full((len(poses), len(actor_ids), 12), np.nan)
+        if poses:
+            data[:, :, 0:6] = np.stack(poses)
+            cls._compute_derivatives(np.asarray(frame_ids), np.asarray(frame_times, dtype=np.float64), data)
+        return cls(frame_ids, frame_times, actor_ids, data, extras)
+
+    @staticmethod
+    def _compute_derivatives(frame_ids: np.ndarray, frame_times: np.ndarray, data: np.ndarray):
+        """Fill velocity and acceleration in place, the same way as the frame by frame parser does"""
+        time_diff = np.maximum(1e-6, np.diff(frame_times))[:, None, None]
+        start = frame_ids == 1
+        start[0] = True
+
+        velocity = data[:, :, 6:9]
+        velocity[1:] = np.diff(data[:, :, 0:3], axis=0) / time_diff
+        velocity[start] = 0
+
+        acceleration = data[:, :, 9:12]
+        acceleration[1:] = np.diff(velocity, axis=0) / time_diff
+        acceleration[start] = 0
+
+        data[np.isnan(data[:, :, 0]), 6:12] = np.nan
+
+    def __len__(self) -> int:
+        return len(self.frame_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._make_frame(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("frame index out of range")
+        return self._make_frame(index)
+
+    def _make_frame(self, index: int) -> Frame:
+        """Build the `Frame` view of one row"""
+        collision, traffic_light, action = self._extras[index]
+        frame = Frame(
+            frame_id=int(self.frame_ids[index]),
+            frame_time=float(self.frame_times[index]),
+            collision=collision,
+            transform={},
+            traffic_light=traffic_light,
+            action=action,
+        )
+        for i in np.flatnonzero(self.present[index]).tolist():
+            id = int(self.actor_ids[i])
+            values = self.data[index, i].tolist()
+            frame.transform[id] = Transform(values[0:3], values[3:6])
+            frame.velocity[id] = Vector3D(*values[6:9])
+            frame.acceleration[id] = Vector3D(*values[9:12])
+        return frame
+
+    def get_poses(self, id: int) -> np.ndarray:
+        """Get [x, y, z, pitch, yaw, roll] of an actor over all frames
+
+        Args:
+            id (int): Id of the actor
+
+        Returns:
+            np.ndarray: View of shape (frames, 6), NaN where the actor was not recorded
+        """
+        return self.data[:, self._column[id], 0:6]
+
+    def get_velocities(self, id: int) -> np.ndarray:
+        """Get [vx, vy, vz] of an actor over all frames
+
+        Args:
+            id (int): Id of the actor
+
+        Returns:
+            np.ndarray: View of shape (frames, 3), NaN where the actor was not recorded
+        """
+        return self.data[:, self._column[id], 6:9]
+
+    def get_accelerations(self, id: int) -> np.ndarray:
+        """Get [ax, ay, az] of an actor over all frames
+
+        Args:
+            id (int): Id of the actor
+
+        Returns:
+            np.ndarray: View of shape (frames, 3), NaN where the actor was not recorded
+        """
+        return self.data[:, self._column[id], 9:12]
+
+    def get_actor_trajectory(self, id: int) -> list[Transform]:
+        """Get the trajectory of an actor, same as `Replay.get_actor_trajectory`
+
+        Args:
+            id (int): Id of the actor
+
+        Returns:
+            list[Transform]: List of transforms of the actor (None where it was not recorded)
+        """
+        column = self._column.get(id, None)
+        if column is None:
+            return [None] * len(self)
+
+        poses = self.data[:, column, 0:6]
+        present = self.present[:, column]
+
+        # Find the last unique transform before the final stopping
+        last_unique_index = len(self) - 1
+        if present[-1]:
+            same_as_last = present[:-1] & (poses[:-1] == poses[-1]).all(axis=1)
+        else:
+            same_as_last = ~present[:-1]
+        different = np.flatnonzero(~same_as_last)
+        if len(different):
+            last_unique_index = int(different[-1])
+
+        # Slice the trajectory up to the last unique transform
+        return [
+            Transform(pose[0:3], pose[3:6]) if is_present else None
+            for pose, is_present in zip(
+                poses[: last_unique_index + 1].tolist(), present[: last_unique_index + 1].tolist()
+            )
+        ]
+
+
+class RecorderCache:
+    """Size-bounded on-disk cache of parsed replay files
+
+    Each replay file gets one entry, made of a pickled metadata file and a `.npy` array that is
+    memory-mapped when loaded. Entries are keyed by the real path of the replay file, its size,
+    its modification time and `PARSER_VERSION`, so an entry whose key no longer matches is
+    simply treated as a miss and overwritten. When the cache directory grows larger than
+    `max_size` bytes, the least recently used entries are removed.
+    """
+
+    META_SUFFIX = ".pkl"
+    DATA_SUFFIX = ".npy"
+
+    def __init__(self, cache_dir: str, max_size: int = 2 * 1024**3):
+        """Open (and create if needed) a cache directory
+
+        Args:
+            cache_dir (str): Directory where the entries are stored
+            max_size (int, optional): Maximum size of the directory in bytes. Defaults to 2 GiB.
+        """
+        if np is None:
+            raise RuntimeError("cannot import numpy, make sure numpy package is installed")
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(filepath: str) -> tuple:
+        """Key identifying the current content of a replay file"""
+        stat = os.stat(filepath)
+        return (os.path.realpath(filepath), stat.st_size, stat.st_mtime_ns, PARSER_VERSION)
+
+    def _stem(self, filepath: str) -> str:
+        digest = hashlib.sha1(os.path.realpath(filepath).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest)
+
+    def load(self, filepath: str) -> "tuple[dict, np.ndarray] | None":
+        """Load the entry of a replay file
+
+        Args:
+            filepath (str): The path to the replay file
+
+        Returns:
+            tuple[dict, np.ndarray] | None: The metadata and the memory-mapped array, None if
+                there is no valid entry
+        """
+        stem = self._stem(filepath)
+        try:
+            with open(stem + self.META_SUFFIX, "rb") as f:
+                meta = pickle.load(f)
+            if meta.get("key") != self.key(filepath):
+                return None
+            data = np.load(stem + self.DATA_SUFFIX, mmap_mode="r")
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+
+        # Keep track of the last use for the eviction. The entry may have just been evicted
+        # by another process, but the memory-mapped data stays readable
+        try:
+            os.utime(stem + self.META_SUFFIX)
+        except OSError:
+            pass
+        return meta, data
+
+    def save(self, filepath: str, meta: dict, data: np.ndarray):
+        """Store the entry of a replay file, replacing any previous one
+
+        Args:
+            filepath (str): The path to the replay file
+            meta (dict): Picklable metadata, the key is added to it
+            data (np.ndarray): Array to store
+        """
+        stem = self._stem(filepath)
+        meta = dict(meta, key=self.key(filepath))
+
+        # The metadata is written last, an entry without it is never loaded
+        for suffix, dump in (
+            (self.DATA_SUFFIX, lambda f: np.save(f, np.ascontiguousarray(data))),
+            (self.META_SUFFIX, lambda f: pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)),
+        ):
+            tmp_path = f"{stem}{suffix}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                dump(f)
+            os.replace(tmp_path, stem + suffix)
+
+        self._evict(keep=stem)
+
+    def clear(self):
+        """Remove all entries"""
+        for stem in self._entries():
+            self._remove(stem)
+
+    def _entries(self) -> dict[str, tuple[float, int]]:
+        """Last use time and total size of each entry, by stem"""
+        entries = {}
+        for name in os.listdir(self.cache_dir):
+            stem, suffix = os.path.splitext(os.path.join(self.cache_dir, name))
+            if suffix not in (self.META_SUFFIX, self.DATA_SUFFIX):
+                continue
+            try:
+                stat = os.stat(stem + suffix)
+            except OSError:
+                continue
+            last_use, size = entries.get(stem, (0.0, 0))
+            if suffix == self.META_SUFFIX:
+                last_use = stat.st_mtime
+            entries[stem] = (last_use, size + stat.st_size)
+        return entries
+
+    def _evict(self, keep: str = None):
+        """Remove the least recently used entries until the directory fits in max_size"""
+        entries = self._entries()
+        total_size = sum(size for _, size in entries.values())
+        for stem, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+            if total_size <= self.max_size:
+                break
+            if stem == keep:
+                continue
+            self._remove(stem)
+            total_size -= size
+
+    def _remove(self, stem: str):
+        for suffix in (self.META_SUFFIX, self.DATA_SUFFIX):
+            try:
+                os.remove(stem + suffix)
+            except OSError:
+                pass
+
+
+# fmt: off
+_FRAME_SPLIT_PATTERN = re.compile(r"(Frame \d+ at [\d\.]+ seconds)")
+_FRAME_INFO_PATTERN = re.compile(r"Frame (\d+) at ([\d\.]+) seconds")
+_COLLISION_PATTERN = re.compile(r"Collision id \d+ between (\d+)(?: \(hero\))? +with +(\d+)(?: \(hero\))?")
+_TRANSFORM_PATTERN = re.compile(r"Id: (\d+) Location: \((.*?)\) Rotation \((.*?)\)")
+_TRAFFIC_LIGHT_PATTERN = re.compile(r"Id: (\d+) state: (\d+) frozen: (\d+) elapsedTime: ([\d\.]+)")
+_VEHICLE_PATTERN = re.compile(r"Id: (\d+) Steering: ([\d\.]+) Throttle: ([\d\.]+) Brake ([\d\.]+) Handbrake: ([\d\.]+) Gear: (\d+)(?: \w+)*")
+_WALKER_PATTERN = re.compile(r"Id: (\d+) speed: ([\d\.]+)")
+_CREATE_FOCUS_PATTERN = re.compile(r"Create (\d+): (?:vehicle|walker|dynamic)(?:\.[\w.]+)? \(\d+\) at \(")
+# fmt: on
+
+
 class Replay:
-    def __init__(self, client: carla.Client, filepath: str, lazy_init: bool = True):
+    BACKENDS = ("frames", "columnar")
+
+    def __init__(
+        self,
+        client: carla.Client,
+        filepath: str,
+        lazy_init: bool = True,
+        backend: str = "frames",
+        cache_dir: str = None,
+        cache_size: int = 2 * 1024**3,
+    ):
         """Parse one replay file
 
         Args:
             client (carla.Client): The client to connect to the server
             filepath (str): The path to the replay file
             lazy_init (bool, optional): Whether to delay parsing the replay file. Defaults to True.
+            backend (str, optional): How frames are stored, "frames" for a list of `Frame`, "columnar"
+                for a `TrajectoryStore` (requires numpy). Defaults to "frames".
+            cache_dir (str, optional): Directory of a `RecorderCache` used to store the parsed replay file,
+                and to load it instead of parsing it again (requires numpy). Defaults to None (no cache).
+            cache_size (int, optional): Maximum size of the cache directory in bytes. Defaults to 2 GiB.
         """
         self.client = client
         self.filepath = filepath
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"File not found: {filepath}")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}, expected one of {self.BACKENDS}")
+        self.backend = backend
 
         self._info = None
         self._duration = None
@@ -399,8 +761,15 @@ class Replay:
         self._sensors = None
         self._obstacles = None
         self._actors = None
+        self._actors_by_id = None
+        self._actors_by_rolename = None
+        self._actors_by_blueprint = None
         self._frame_info = None
 
+        self._cache = RecorderCache(cache_dir, cache_size) if cache_dir is not None else None
+        if self._cache is not None and self._load_cache():
+            return
+
         if not lazy_init:
             self._parse_replay_file()
 
@@ -415,14 +784,14 @@ class Replay:
     def duration(self) -> float:
         """Total duration of the replay file in seconds"""
         if self._duration is None:
-            self._parse_duration()
+            self._duration = self._parse_duration()
         return self._duration
 
     @property
     def map_name(self) -> str:
         """Map name of the replay file"""
         if self._map_name is None:
-            self._parse_map()
+            self._map_name = self._parse_map()
         return self._map_name
 
     @property
@@ -456,24 +825,11 @@ class Replay:
     @property
     def actors(self) -> list[Actor]:
         """List of all actors in the replay file"""
-        # fmt: off
-        if self._actors is None:
-            self._actors = sorted(self.vehicles + self.walkers + self.obstacles, key=lambda x: x.id)
-            for i in range(len(self._actors)):
-                current_actor = self._actors[i]
-                next_actor = self._actors[i + 1] if i < len(self._actors) - 1 else None
-                current_actor.sensors = [
-                    sensor
-                    for sensor in self.sensors
-                    if (next_actor is None and sensor.id > current_actor.id)
-                    or (next_actor is not None and current_actor.id < sensor.id < next_actor.id
-                    )
-                ]
-        # fmt: on
+        self._ensure_indexes()
         return self._actors
 
     @property
-    def frame_info(self) -> list[Frame]:
+    def frame_info(self) -> "list[Frame] | TrajectoryStore":
         """List of all frames in the replay file"""
         if self._frame_info is None:
             self._frame_info = self._parse_frame_info()
@@ -493,7 +849,6 @@ class Replay:
         except IndexError:
             return None
 
-    @weak_lru(maxsize=128)
     def get_actor_by_rolename(self, name: str) -> Actor:
         """Get actor by its rolename
 
@@ -503,12 +858,9 @@ class Replay:
         Returns:
             Actor: Actor with the given rolename
         """
-        for actor in self.actors:
-            if actor.attributes.get("role_name", None) == name:
-                return actor
-        return None
+        self._ensure_indexes()
+        return self._actors_by_rolename.get(name, None)
 
-    @weak_lru(maxsize=128)
     def get_actor_by_id(self, id: int) -> Actor:
         """Get actor by its id
 
@@ -518,23 +870,28 @@ class Replay:
         Returns:
             Actor: Actor with the given id
         """
-        for actor in self.actors:
-            if actor.id == id:
-                return actor
-        return None
+        self._ensure_indexes()
+        return self._actors_by_id.get(id, None)
 
-    @weak_lru(maxsize=128)
     def filter_actor_by_blueprint(self, blueprint: str) -> list[Actor]:
         """Filter actors by blueprint
 
         Args:
-            blueprint (str): Blueprint name of the actor
+            blueprint (str): Blueprint name of the actor (regular expression matched at the beginning)
 
         Returns:
             list[Actor]: List of actors with the given blueprint
         """
+        self._ensure_indexes()
+
+        # Only the distinct blueprint names need to be matched
         pattern = re.compile(blueprint)
-        return [actor for actor in self.actors if pattern.match(actor.blueprint)]
+        matches = [
+            actors for name, actors in self._actors_by_blueprint.items() if pattern.match(name)
+        ]
+        if len(matches) == 1:
+            return list(matches[0])
+        return sorted((actor for actors in matches for actor in actors), key=lambda x: x.id)
 
     @weak_lru(maxsize=128)
     def get_collision_frames(self) -> list[Frame]:
@@ -555,6 +912,9 @@ class Replay:
         Returns:
             list[Transform]: List of locations of the actor
         """
+        if isinstance(self.frame_info, TrajectoryStore):
+            return self.frame_info.get_actor_trajectory(id)
+
         trajectory = [frame.get_transform_by_id(id) for frame in self.frame_info]
 
         # Find the last unique transform before the final stopping
@@ -582,23 +942,52 @@ class Replay:
         self._obstacles = self._parse_actors("dynamic")
 
         # Attach sensor to actors
-        # fmt: off
-        self._actors = sorted(self._vehicles + self._walkers + self._obstacles, key=lambda x: x.id)
-        for i in range(len(self._actors)):
-            current_actor = self._actors[i]
-            next_actor = self._actors[i + 1] if i < len(self._actors) - 1 else None
-            current_actor.sensors = [
-                sensor
-                for sensor in self._sensors
-                if (next_actor is None and sensor.id > current_actor.id)
-                or (next_actor is not None and current_actor.id < sensor.id < next_actor.id
-                )
-            ]
+        self._actors = self._attach_sensors(self._vehicles + self._walkers + self._obstacles, self._sensors)
+        self._index_actors()
 
         # -------------Frame information-------------
-        # fmt: on
         self._frame_info = self._parse_frame_info()
 
+    @staticmethod
+    def _attach_sensors(actors: list[Actor], sensors: list[Actor]) -> list[Actor]:
+        """Attach each sensor to the actor with the closest lower id
+
+        Args:
+            actors (list[Actor]): Actors the sensors can be attached to
+            sensors (list[Actor]): Sensors to attach
+
+        Returns:
+            list[Actor]: The actors sorted by id
+        """
+        actors = sorted(actors, key=lambda x: x.id)
+        actor_ids = [actor.id for actor in actors]
+        for actor in actors:
+            actor.sensors = []
+
+        for sensor in sensors:
+            index = bisect.bisect_left(actor_ids, sensor.id) - 1
+            if index >= 0 and actor_ids[index] != sensor.id:
+                actors[index].sensors.append(sensor)
+        return actors
+
+    def _ensure_indexes(self):
+        """Parse the actors and build their indexes, if not done yet"""
+        if self._actors is None:
+            self._actors = self._attach_sensors(self.vehicles + self.walkers + self.obstacles, self.sensors)
+            self._index_actors()
+
+    def _index_actors(self):
+        """Build the id, rolename and blueprint indexes of the actors"""
+        self._actors_by_id = {}
+        self._actors_by_rolename = {}
+        self._actors_by_blueprint = {}
+        for actor in self._actors:
+            self._actors_by_id[actor.id] = actor
+            self._actors_by_blueprint.setdefault(actor.blueprint, []).append(actor)
+            role_name = actor.attributes.get("role_name", None)
+            if role_name is not None:
+                self._actors_by_rolename.setdefault(role_name, actor)
+
     def _parse_duration(self) -> float:
         """Parse the duration of the replay file in seconds
 
@@ -651,94 +1040,179 @@ class Replay:
             )
         return actors
 
-    def _parse_frame_info(self) -> list[Frame]:
+    def _parse_frame_info(self) -> "list[Frame] | TrajectoryStore":
         """Parse each frame's information
 
         Returns:
-            frame_info_list (list): List of frame information
+            frame_info_list (list | TrajectoryStore): List of frame information, depending on the backend
         """
+        if self.backend == "frames" and self._cache is None:
+            return list(self.iter_frames())
 
-        def parse_match(pattern: re.Pattern, text: str, processor=lambda x: x):
-            """Apply a regular expression pattern to the text and process matches with the given processor function."""
-            return [processor(match) for match in re.findall(pattern, text)]
-
-        def process_collision(match):
-            """Process collision matches."""
-            return frozenset(map(int, match))
-
-        def process_transform(match):
-            """Process transform matches."""
-            id_number, location, rotation = match
-            if int(id_number) in focus_actor:
-                location = tuple(float(x) / 100 for x in location.split(", "))
-                rotation = tuple(float(x) for x in rotation.split(", "))
-                return int(id_number), {"location": location, "rotation": rotation}
-            return None
+        store = TrajectoryStore.from_frames(
+            self.iter_frames(compute_derivatives=False),
+            (actor.id for actor in self.actors),
+        )
+        if self._cache is not None:
+            self._save_cache(store)
+        return store if self.backend == "columnar" else list(store)
 
-        def process_traffic_light(match):
-            """Process traffic light matches."""
-            id_number, state, frozen, elapsed_time = match
-            return int(id_number), {
-                "state": int(state),
-                "frozen": int(frozen),
-                "elapsed_time": float(elapsed_time),
-            }
+    def _load_cache(self) -> bool:
+        """Restore the parsed replay file from the cache
 
-        def process_action(match, action_type):
-            """Process action matches."""
-            id_number = int(match[0])
-            if id_number in focus_actor:
-                if action_type == "vehicle":
-                    keys = ["steering", "throttle", "brake", "handbrake", "gear"]
-                    values = [float(v) for v in match[1:6]]
-                    return id_number, dict(zip(keys, values))
-                elif action_type == "walker":
-                    return id_number, {"speed": float(match[1]) / 100}
-            return None
+        Returns:
+            bool: Whether a valid entry was found
+        """
+        entry = self._cache.load(self.filepath)
+        if entry is None:
+            return False
+
+        meta, data = entry
+        self._duration = meta["duration"]
+        self._map_name = meta["map_name"]
+        self._vehicles, self._walkers, self._sensors, self._obstacles, self._actors = meta["actors"]
+        self._index_actors()
+        store = TrajectoryStore(
+            meta["frame_ids"], meta["frame_times"], meta["actor_ids"], data, meta["extras"], meta["present"]
+        )
+        self._frame_info = store if self.backend == "columnar" else list(store)
+        return True
+
+    def _save_cache(self, store: TrajectoryStore):
+        """Write the parsed replay file to the cache"""
+        meta = {
+            "duration": self.duration,
+            "map_name": self.map_name,
+            "actors": (self.vehicles, self.walkers, self.sensors, self.obstacles, self.actors),
+            "frame_ids": store.frame_ids,
+            "frame_times": store.frame_times,
+            "actor_ids": store.actor_ids,
+            "present": store.present,
+            "extras": store._extras,
+        }
+        self._cache.save(self.filepath, meta, store.data)
+
+    def iter_frames(
+        self,
+        source: "str | Iterable[str] | None" = None,
+        focus_actors: "set[int] | None" = None,
+        compute_derivatives: bool = True,
+    ) -> Iterator[Frame]:
+        """Parse the recorder information in a single pass, yielding frames one at a time
+
+        Only the frame being parsed and the previous one (needed for velocity and acceleration)
+        are kept in memory, so this can be used on recordings whose parsed form would not fit.
 
-        # fmt: off
-        frame_info_list: list[Frame] = []
-        focus_actor = set(actor.id for actor in self.actors)
-        frames = re.split(r"(Frame \d+ at [\d\.]+ seconds)", self.info)[1:]
-
-        # Define the patterns
-        frame_info_pattern = r"Frame (\d+) at ([\d\.]+) seconds"
-        collision_pattern = (r"Collision id \d+ between (\d+)(?: \(hero\))? +with +(\d+)(?: \(hero\))?")
-        transform_pattern = r"Id: (\d+) Location: \((.*?)\) Rotation \((.*?)\)"
-        traffic_light_pattern = r"Id: (\d+) state: (\d+) frozen: (\d+) elapsedTime: ([\d\.]+)"
-        vehicle_pattern = r"Id: (\d+) Steering: ([\d\.]+) Throttle: ([\d\.]+) Brake ([\d\.]+) Handbrake: ([\d\.]+) Gear: (\d+)(?: \w+)*"
-        walker_pattern = r"Id: (\d+) speed: ([\d\.]+)"
-
-        for frame_info, frame in zip(frames[::2], frames[1::2]):
-            frame_id, frame_time = re.match(frame_info_pattern, frame_info).groups()
-            frame_dict = {
+        Args:
+            source (str | Iterable[str], optional): Recorder text, or any iterable of its lines (e.g. an
+                opened dump of `show_recorder_file_info`). Defaults to the information of this replay file.
+            focus_actors (set[int], optional): Ids of the actors whose transform and action are kept.
+                Defaults to all actors of this replay file, or, when reading from another source,
+                to the vehicles, walkers and obstacles created so far in the stream.
+            compute_derivatives (bool, optional): Whether to fill velocity and acceleration. Defaults to True.
+
+        Yields:
+            Frame: Parsed frame
+        """
+        if source is None:
+            source = self.info
+            if focus_actors is None:
+                focus_actors = set(actor.id for actor in self.actors)
+        discover_actors = focus_actors is None
+        if discover_actors:
+            focus_actors = set()
+        if isinstance(source, str):
+            source = io.StringIO(source)
+
+        current = None
+        previous_frame = None
+
+        def new_frame(frame_header: str) -> dict:
+            frame_id, frame_time = _FRAME_INFO_PATTERN.match(frame_header).groups()
+            return {
                 "frame_id": int(frame_id),
                 "frame_time": float(frame_time),
-                "collision": list(map(tuple, set(parse_match(collision_pattern, frame, process_collision)))),
-                "transform": dict(filter(None, parse_match(transform_pattern, frame, process_transform))),
-                "traffic_light": dict(parse_match(traffic_light_pattern, frame, process_traffic_light)),
-                "action": {}
+                "collision": [],
+                "transform": {},
+                "traffic_light": {},
+                "vehicle_action": {},
+                "walker_action": {},
             }
 
-            frame_dict["action"].update(filter(None, parse_match(vehicle_pattern, frame, lambda m: process_action(m, "vehicle"))))
-            frame_dict["action"].update(filter(None, parse_match(walker_pattern, frame, lambda m: process_action(m, "walker"))))
+        def scan(text: str):
+            """Feed a piece of text (at most one line) of the current frame"""
+            # Every pattern requires its literal marker, checking it first avoids most regex calls
+            if "Collision id" in text:
+                for match in _COLLISION_PATTERN.findall(text):
+                    current["collision"].append(frozenset(map(int, match)))
+            if "Location: " in text:
+                for id_number, location, rotation in _TRANSFORM_PATTERN.findall(text):
+                    if int(id_number) in focus_actors:
+                        current["transform"][int(id_number)] = {
+                            "location": tuple(float(x) / 100 for x in location.split(", ")),
+                            "rotation": tuple(float(x) for x in rotation.split(", ")),
+                        }
+            if "elapsedTime: " in text:
+                for id_number, state, frozen, elapsed_time in _TRAFFIC_LIGHT_PATTERN.findall(text):
+                    current["traffic_light"][int(id_number)] = {
+                        "state": int(state),
+                        "frozen": int(frozen),
+                        "elapsed_time": float(elapsed_time),
+                    }
+            if "Steering: " in text:
+                for match in _VEHICLE_PATTERN.findall(text):
+                    if int(match[0]) in focus_actors:
+                        keys = ["steering", "throttle", "brake", "handbrake", "gear"]
+                        values = [float(v) for v in match[1:6]]
+                        current["vehicle_action"][int(match[0])] = dict(zip(keys, values))
+            if "speed: " in text:
+                for id_number, speed in _WALKER_PATTERN.findall(text):
+                    if int(id_number) in focus_actors:
+                        current["walker_action"][int(id_number)] = {"speed": float(speed) / 100}
+
+        def finish_frame() -> Frame:
+            # fmt: off
+            frame_dict = {
+                "frame_id": current["frame_id"],
+                "frame_time": current["frame_time"],
+                "collision": list(map(tuple, set(current["collision"]))),
+                "transform": current["transform"],
+                "traffic_light": current["traffic_light"],
+                "action": {**current["vehicle_action"], **current["walker_action"]},
+            }
             current_frame = Frame.from_dict(frame_dict)
+            if not compute_derivatives:
+                return current_frame
 
             # Calculate velocity and acceleration
             for id in current_frame.transform:
                 if current_frame.frame_id == 1:
                     current_frame.velocity[id] = current_frame.acceleration[id] = Vector3D(0, 0, 0)
                 else:
-                    previous_frame = frame_info_list[-1]
                     time_diff = max(1e-6, current_frame.frame_time - previous_frame.frame_time)
                     d_loc = current_frame.transform[id].location - previous_frame.transform[id].location
                     current_frame.velocity[id] = d_loc / time_diff
                     d_velocity = current_frame.velocity[id] - previous_frame.velocity[id]
                     current_frame.acceleration[id] = d_velocity / time_diff
-            frame_info_list.append(current_frame)
-
-        # fmt: on
-        return frame_info_list
+            # fmt: on
+            return current_frame
+
+        for line in source:
+            if discover_actors and "Create " in line:
+                focus_actors.update(int(id) for id in _CREATE_FOCUS_PATTERN.findall(line))
+
+            parts = _FRAME_SPLIT_PATTERN.split(line) if "Frame " in line else [line]
+            if current is not None:
+                scan(parts[0])
+            for frame_header, text in zip(parts[1::2], parts[2::2]):
+                if current is not None:
+                    previous_frame = finish_frame()
+                    yield previous_frame
+                current = new_frame(frame_header)
+                scan(text)
+
+        if current is not None:
+            yield finish_frame()
 
     def __hash__(self) -> int:
         return hash(self.filepath)
@@ -747,4 +1221,4 @@ class Replay:
         return isinstance(other, Replay) and self.filepath == other.filepath
 
 
-__all__ = ["Replay"]
+__all__ = ["Replay", "RecorderCache", "TrajectoryStore"]
@@ -37,6 +37,7 @@ from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
 from srunner.scenariomanager.scenario_manager import ScenarioManager
 from srunner.scenarios.open_scenario import OpenScenario
 from srunner.scenarios.route_scenario import RouteScenario
+from srunner.tools.parallel_runner import ParallelRunner, ServerLostError, merge_results, parse_servers
 from srunner.tools.scenario_parser import ScenarioConfigurationParser
 from srunner.tools.route_parser import RouteParser
 from srunner.tools.osc2_helper import OSC2Helper
@@ -83,6 +84,7 @@ class ScenarioRunner(object):
         Setup ScenarioManager
         """
         self._args = args
+        self._output_files = []
 
         if args.timeout:
             self.client_timeout = float(args.timeout)
@@ -103,8 +105,11 @@ class ScenarioRunner(object):
             sys.path.insert(0, os.path.dirname(args.agent))
             self.module_agent = importlib.import_module(module_name)
 
+        # Keep the map derived data between runs on the same world
+        CarlaDataProvider.set_warm_world_mode(self._args.warmWorld)
+
         # Create the ScenarioManager
-        self.manager = ScenarioManager(self._args.debug, self._args.sync, self._args.timeout)
+        self.manager = ScenarioManager(self._args.debug, self._args.sync, self._args.timeout, self._args.profile)
 
         # Create signal handler for SIGINT
         self._shutdown_requested = False
@@ -268,6 +273,11 @@ class ScenarioRunner(object):
         if self._args.file:
             filename = config_name + current_time + ".txt"
 
+        if self._args.profile:
+            self.manager.write_profile(config_name + current_time + "_profile")
+
+        self._output_files.extend([f for f in (filename, junit_filename, json_filename) if f])
+
         if not self.manager.analyze_scenario(self._args.output, filename, junit_filename, json_filename):
             print("All scenario tests were passed successfully!")
         else:
@@ -313,7 +323,14 @@ class ScenarioRunner(object):
         """
 
         if self._args.reloadWorld:
-            self.world = self.client.load_world(town)
+            # In warm world mode, the loaded world is reused if it already is of the right town
+            world = self.client.get_world()
+            if self._args.warmWorld and CarlaDataProvider.is_warm_world(world, town):
+                # Undo the traffic light changes of the previous run, as loading the world would
+                world.freeze_all_traffic_lights(False)
+                world.reset_all_traffic_lights()
+            else:
+                self.world = self.client.load_world(town)
         else:
             # if the world should not be reloaded, wait at least until all ego vehicles are ready
             ego_vehicle_found = False
@@ -445,6 +462,52 @@ class ScenarioRunner(object):
         self._cleanup()
         return result
 
+    @staticmethod
+    def get_configurations(args):
+        """
+        Returns the route or scenario configurations given by the command line arguments.
+        In warm world mode, they are sorted by town, so that consecutive runs reuse the world.
+        """
+        if args.route:
+            configurations = RouteParser.parse_routes_file(args.route, args.route_id)
+        else:
+            # Load the scenario configurations provided in the config file
+            configurations = ScenarioConfigurationParser.parse_scenario_configuration(args.scenario, args.configFile)
+
+        if args.warmWorld and configurations:
+            configurations = sorted(configurations, key=lambda config: config.town or '')
+        return configurations
+
+    def _is_server_alive(self):
+        """
+        Checks whether or not the CARLA server still answers
+        """
+        try:
+            self.client.get_server_version()
+        except RuntimeError:
+            return False
+        return True
+
+    def run_job(self, index):
+        """
+        Runs all the repetitions of one of the route or scenario configurations.
+        Used by the parallel mode, which gives each configuration to one of its servers.
+        Returns whether or not the last repetition succeeded, and the output files of all of them.
+        """
+        config = self.get_configurations(self._args)[index]
+        self._output_files = []
+
+        result = False
+        for _ in range(self._args.repetitions):
+            self.finished = False
+            result = self._load_and_run_scenario(config)
+            self._cleanup()
+
+            if not result and not self._is_server_alive():
+                raise ServerLostError("Lost the CARLA server at {}:{}".format(self._args.host, self._args.port))
+
+        return result, self._output_files
+
     def _run_scenarios(self):
         """
         Run conventional scenarios (e.g. implemented using the Python API of ScenarioRunner)
@@ -452,9 +515,7 @@ class ScenarioRunner(object):
         result = False
 
         # Load the scenario configurations provided in the config file
-        scenario_configurations = ScenarioConfigurationParser.parse_scenario_configuration(
-            self._args.scenario,
-            self._args.configFile)
+        scenario_configurations = self.get_configurations(self._args)
         if not scenario_configurations:
             print("Configuration for scenario {} cannot be found!".format(self._args.scenario))
             return result
@@ -475,10 +536,11 @@ class ScenarioRunner(object):
         result = False
 
         # retrieve routes
-        route_configurations = RouteParser.parse_routes_file(self._args.route, self._args.route_id)
+        route_configurations = self.get_configurations(self._args)
 
         for config in route_configurations:
             for _ in range(self._args.repetitions):
+                self.finished = False
                 result = self._load_and_run_scenario(config)
 
                 self._cleanup()
@@ -542,6 +604,34 @@ class ScenarioRunner(object):
         return result
 
 
+def run_parallel(args):
+    """
+    Runs the route or scenario configurations over the pool of servers given by args.servers,
+    merging the JSON and JUnit outputs of all of them
+    """
+    endpoints = parse_servers(args.servers, args.trafficManagerPort)
+    configurations = ScenarioRunner.get_configurations(args)
+    if not configurations:
+        print("No configurations found for the parallel mode")
+        return False
+
+    print("Running {} configurations over {} servers".format(len(configurations), len(endpoints)))
+    results = ParallelRunner(ScenarioRunner, args, endpoints).run(list(range(len(configurations))))
+
+    for result in results:
+        print("> {}: {} (server {}, {} attempts)".format(
+            configurations[result['job']].name,
+            "SUCCESS" if result['success'] else "FAILURE",
+            result['server'],
+            result['attempts']))
+
+    current_time = str(datetime.now().strftime('%Y-%m-%d-%H-%M-%S'))
+    for merged_file in merge_results(results, os.path.join(args.outputDir, "parallel" + current_time)):
+        print("Merged results written to {}".format(merged_file))
+
+    return all(result['success'] for result in results)
+
+
 def main():
     """
     main function
@@ -561,6 +651,9 @@ def main():
                         help='Set the CARLA client timeout value in seconds')
     parser.add_argument('--trafficManagerPort', default='8000',
                         help='Port to use for the TrafficManager (default: 8000)')
+    parser.add_argument('--servers', default=None,
+                        help='Comma separated list of host:port[:tmPort] servers. Routes and scenarios are\n'
+                        'run in parallel, one worker process per server (default TM ports: trafficManagerPort + index)')
     parser.add_argument('--trafficManagerSeed', default='0',
                         help='Seed used by the TrafficManager (default: 0)')
     parser.add_argument('--sync', action='store_true',
@@ -588,8 +681,13 @@ def main():
     parser.add_argument('--additionalScenario', default='', help='Provide additional scenario implementations (*.py)')
 
     parser.add_argument('--debug', action="store_true", help='Run with debug output')
+    parser.add_argument('--profile', action="store_true",
+                        help='Profile the scenario ticks, writing a JSON report and a collapsed stack file')
     parser.add_argument('--reloadWorld', action="store_true",
                         help='Reload the CARLA world before starting a scenario (default=True)')
+    parser.add_argument('--warmWorld', action="store_true",
+                        help='Run the configurations sorted by town, reusing the loaded world and its map data\n'
+                        'between consecutive runs on the same town. Only the actors and settings are reset')
     parser.add_argument('--record', type=str, default='',
                         help='Path were the files will be saved, relative to SCENARIO_RUNNER_ROOT.\nActivates the CARLA recording feature and saves to file all the criteria information.')
     parser.add_argument('--randomize', action="store_true", help='Scenario parameters are randomized')
@@ -630,6 +728,17 @@ def main():
     if arguments.agent:
         arguments.sync = True
 
+    if arguments.servers:
+        if arguments.openscenario or arguments.openscenario2:
+            print("The parallel mode can only be used with routes and scenarios\n\n")
+            parser.print_help(sys.stdout)
+            return 1
+        try:
+            return not run_parallel(arguments)
+        except Exception:   # pylint: disable=broad-except
+            traceback.print_exc()
+            return 1
+
     scenario_runner = None
     result = True
     try:
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Support class of the MetricsLog to store the parsed information of
+CARLA recorder files on disk, so that each recording is only parsed once
+"""
+
+import copyreg
+import hashlib
+import io
+import os
+import pickle
+
+import carla
+
+from srunner.metrics.tools.metrics_parser import PARSER_VERSION
+
+# Attributes needed to rebuild the carla objects found in the parsed information
+CARLA_ATTRIBUTES = {
+    "Vector2D": ("x", "y"),
+    "Vector3D": ("x", "y", "z"),
+    "Location": ("x", "y", "z"),
+    "Rotation": ("pitch", "yaw", "roll"),
+    "Transform": ("location", "rotation"),
+    "BoundingBox": ("location", "extent", "rotation"),
+    "Color": ("r", "g", "b", "a"),
+    "LightState": ("intensity", "color", "group", "active"),
+    "VehicleControl": ("throttle", "steer", "brake", "hand_brake", "reverse", "manual_gear_shift", "gear"),
+    "GearPhysicsControl": ("ratio", "down_ratio", "up_ratio"),
+    "WheelPhysicsControl": ("tire_friction", "damping_rate", "max_steer_angle", "radius",
+                            "max_brake_torque", "max_handbrake_torque", "position"),
+    "VehiclePhysicsControl": ("torque_curve", "max_rpm", "moi", "damping_rate_full_throttle",
+                              "damping_rate_zero_throttle_clutch_engaged",
+                              "damping_rate_zero_throttle_clutch_disengaged", "use_gear_autobox",
+                              "gear_switch_time", "clutch_strength", "final_ratio", "forward_gears",
+                              "mass", "drag_coefficient", "center_of_mass", "steering_curve", "wheels",
+                              "use_sweep_wheel_collision"),
+}
+
+CARLA_ENUMS = ("TrafficLightState", "VehicleLightState", "LightGroup")
+
+
+def rebuild_carla_object(type_name, attributes):
+    """Creates a carla object and sets its attributes"""
+    carla_object = getattr(carla, type_name)()
+    for name, value in attributes.items():
+        setattr(carla_object, name, value)
+    return carla_object
+
+
+def reduce_carla_object(carla_object):
+    """Pickle reducer of the carla objects, as they can't be pickled directly"""
+    type_name = type(carla_object).__name__
+    attributes = {}
+    for name in CARLA_ATTRIBUTES[type_name]:
+        if hasattr(carla_object, name):
+            attributes[name] = getattr(carla_object, name)
+    return rebuild_carla_object, (type_name, attributes)
+
+
+def rebuild_carla_enum(type_name, value):
+    """Gets a carla enum value from its integer"""
+    return getattr(carla, type_name).values[value]
+
+
+def reduce_carla_enum(carla_enum):
+    """Pickle reducer of the carla enums"""
+    return rebuild_carla_enum, (type(carla_enum).__name__, int(carla_enum))
+
+
+def get_dispatch_table():
+    """Returns the pickle dispatch table with the reducers of the available carla types"""
+    dispatch_table = copyreg.dispatch_table.copy()
+    for type_name in CARLA_ATTRIBUTES:
+        carla_type = getattr(carla, type_name, None)
+        if isinstance(carla_type, type):
+            dispatch_table[carla_type] = reduce_carla_object
+    for type_name in CARLA_ENUMS:
+        carla_type = getattr(carla, type_name, None)
+        if isinstance(carla_type, type) and hasattr(carla_type, "values"):
+            dispatch_table[carla_type] = reduce_carla_enum
+    return dispatch_table
+
+
+class MetricsCache(object):
+    """
+    Size-bounded on-disk cache of the parsed recorder files.
+
+    Each recorder file has one entry, keyed by its real path, size, modification time
+    and the PARSER_VERSION. An entry whose key doesn't match anymore is a miss and gets
+    overwritten. When the directory grows past max_size bytes, the least recently used
+    entries are removed.
+    """
+
+    SUFFIX = ".metrics"
+
+    def __init__(self, cache_dir, max_size=2 * 1024**3):
+        """
+        Opens the cache directory, creating it if needed.
+
+        Args:
+            cache_dir (str): directory where the entries are stored.
+            max_size (int): maximum size of the directory, in bytes.
+        """
+        self._cache_dir = cache_dir
+        self._max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def get_key(recorder_file):
+        """
+        Returns the key identifying the current content of a recorder file.
+        """
+        stat = os.stat(recorder_file)
+        return (os.path.realpath(recorder_file), stat.st_size, stat.st_mtime_ns, PARSER_VERSION)
+
+    def _get_path(self, recorder_file):
+        digest = hashlib.sha1(os.path.realpath(recorder_file).encode("utf-8")).hexdigest()
+        return os.path.join(self._cache_dir, digest + self.SUFFIX)
+
+    def load(self, recorder_file):
+        """
+        Returns the parsed information of a recorder file, or None if it isn't cached.
+
+        Args:
+            recorder_file (str): path to the recorder file.
+        """
+        path = self._get_path(recorder_file)
+        try:
+            with open(path, "rb") as f:
+                key, parsed_info = pickle.load(f)
+        except (OSError, EOFError, ValueError, AttributeError, pickle.UnpicklingError):
+            return None
+
+        if key != self.get_key(recorder_file):
+            return None
+
+        # Keep track of the last use for the eviction
+        os.utime(path)
+        return parsed_info
+
+    def save(self, recorder_file, parsed_info):
+        """
+        Stores the parsed information of a recorder file, replacing the previous one.
+
+        Args:
+            recorder_file (str): path to the recorder file.
+            parsed_info: information returned by the MetricsParser.
+        """
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+        pickler.dispatch_table = get_dispatch_table()
+        pickler.dump((self.get_key(recorder_file), parsed_info))
+
+        path = self._get_path(recorder_file)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getbuffer())
+        os.replace(tmp_path, path)
+
+        self._evict(keep=path)
+
+    def clear(self):
+        """
+        Removes all the entries.
+        """
+        for path, _, _ in self._get_entries():
+            os.remove(path)
+
+    def _get_entries(self):
+        """
+        Returns a list of (path, last use, size) of the entries, oldest first.
+        """
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self._cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+
+        return sorted(entries, key=lambda entry: entry[1])
+
+    def _evict(self, keep=None):
+        """
+        Removes the least recently used entries until the directory fits in max_size.
+        """
+        entries = self._get_entries()
+        total_size = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total_size <= self._max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
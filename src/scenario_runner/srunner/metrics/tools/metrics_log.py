@@ -15,20 +15,103 @@ specific information
 """
 
 import fnmatch
+
+import numpy as np
+
+from srunner.metrics.tools.metrics_cache import MetricsCache
 from srunner.metrics.tools.metrics_parser import MetricsParser
 
+def _get_attribute(value, name):
+    """Gets a (possibly dotted) attribute of an object"""
+    for part in name.split("."):
+        value = getattr(value, part)
+    return value
+
+
 class MetricsLog(object):  # pylint: disable=too-many-public-methods
     """
     Utility class to query the log.
     """
 
+    # Numeric actor states available as arrays, and the attributes making their columns
+    ARRAY_STATES = {
+        "transform": ("location.x", "location.y", "location.z", "rotation.pitch", "rotation.yaw", "rotation.roll"),
+        "velocity": ("x", "y", "z"),
+        "angular_velocity": ("x", "y", "z"),
+        "acceleration": ("x", "y", "z"),
+    }
+
     def __init__(self, recorder):
         """
         Initializes the log class and parses it to extract the dictionaries.
+
+        Args:
+            recorder (str or iterable): string given by the recorder, or an iterable of its lines.
         """
-        # Parse the information
+        # Parse the information, frame by frame
         parser = MetricsParser(recorder)
-        self._simulation, self._actors, self._frames = parser.parse_recorder_info()
+        frames = list(parser.iter_recorder_info())
+        self._set_parsed_info((parser.simulation_info, parser.actors_info, frames))
+
+    @classmethod
+    def from_recorder_file(cls, client, recorder_file, cache_dir=None, cache_size=2 * 1024**3):
+        """
+        Creates the log of a recorder file. If a cache directory is given, the parsed
+        information is stored there, and loaded instead of parsing the file again.
+
+        Args:
+            client (carla.Client): client used to get the recorder information.
+            recorder_file (str): path to the recorder file.
+            cache_dir (str): directory of the MetricsCache. By default, no cache is used.
+            cache_size (int): maximum size of the cache directory, in bytes.
+        """
+        cache = MetricsCache(cache_dir, cache_size) if cache_dir is not None else None
+
+        parsed_info = cache.load(recorder_file) if cache is not None else None
+        if parsed_info is None:
+            recorder_info = client.show_recorder_file_info(recorder_file, True)
+            parsed_info = MetricsParser(recorder_info).parse_recorder_info()
+            if cache is not None:
+                cache.save(recorder_file, parsed_info)
+
+        log = cls.__new__(cls)
+        log._set_parsed_info(parsed_info)  # pylint: disable=protected-access
+        return log
+
+    def _set_parsed_info(self, parsed_info):
+        """
+        Sets the (simulation, actors, frames) information given by the MetricsParser.
+        """
+        self._simulation, self._actors, self._frames = parsed_info
+        self._columns = None
+
+    def _build_columns(self):
+        """
+        Builds, with one pass through the frames, the columnar index of the actor states.
+        For each actor, the arrays only span the frames between its first and last appearance.
+        """
+        appearances = {}
+        for i, frame in enumerate(self._frames):
+            for actor_id, actor_state in frame["actors"].items():
+                appearances.setdefault(actor_id, []).append((i, actor_state))
+
+        self._columns = {}
+        for actor_id, actor_appearances in appearances.items():
+            offset = actor_appearances[0][0]
+            size = actor_appearances[-1][0] - offset + 1
+            columns = {"offset": offset, "alive": np.zeros(size, dtype=bool)}
+
+            for i, actor_state in actor_appearances:
+                columns["alive"][i - offset] = True
+                for state, attributes in self.ARRAY_STATES.items():
+                    if state not in actor_state:
+                        continue
+                    if state not in columns:
+                        columns[state] = np.full((size, len(attributes)), np.nan)
+                    value = actor_state[state]
+                    columns[state][i - offset] = [_get_attribute(value, name) for name in attributes]
+
+            self._columns[actor_id] = columns
 
     ### Functions used to get general info of the simulation ###
     def get_actor_collisions(self, actor_id):
@@ -252,6 +335,62 @@ class MetricsLog(object):  # pylint: disable=too-many-public-methods
 
         return states
 
+    def _get_state_array(self, actor_id, state, first_frame=None, last_frame=None):
+        """
+        Given an actor id, returns an array with the specific numeric state of that actor during
+        a frame interval, one row per frame. Rows of frames where the state is missing are NaN.
+
+        By default, first_frame and last_frame are the start and end of the simulation, respectively.
+
+        Args:
+            actor_id (int): ID of the actor.
+            state (str): name of the state, one of ARRAY_STATES.
+            first_frame (int): First frame checked. By default, 1.
+            last_frame (int): Last frame checked. By default, max number of frames.
+        """
+        if first_frame is None:
+            first_frame = 1
+        if last_frame is None:
+            last_frame = self.get_total_frame_count()
+        if self._columns is None:
+            self._build_columns()
+
+        state_array = np.full((max(0, last_frame - first_frame + 1), len(self.ARRAY_STATES[state])), np.nan)
+
+        columns = self._columns.get(actor_id, {})
+        if state in columns:
+            start = first_frame - 1 - columns["offset"]
+            low = max(start, 0)
+            high = min(last_frame - columns["offset"], len(columns[state]))
+            if low < high:
+                state_array[low - start:high - start] = columns[state][low:high]
+
+        return state_array
+
+    def get_actor_alive_mask(self, actor_id, first_frame=None, last_frame=None):
+        """
+        Returns a boolean array telling, for each frame of the interval, whether the actor
+        is part of the frame information.
+        """
+        if first_frame is None:
+            first_frame = 1
+        if last_frame is None:
+            last_frame = self.get_total_frame_count()
+        if self._columns is None:
+            self._build_columns()
+
+        alive_mask = np.zeros(max(0, last_frame - first_frame + 1), dtype=bool)
+
+        columns = self._columns.get(actor_id, None)
+        if columns is not None:
+            start = first_frame - 1 - columns["offset"]
+            low = max(start, 0)
+            high = min(last_frame - columns["offset"], len(columns["alive"]))
+            if low < high:
+                alive_mask[low - start:high - start] = columns["alive"][low:high]
+
+        return alive_mask
+
     # Transforms
     def get_actor_transform(self, actor_id, frame):
         """
@@ -265,6 +404,13 @@ class MetricsLog(object):  # pylint: disable=too-many-public-methods
         """
         return self._get_all_actor_states(actor_id, "transform", first_frame, last_frame)
 
+    def get_all_actor_transforms_array(self, actor_id, first_frame=None, last_frame=None):
+        """
+        Returns an array (frames x [x, y, z, pitch, yaw, roll]) with all the transforms
+        of the actor at the frame interval. Missing transforms are NaN.
+        """
+        return self._get_state_array(actor_id, "transform", first_frame, last_frame)
+
     def get_actor_transforms_at_frame(self, frame, actor_list=None):
         """
         Returns a dictionary {int - carla.Transform} with the actor ID and transform
@@ -285,6 +431,13 @@ class MetricsLog(object):  # pylint: disable=too-many-public-methods
         """
         return self._get_all_actor_states(actor_id, "velocity", first_frame, last_frame)
 
+    def get_all_actor_velocities_array(self, actor_id, first_frame=None, last_frame=None):
+        """
+        Returns an array (frames x [x, y, z]) with all the velocities of the actor
+        at the frame interval. Missing velocities are NaN.
+        """
+        return self._get_state_array(actor_id, "velocity", first_frame, last_frame)
+
     def get_actor_velocities_at_frame(self, frame, actor_list=None):
         """
         Returns a dictionary {int - carla.Vector3D} with the actor ID and velocity
@@ -305,6 +458,13 @@ class MetricsLog(object):  # pylint: disable=too-many-public-methods
         """
         return self._get_all_actor_states(actor_id, "angular_velocity", first_frame, last_frame)
 
+    def get_all_actor_angular_velocities_array(self, actor_id, first_frame=None, last_frame=None):
+        """
+        Returns an array (frames x [x, y, z]) with all the angular velocities of the actor
+        at the frame interval. Missing angular velocities are NaN.
+        """
+        return self._get_state_array(actor_id, "angular_velocity", first_frame, last_frame)
+
     def get_actor_angular_velocities_at_frame(self, frame, actor_list=None):
         """
         Returns a dictionary {int - carla.Vector3D} with the actor ID and angular velocity
@@ -325,6 +485,13 @@ class MetricsLog(object):  # pylint: disable=too-many-public-methods
         """
         return self._get_all_actor_states(actor_id, "acceleration", first_frame, last_frame)
 
+    def get_all_actor_accelerations_array(self, actor_id, first_frame=None, last_frame=None):
+        """
+        Returns an array (frames x [x, y, z]) with all the accelerations of the actor
+        at the frame interval. Missing accelerations are NaN.
+        """
+        return self._get_state_array(actor_id, "acceleration", first_frame, last_frame)
+
     def get_actor_accelerations_at_frame(self, frame, actor_list=None):
         """
         Returns a dictionary {int - carla.Vector3D} with the actor ID and angular velocity
@@ -11,8 +11,13 @@ Support class of the MetricsManager to parse the information of
 the CARLA recorder into a readable dictionary
 """
 
+import io
+
 import carla
 
+# Version of the parsed information, to be increased whenever the parsing results change
+PARSER_VERSION = 1
+
 
 def parse_actor(info):
     """Returns a dictionary with the basic actor information"""
@@ -207,8 +212,14 @@ class MetricsParser(object):
     """
 
     def __init__(self, recorder_info):
-
+        """
+        Args:
+            recorder_info (str or iterable): string given by the recorder, or an iterable
+                of its lines (e.g. an opened file where it has been dumped).
+        """
         self.recorder_info = recorder_info
+        self.simulation_info = None
+        self.actors_info = None
         self.frame_list = None
         self.frame_row = None
         self.i = 0
@@ -230,311 +241,351 @@ class MetricsParser(object):
         """
         Parses the recorder into readable information.
 
-        Args:
-            recorder_info (str): string given by the recorder
+        Returns:
+            tuple: simulation information, actors information and list of frame states
         """
+        frames_info = list(self.iter_recorder_info())
+        return self.simulation_info, self.actors_info, frames_info
 
-        # Divide it into frames
-        recorder_list = self.recorder_info.split("Frame")
+    def iter_recorder_info(self):
+        """
+        Parses the recorder frame by frame, yielding the state of each frame.
 
-        # Get general information
-        header = recorder_list[0].split("\n")
-        sim_map = header[1][5:]
-        sim_date = header[2][6:]
+        Only one frame of the recorder is held in memory at a time. The actors information
+        is available at self.actors_info, and is updated as the frames are parsed. The general
+        information is available at self.simulation_info after the header has been parsed,
+        and its "total_frames" and "duration" once the whole recorder has been parsed.
+        """
+        self.simulation_info = None
+        self.actors_info = {}
+
+        header = None
+        frame = None
+        prev_frame_state = None
+
+        # Divide it into frames, keeping the last one on hold to know whether it is the annex
+        for chunk in self._split_frames():
+            if header is None:
+                # Get general information
+                header = chunk.split("\n")
+                self.simulation_info = {
+                    "map": header[1][5:],
+                    "date:": header[2][6:],
+                    "total_frames": None,
+                    "duration": None
+                }
+                continue
 
-        annex = recorder_list[-1].split("\n")
-        sim_frames = int(annex[0][3:])
-        sim_duration = float(annex[1][10:-8])
+            if frame is not None:
+                prev_frame_state = self._parse_frame(frame, prev_frame_state)
+                yield prev_frame_state
+            frame = chunk
 
-        recorder_list = recorder_list[1:-1]
+        annex = frame.split("\n")
+        self.simulation_info["total_frames"] = int(annex[0][3:])
+        self.simulation_info["duration"] = float(annex[1][10:-8])
 
-        simulation_info = {
-            "map": sim_map,
-            "date:": sim_date,
-            "total_frames": sim_frames,
-            "duration": sim_duration
-        }
+    def _split_frames(self):
+        """
+        Yields the recorder divided by the word "Frame", reading it line by line.
+        """
+        recorder_info = self.recorder_info
+        if isinstance(recorder_info, str):
+            recorder_info = io.StringIO(recorder_info)
+
+        chunk = []
+        for line in recorder_info:
+            if "Frame" in line:
+                pieces = line.split("Frame")
+                chunk.append(pieces[0])
+                for piece in pieces[1:]:
+                    yield "".join(chunk)
+                    chunk = [piece]
+            else:
+                chunk.append(line)
+
+        yield "".join(chunk)
+
+    def _parse_frame(self, frame, prev_frame_state):
+        """
+        Parses one frame of the recorder.
 
-        actors_info = {}
-        frames_info = []
-
-        for frame in recorder_list:
-
-            # Divide the frame in lines
-            self.frame_list = frame.split("\n")
-
-            # Get the general frame information
-            frame_info = self.frame_list[0].split(" ")
-            frame_number = int(frame_info[1])
-            frame_time = float(frame_info[3])
-
-            try:
-                prev_frame = frames_info[frame_number - 2]
-                prev_time = prev_frame["frame"]["elapsed_time"]
-                delta_time = round(frame_time - prev_time, 6)
-            except IndexError:
-                delta_time = 0
-
-            # Variable to store all the information about the frame
-            frame_state = {
-                "frame": {
-                    "elapsed_time": frame_time,
-                    "delta_time": delta_time,
-                    "platform_time": None
-                },
-                "actors": {},
-                "events":{
-                    "scene_lights": {},
-                    "physics_control": {},
-                    "traffic_light_state_time": {},
-                    "collisions": {}
-                }
+        Args:
+            frame (str): text of the frame, without the leading "Frame"
+            prev_frame_state (dict): state of the previous frame, None for the first one
+        """
+        # Divide the frame in lines
+        self.frame_list = frame.split("\n")
+
+        # Get the general frame information
+        frame_info = self.frame_list[0].split(" ")
+        frame_number = int(frame_info[1])
+        frame_time = float(frame_info[3])
+
+        if prev_frame_state is not None and frame_number > 1:
+            prev_time = prev_frame_state["frame"]["elapsed_time"]
+            delta_time = round(frame_time - prev_time, 6)
+        else:
+            delta_time = 0
+
+        # Variable to store all the information about the frame
+        frame_state = {
+            "frame": {
+                "elapsed_time": frame_time,
+                "delta_time": delta_time,
+                "platform_time": None
+            },
+            "actors": {},
+            "events":{
+                "scene_lights": {},
+                "physics_control": {},
+                "traffic_light_state_time": {},
+                "collisions": {}
             }
+        }
+
+        # Loop through all the other rows.
+        self.i = 0
+        self.next_row()
+
+        while self.frame_row.startswith(' Create') or self.frame_row.startswith('  '):
+
+            if self.frame_row.startswith(' Create'):
+                elements = self.get_row_elements(1, " ")
+                actor_id = int(elements[1][:-1])
+
+                actor = parse_actor(elements)
+                self.actors_info.update({actor_id: actor})
+                self.actors_info[actor_id].update({"created": frame_number})
+            else:
+                elements = self.get_row_elements(2, " = ")
+                self.actors_info[actor_id].update({elements[0]: elements[1]})
 
-            # Loop through all the other rows.
-            self.i = 0
             self.next_row()
 
-            while self.frame_row.startswith(' Create') or self.frame_row.startswith('  '):
+        while self.frame_row.startswith(' Destroy'):
 
-                if self.frame_row.startswith(' Create'):
-                    elements = self.get_row_elements(1, " ")
-                    actor_id = int(elements[1][:-1])
+            elements = self.get_row_elements(1, " ")
 
-                    actor = parse_actor(elements)
-                    actors_info.update({actor_id: actor})
-                    actors_info[actor_id].update({"created": frame_number})
-                else:
-                    elements = self.get_row_elements(2, " = ")
-                    actors_info[actor_id].update({elements[0]: elements[1]})
+            actor_id = int(elements[1])
+            self.actors_info[actor_id].update({"destroyed": frame_number})
 
-                self.next_row()
+            self.next_row()
 
-            while self.frame_row.startswith(' Destroy'):
+        while self.frame_row.startswith(' Collision'):
 
-                elements = self.get_row_elements(1, " ")
+            elements = self.get_row_elements(1, " ")
 
-                actor_id = int(elements[1])
-                actors_info[actor_id].update({"destroyed": frame_number})
+            actor_id = int(elements[4])
+            other_id = int(elements[-1])
 
-                self.next_row()
+            if actor_id not in frame_state["events"]["collisions"]:
+                frame_state["events"]["collisions"][actor_id] = [other_id]
+            else:
+                collisions = frame_state["events"]["collisions"][actor_id]
+                collisions.append(other_id)
+                frame_state["events"]["collisions"].update({actor_id: collisions})
 
-            while self.frame_row.startswith(' Collision'):
+            self.next_row()
 
-                elements = self.get_row_elements(1, " ")
+        while self.frame_row.startswith(' Parenting'):
 
-                actor_id = int(elements[4])
-                other_id = int(elements[-1])
+            elements = self.get_row_elements(1, " ")
 
-                if actor_id not in frame_state["events"]["collisions"]:
-                    frame_state["events"]["collisions"][actor_id] = [other_id]
-                else:
-                    collisions = frame_state["events"]["collisions"][actor_id]
-                    collisions.append(other_id)
-                    frame_state["events"]["collisions"].update({actor_id: collisions})
+            actor_id = int(elements[1])
+            parent_id = int(elements[3])
+            self.actors_info[actor_id].update({"parent": parent_id})
 
-                self.next_row()
+            self.next_row()
 
-            while self.frame_row.startswith(' Parenting'):
+        if self.frame_row.startswith(' Positions'):
+            self.next_row()
 
-                elements = self.get_row_elements(1, " ")
+            while self.frame_row.startswith('  '):
 
+                elements = self.get_row_elements(2, " ")
                 actor_id = int(elements[1])
-                parent_id = int(elements[3])
-                actors_info[actor_id].update({"parent": parent_id})
 
-                self.next_row()
+                transform = parse_transform(elements)
+                frame_state["actors"].update({actor_id: {"transform": transform}})
 
-            if self.frame_row.startswith(' Positions'):
                 self.next_row()
 
-                while self.frame_row.startswith('  '):
-
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
+        if self.frame_row.startswith(' State traffic lights'):
+            self.next_row()
 
-                    transform = parse_transform(elements)
-                    frame_state["actors"].update({actor_id: {"transform": transform}})
+            while self.frame_row.startswith('  '):
 
-                    self.next_row()
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
 
-            if self.frame_row.startswith(' State traffic lights'):
+                traffic_light = parse_traffic_light(elements)
+                frame_state["actors"].update({actor_id: traffic_light})
                 self.next_row()
 
-                while self.frame_row.startswith('  '):
+        if self.frame_row.startswith(' Vehicle animations'):
+            self.next_row()
 
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
+            while self.frame_row.startswith('  '):
 
-                    traffic_light = parse_traffic_light(elements)
-                    frame_state["actors"].update({actor_id: traffic_light})
-                    self.next_row()
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
 
-            if self.frame_row.startswith(' Vehicle animations'):
+                control = parse_control(elements)
+                frame_state["actors"][actor_id].update({"control": control})
                 self.next_row()
 
-                while self.frame_row.startswith('  '):
-
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
+        if self.frame_row.startswith(' Walker animations'):
+            self.next_row()
 
-                    control = parse_control(elements)
-                    frame_state["actors"][actor_id].update({"control": control})
-                    self.next_row()
+            while self.frame_row.startswith('  '):
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
 
-            if self.frame_row.startswith(' Walker animations'):
+                frame_state["actors"][actor_id].update({"speed": elements[3]})
                 self.next_row()
 
-                while self.frame_row.startswith('  '):
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
+        if self.frame_row.startswith(' Vehicle light animations'):
+            self.next_row()
 
-                    frame_state["actors"][actor_id].update({"speed": elements[3]})
-                    self.next_row()
+            while self.frame_row.startswith('  '):
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
 
-            if self.frame_row.startswith(' Vehicle light animations'):
+                lights = parse_vehicle_lights(elements)
+                frame_state["actors"][actor_id].update({"lights": lights})
                 self.next_row()
 
-                while self.frame_row.startswith('  '):
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
+        if self.frame_row.startswith(' Scene light changes'):
+            self.next_row()
 
-                    lights = parse_vehicle_lights(elements)
-                    frame_state["actors"][actor_id].update({"lights": lights})
-                    self.next_row()
+            while self.frame_row.startswith('  '):
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
 
-            if self.frame_row.startswith(' Scene light changes'):
+                scene_light = parse_scene_lights(elements)
+                frame_state["events"]["scene_lights"].update({actor_id: scene_light})
                 self.next_row()
 
-                while self.frame_row.startswith('  '):
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
+        if self.frame_row.startswith(' Dynamic actors'):
+            self.next_row()
 
-                    scene_light = parse_scene_lights(elements)
-                    frame_state["events"]["scene_lights"].update({actor_id: scene_light})
-                    self.next_row()
+            while self.frame_row.startswith('  '):
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
 
-            if self.frame_row.startswith(' Dynamic actors'):
-                self.next_row()
+                velocity = parse_velocity(elements)
+                frame_state["actors"][actor_id].update({"velocity": velocity})
 
-                while self.frame_row.startswith('  '):
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
+                angular_v = parse_angular_velocity(elements)
+                frame_state["actors"][actor_id].update({"angular_velocity": angular_v})
 
-                    velocity = parse_velocity(elements)
-                    frame_state["actors"][actor_id].update({"velocity": velocity})
+                if delta_time == 0:
+                    acceleration = carla.Vector3D(0, 0, 0)
+                else:
+                    prev_velocity = frame_state["actors"][actor_id]["velocity"]
+                    acceleration = (velocity - prev_velocity) / delta_time
 
-                    angular_v = parse_angular_velocity(elements)
-                    frame_state["actors"][actor_id].update({"angular_velocity": angular_v})
+                frame_state["actors"][actor_id].update({"acceleration": acceleration})
+                self.next_row()
 
-                    if delta_time == 0:
-                        acceleration = carla.Vector3D(0, 0, 0)
-                    else:
-                        prev_velocity = frame_state["actors"][actor_id]["velocity"]
-                        acceleration = (velocity - prev_velocity) / delta_time
+        if self.frame_row.startswith(' Actor bounding boxes'):
+            self.next_row()
 
-                    frame_state["actors"][actor_id].update({"acceleration": acceleration})
-                    self.next_row()
+            while self.frame_row.startswith('  '):
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
 
-            if self.frame_row.startswith(' Actor bounding boxes'):
+                bbox = parse_bounding_box(elements)
+                self.actors_info[actor_id].update({"bounding_box": bbox})
                 self.next_row()
 
-                while self.frame_row.startswith('  '):
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
+        if self.frame_row.startswith(' Actor trigger volumes'):
+            self.next_row()
 
-                    bbox = parse_bounding_box(elements)
-                    actors_info[actor_id].update({"bounding_box": bbox})
-                    self.next_row()
+            while self.frame_row.startswith('  '):
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
 
-            if self.frame_row.startswith(' Actor trigger volumes'):
+                trigvol = parse_bounding_box(elements)
+                self.actors_info[actor_id].update({"trigger_volume": trigvol})
                 self.next_row()
 
-                while self.frame_row.startswith('  '):
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
+        if self.frame_row.startswith(' Current platform time'):
 
-                    trigvol = parse_bounding_box(elements)
-                    actors_info[actor_id].update({"trigger_volume": trigvol})
-                    self.next_row()
+            elements = self.get_row_elements(1, " ")
 
-            if self.frame_row.startswith(' Current platform time'):
+            platform_time = float(elements[-1])
+            frame_state["frame"]["platform_time"] = platform_time
+            self.next_row()
 
-                elements = self.get_row_elements(1, " ")
+        if self.frame_row.startswith(' Physics Control'):
+            self.next_row()
 
-                platform_time = float(elements[-1])
-                frame_state["frame"]["platform_time"] = platform_time
-                self.next_row()
+            actor_id = None
+            while self.frame_row.startswith('  '):
 
-            if self.frame_row.startswith(' Physics Control'):
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
+                physics_control = carla.VehiclePhysicsControl()
                 self.next_row()
 
-                actor_id = None
-                while self.frame_row.startswith('  '):
+                forward_gears = []
+                wheels = []
+                while self.frame_row.startswith('   '):
 
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
-                    physics_control = carla.VehiclePhysicsControl()
-                    self.next_row()
+                    if self.frame_row.startswith('    '):
+                        elements = self.get_row_elements(4, " ")
+                        if elements[0] == "gear":
+                            forward_gears.append(parse_gears_control(elements))
+                        elif elements[0] == "wheel":
+                            wheels.append(parse_wheels_control(elements))
 
-                    forward_gears = []
-                    wheels = []
-                    while self.frame_row.startswith('   '):
-
-                        if self.frame_row.startswith('    '):
-                            elements = self.get_row_elements(4, " ")
-                            if elements[0] == "gear":
-                                forward_gears.append(parse_gears_control(elements))
-                            elif elements[0] == "wheel":
-                                wheels.append(parse_wheels_control(elements))
+                    else:
+                        elements = self.get_row_elements(3, " = ")
+                        name = elements[0]
+
+                        if name == "center_of_mass":
+                            values = elements[1].split(" ")
+                            value = carla.Vector3D(
+                                float(values[0][1:-1]),
+                                float(values[1][:-1]),
+                                float(values[2][:-1]),
+                            )
+                            setattr(physics_control, name, value)
+                        elif name == "torque_curve" or name == "steering_curve":
+                            values = elements[1].split(" ")
+                            value = parse_vector_list(values)
+                            setattr(physics_control, name, value)
+
+                        elif name == "use_gear_auto_box":
+                            name = "use_gear_autobox"
+                            value = True if elements[1] == "true" else False
+                            setattr(physics_control, name, value)
+
+                        elif "forward_gears" in name or "wheels" in name:
+                            pass
 
                         else:
-                            elements = self.get_row_elements(3, " = ")
-                            name = elements[0]
-
-                            if name == "center_of_mass":
-                                values = elements[1].split(" ")
-                                value = carla.Vector3D(
-                                    float(values[0][1:-1]),
-                                    float(values[1][:-1]),
-                                    float(values[2][:-1]),
-                                )
-                                setattr(physics_control, name, value)
-                            elif name == "torque_curve" or name == "steering_curve":
-                                values = elements[1].split(" ")
-                                value = parse_vector_list(values)
-                                setattr(physics_control, name, value)
-
-                            elif name == "use_gear_auto_box":
-                                name = "use_gear_autobox"
-                                value = True if elements[1] == "true" else False
-                                setattr(physics_control, name, value)
-
-                            elif "forward_gears" in name or "wheels" in name:
-                                pass
-
-                            else:
-                                name = name.lower()
-                                value = float(elements[1])
-                                setattr(physics_control, name, value)
-
-                        self.next_row()
-
-                    setattr(physics_control, "forward_gears", forward_gears)
-                    setattr(physics_control, "wheels", wheels)
-                    frame_state["events"]["physics_control"].update({actor_id: physics_control})
-
-            if self.frame_row.startswith(' Traffic Light time events'):
-                self.next_row()
+                            name = name.lower()
+                            value = float(elements[1])
+                            setattr(physics_control, name, value)
 
-                while self.frame_row.startswith('  '):
-                    elements = self.get_row_elements(2, " ")
-                    actor_id = int(elements[1])
-
-                    state_times = parse_state_times(elements)
-                    frame_state["events"]["traffic_light_state_time"].update({actor_id: state_times})
                     self.next_row()
 
-            frames_info.append(frame_state)
+                setattr(physics_control, "forward_gears", forward_gears)
+                setattr(physics_control, "wheels", wheels)
+                frame_state["events"]["physics_control"].update({actor_id: physics_control})
+
+        if self.frame_row.startswith(' Traffic Light time events'):
+            self.next_row()
+
+            while self.frame_row.startswith('  '):
+                elements = self.get_row_elements(2, " ")
+                actor_id = int(elements[1])
+
+                state_times = parse_state_times(elements)
+                frame_state["events"]["traffic_light_state_time"].update({actor_id: state_times})
+                self.next_row()
 
-        return simulation_info, actors_info, frames_info
+        return frame_state
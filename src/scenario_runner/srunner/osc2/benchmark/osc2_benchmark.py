@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Benchmark of the OSC2 front end. It times the preprocessing, lexer, parser, AST build and
+symbol resolution phases over a corpus of scenario files of increasing size, so that
+regressions of the parsing performance are visible.
+
+Run from the scenario_runner folder:
+
+    python -m srunner.osc2.benchmark.osc2_benchmark [--ll] [--output results.json]
+
+The corpus at 'corpus/' is written by `--generate`, and can be extended by adding more files.
+"""
+
+from __future__ import print_function
+
+import argparse
+import glob
+import json
+import os
+import time
+from collections import OrderedDict
+
+from antlr4.tree.Tree import ParseTreeWalker
+
+from srunner.osc2.ast_manager.ast_builder import ASTBuilder
+from srunner.osc2.ast_manager.ast_listener import ASTListener
+from srunner.osc2.ast_manager.ast_walker import ASTWalker
+from srunner.osc2.error_manager.error_listener import OscErrorListener
+from srunner.osc2.osc_preprocess.import_file import clear_file_cache
+from srunner.osc2.osc_preprocess.pre_process import Preprocess
+from srunner.tools.osc2_helper import OSC2Helper
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+CORPUS_SIZES = [5, 20, 50, 100]  # Blocks of declarations of each generated file
+PHASES = ["preprocess", "lexer", "parser", "ast_build", "symbol_resolution"]
+
+BASE_FILE = """# Types shared by all the files of the corpus
+type length is SI(m: 1)
+type time is SI(s: 1)
+type speed is SI(m: 1, s: -1)
+unit m of length is SI(m: 1, factor: 1)
+unit s of time is SI(s: 1, factor: 1)
+unit mps of speed is SI(m: 1, s: -1, factor: 1)
+
+enum color: [red, green, blue]
+
+"""
+
+BLOCK = """struct s{i}:
+    a{i}: int = {value}
+    b{i}: float = {sum}
+    c{i}: bool = (a{i} > 3 and not (a{i} < 1)) or a{i} == 2
+    d{i}: color = color!green
+    e{i}: int = a{i} > 2 ? ((((a{i} + 1) * 2) - 3) % 4) : -(a{i} - (1 + (2 * (3 - a{i}))))
+
+actor car{i}:
+    max_speed: speed = {speed}mps
+    car_length: length = 4.5m
+
+scenario sc{i}:
+    v{i}: car{i}
+    x{i}: s{i}
+    keep(v{i}.max_speed <= 50mps)
+    do serial:
+        wait elapsed({wait}s)
+
+"""
+
+
+def generate_corpus(corpus_dir=CORPUS_DIR, sizes=None):
+    """
+    Writes the files of the corpus, which import a common file with the types
+
+        :param corpus_dir (str): folder of the corpus
+        :param sizes (list of int): number of blocks of declarations of each file
+    """
+    if not os.path.isdir(corpus_dir):
+        os.makedirs(corpus_dir)
+    with open(os.path.join(corpus_dir, "base.osc"), "w", encoding="utf-8") as fd:
+        fd.write(BASE_FILE)
+
+    for size in sizes or CORPUS_SIZES:
+        content = "import base.osc\n\n"
+        for i in range(size):
+            terms = ["(a{} * {} - {}) / {}".format(i, j + 1, j, j + 2) for j in range(4)]
+            content += BLOCK.format(i=i, value=i + 1, sum=" + ".join(terms), speed=10 + i, wait=i % 5 + 1)
+        with open(os.path.join(corpus_dir, "scenario_{:03d}.osc".format(size)), "w", encoding="utf-8") as fd:
+            fd.write(content)
+
+
+class SymbolResolver(ASTListener):
+
+    """
+    Resolves the identifier references of the AST through the scopes of their declarations,
+    as done by the visitors creating the scenario
+    """
+
+    def __init__(self):
+        self.scopes = []
+        self.resolved = 0
+        self.unresolved = 0
+
+    def enter_node(self, node):
+        """Keeps track of the scope of the declarations"""
+        scope = node.get_scope()
+        self.scopes.append(scope if scope is not None else (self.scopes[-1] if self.scopes else None))
+
+    def exit_node(self, _node):
+        """Leaves the scope of the node"""
+        self.scopes.pop()
+
+    def enter_identifier_reference(self, node):
+        """Resolves the first field of the reference"""
+        scope = next((s for s in reversed(self.scopes[:-1]) if hasattr(s, "resolve")), None)
+        if scope is not None and scope.resolve(node.name.split(".")[0]) is not None:
+            self.resolved += 1
+        else:
+            self.unresolved += 1
+
+
+class ResolverWalker(ASTWalker):
+
+    """
+    AST walker notifying the resolver of all the nodes, besides their specific listeners
+    """
+
+    def enter_node(self, listener, t):
+        listener.enter_node(t)
+        t.enter_node(listener)
+
+    def exit_node(self, listener, t):
+        t.exit_node(listener)
+        listener.exit_node(t)
+
+
+def run_file(osc2_file, two_stage=True):
+    """
+    Returns the time of each phase for a scenario file, in seconds
+
+        :param osc2_file (str): path of the file, relative to the current directory
+        :param two_stage (bool): whether or not the SLL prediction is tried before the full LL one
+    """
+    times = OrderedDict()
+    clear_file_cache()
+
+    start = time.perf_counter()
+    input_stream, _ = Preprocess(osc2_file).import_process()
+    times["preprocess"] = time.perf_counter() - start
+
+    error_listener = OscErrorListener(input_stream)
+    start = time.perf_counter()
+    tokens = OSC2Helper.gen_token_stream(input_stream, error_listener)
+    tokens.fill()
+    times["lexer"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parse_tree = OSC2Helper.parse_osc2(tokens, error_listener, two_stage)
+    times["parser"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ast_builder = ASTBuilder()
+    ParseTreeWalker().walk(ast_builder, parse_tree)
+    ast_tree = ast_builder.get_ast()
+    times["ast_build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ResolverWalker().walk(SymbolResolver(), ast_tree)
+    times["symbol_resolution"] = time.perf_counter() - start
+
+    return times
+
+
+def run_benchmark(corpus_dir=CORPUS_DIR, repetitions=3, two_stage=True):
+    """
+    Runs the benchmark over all the files of the corpus, returning the best time of each phase
+
+        :param corpus_dir (str): folder of the corpus
+        :param repetitions (int): times each file is processed
+        :param two_stage (bool): whether or not the SLL prediction is tried before the full LL one
+    """
+    results = []
+    cwd = os.getcwd()
+    # The preprocessing takes paths relative to the current directory
+    os.chdir(corpus_dir)
+    try:
+        for filename in sorted(glob.glob("scenario_*.osc")):
+            with open(filename, encoding="utf-8") as fd:
+                lines = len(fd.readlines())
+            runs = [run_file(filename, two_stage) for _ in range(repetitions)]
+            result = OrderedDict([("file", filename), ("lines", lines)])
+            for phase in PHASES:
+                result[phase] = min(run[phase] for run in runs)
+            result["total"] = sum(result[phase] for phase in PHASES)
+            results.append(result)
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def print_results(results):
+    """
+    Prints the results as a table, in milliseconds
+    """
+    header = ["file", "lines"] + PHASES + ["total"]
+    print(" ".join("{:>18}".format(name) for name in header))
+    for result in results:
+        values = [result["file"], str(result["lines"])]
+        values += ["{:.1f}".format(result[name] * 1000) for name in PHASES + ["total"]]
+        print(" ".join("{:>18}".format(value) for value in values))
+
+
+def main():
+    """
+    main function
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the OSC2 front end")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="Folder of the .osc files (default: corpus/)")
+    parser.add_argument("--repetitions", default=3, type=int, help="Times each file is processed (default: 3)")
+    parser.add_argument("--ll", action="store_true", help="Only use the full LL prediction")
+    parser.add_argument("--output", default=None, help="JSON file where the results are written")
+    parser.add_argument("--generate", action="store_true", help="Writes the files of the corpus and exits")
+    arguments = parser.parse_args()
+
+    if arguments.generate:
+        generate_corpus(arguments.corpus)
+        return
+
+    results = run_benchmark(arguments.corpus, arguments.repetitions, not arguments.ll)
+    print_results(results)
+
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as fd:
+            json.dump({"two_stage": not arguments.ll, "results": results}, fd, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ class OscErrorListener(ErrorListener):
     def __init__(self, src):
         super(ErrorListener, self).__init__()
         self.src = src
+        self.error_count = 0
 
     def getWrongToken(self, t: Token):
         if t is None:
@@ -47,6 +48,7 @@ class OscErrorListener(ErrorListener):
 
     # Syntax error
     def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.error_count += 1
         token = recognizer.getCurrentToken()
         token_name = self.getWrongToken(token)
 
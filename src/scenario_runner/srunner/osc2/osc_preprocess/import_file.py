@@ -1,23 +1,40 @@
 """
 The referenced file class
 __base_path: file path
-__file: The file itself
+__canonical_path: absolute path with the symbolic links resolved, identifying the file
 """
+import os
 import queue
 
+# Files already read, shared by all the scenarios of the process
+# canonical path - (modification time, size), content, number of lines, import paths, end of file column
+_file_cache = {}
+
+
+def clear_file_cache():
+    """
+    Forgets the content and imports of all the files read
+    """
+    _file_cache.clear()
+
 
 class ImportFile:
     def __init__(self, base_path):
         self.__base_path = base_path
-        self.__file = open(base_path, encoding="utf-8")
+        self.__canonical_path = os.path.realpath(base_path)
+        self.__data = None
 
     # Get current path
     def get_path(self):
         return self.__base_path
 
+    # Get the path identifying the file, the same for all the relative paths to it
+    def get_canonical_path(self):
+        return self.__canonical_path
+
     # Verify that it is the same file by comparing whether the paths are the same
     def same_as(self, another_file):
-        if self.__base_path == another_file.get_path():
+        if self.__canonical_path == another_file.get_canonical_path():
             return True
         return False
 
@@ -35,62 +52,80 @@ class ImportFile:
         true_path = current_path.rsplit("/", up_levels)[0] + "/" + import_file_path[-1]
         return true_path
 
-    # Get import members and return a queue of members
-    def get_import_members(self):
-        file = open(self.get_path(), encoding="utf-8")
-        is_continue = True
-        import_files = queue.Queue()
-        while is_continue:
-            current_line = file.readline().strip()
-            # comment line
-            if current_line.startswith("#"):
-                continue
-            # blank line
-            elif not len(current_line):
+    def __load(self):
+        """
+        Reads the file, unless it is cached and hasn't been modified since
+        """
+        if self.__data is not None:
+            return self.__data
+
+        stat = os.stat(self.__canonical_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        data = _file_cache.get(self.__canonical_path, None)
+        if data is None or data[0] != signature:
+            with open(self.__canonical_path, encoding="utf-8") as file:
+                text = file.read()
+            data = (signature,) + self.__parse(text)
+            _file_cache[self.__canonical_path] = data
+
+        self.__data = data
+        return data
+
+    @staticmethod
+    def __parse(text):
+        """
+        Returns the content with the imports commented out, its number of lines,
+        the relative paths of the imports and, if the last line isn't complete, its length
+        """
+        lines = text.split("\n")
+        lines = [line + "\n" for line in lines[:-1]] + ([lines[-1]] if lines[-1] else [])
+
+        # Import lines are at the beginning of the file, before any other statement
+        imports = []
+        for line in lines:
+            current_line = line.strip()
+            # comment line or blank line
+            if current_line.startswith("#") or not len(current_line):
                 continue
             # import line
             elif current_line.startswith("import"):
                 # Gets the relative path to the referenced file
                 current_line = current_line.lstrip("import")
                 current_line = current_line.lstrip(" ")
-                # The absolute path to the file converted to Import
-                import_file_path = self.get_true_path(current_line)
-                import_files.put(ImportFile(import_file_path))
+                imports.append(current_line)
             # Other lines, exit
             else:
-                is_continue = False
-                file.close()
+                break
+
+        # In order to locate errors, leave the original file line number unchanged
+        content = "".join(
+            "#" + line if line.startswith("import") else line for line in lines
+        )
+        if lines and lines[-1].endswith("\n"):
+            eof_column = None
+        else:
+            eof_column = len(lines[-1]) if lines else 0
+        return content, len(lines), imports, eof_column
+
+    # Get import members and return a queue of members
+    def get_import_members(self):
+        import_files = queue.Queue()
+        for import_path in self.__load()[3]:
+            # The absolute path to the file converted to Import
+            import_files.put(ImportFile(self.get_true_path(import_path)))
         return import_files
 
     # Gets the content of the import file and returns the number of lines
     def get_content(self):
-        lines = -1  # count the number of rows
-        content = ""
-        file = open(self.get_path(), encoding="utf-8")
-        current_line = "start"
-        pre_line = ""
-        while current_line:
-            lines += 1
-            pre_line = current_line
-            current_line = file.readline()
-            # In order to locate errors, leave the original file line number unchanged
-            if current_line.startswith("import"):
-                content += "#" + current_line
-                # content += current_line
-                continue
-            else:
-                content += current_line
-        if pre_line.endswith("\n"):
-            return content, lines
-        else:
-            index = len(pre_line)
+        _, content, lines, _, eof_column = self.__load()
+        if eof_column is not None:
             print(
                 "[Error] file '"
                 + self.get_path()
                 + "' line "
                 + lines.__str__()
                 + ":"
-                + index.__str__()
+                + eof_column.__str__()
                 + " mismatched input '<EOF>'"
             )
-            return content, lines
+        return content, lines
@@ -1,3 +1,6 @@
+from bisect import bisect_left
+
+
 class ImportMsg:
     def __init__(self):
         self.files = []
@@ -9,9 +12,10 @@ class ImportMsg:
 
     # Enter the old line and return the file and the new line
     def get_msg(self, line):
-        for i in range(len(self.index)):
-            if line <= self.index[i]:
-                return self.files[i - 1], line - self.index[i - 1]
+        # The index holds the accumulated number of lines, so it is sorted
+        i = bisect_left(self.index, line)
+        if i < len(self.index):
+            return self.files[i - 1], line - self.index[i - 1]
         print("relocation failed!")
         return
 
@@ -1,6 +1,8 @@
 # Preprocess the osc file to expand the import
 import os
 
+from antlr4.InputStream import InputStream
+
 from srunner.osc2.osc_preprocess.import_file import ImportFile
 
 # File preprocessor class
@@ -13,32 +15,28 @@ class Preprocess:
         self.import_msg = import_msg
         # The path to the current file, converted to an absolute path
         self.current_path = os.getcwd() + "/" + current_path
-        # invocation stack
+        # invocation stack, and the canonical paths of its files
         self.stack = []
-        # invocation record
-        self.note = []
-        # final documents
-        self.result = "result"
-        self.file = None
-
-    # Determine whether it is recorded
-    def exit(self, current, note):
-        for member in note:
-            if current.same_as(member):
-                return True
-        return False
-
-    # Return import preprocessing results and import information
+        self.stack_paths = set()
+        # canonical paths of the processed files
+        self.note = set()
+        # contents of the processed files, in order
+        self.result = []
+
+    # Return import preprocessing results and import information.
+    # The result is an input stream with all the imports expanded, whose lines
+    # are mapped back to their original files by the import information
     def import_process(self):
-        self.file = open(self.result, "w+", encoding="utf-8")
+        # The import information maps the lines of the last file processed
+        self.import_msg.clear_msg()
         current = ImportFile(self.current_path)
         self.__import_process(current)
-        self.file.close()
-        return self.result, self.import_msg
+        return InputStream("".join(self.result)), self.import_msg
 
     def __import_process(self, current):
         # Record the current node to the call stack
         self.stack.append(current)
+        self.stack_paths.add(current.get_canonical_path())
         # Get the child node and store it in the queue
         child_queue = current.get_import_members()
 
@@ -46,19 +44,20 @@ class Preprocess:
         while not child_queue.empty():
             child = child_queue.get()
             # If the child node is already contained in the stack, it is a circular reference
-            if self.exit(child, self.stack):
-                child.get_path()
+            if child.get_canonical_path() in self.stack_paths:
                 msg = "[Error] circular import file " + child.get_path()
                 LOG_ERROR(msg)
                 return
             # If the child node appears in note, it is a duplicate reference
-            if self.exit(child, self.note):
+            if child.get_canonical_path() in self.note:
                 continue
             self.__import_process(child)
         # The child node is processed, and the current node is processed
+        self.stack.pop()
+        self.stack_paths.discard(current.get_canonical_path())
         # Record
-        self.note.append(current)
+        self.note.add(current.get_canonical_path())
         # Write content, record import information
         content, line = current.get_content()
-        self.file.write(content)
+        self.result.append(content)
         self.import_msg.add(current.get_path(), line)
@@ -11,6 +11,7 @@ except ImportError:
 ERROR_WITH_EXIT = False
 ERROR_COUNT = 0
 ERROR_MAX_COUNT = 10  # Output the maximum number of errors
+REPORT_COUNT = 0  # Warnings and errors reported, including the ones collected by log_msg
 LOG_LEVEL = logging.ERROR  # The lowest level of output logs
 LOG_FORMAT = "%(message)s "  # Output log format
 DATE_FORMAT = "%Y-%m-%d  %H:%M:%S %a "  # Format of the output time
@@ -79,6 +80,9 @@ def LOG_INFO(msg, token=None, line=None, column=None):
 
 
 def LOG_WARNING(msg, token=None, line=None, column=None):
+    global REPORT_COUNT
+
+    REPORT_COUNT += 1
     # Log information required when running run_symbol_testcases.py
     run_log_msg = ""
     if token is not None:
@@ -121,7 +125,9 @@ def LOG_ERROR(msg, token=None, line=None, column=None):
     global ERROR_WITH_EXIT
     global ERROR_COUNT
     global ERROR_MAX_COUNT
+    global REPORT_COUNT
 
+    REPORT_COUNT += 1
     # Log information required when running run_symbol_testcases.py
     run_log_msg = ""
     if token is not None:
@@ -171,7 +177,9 @@ def LOG_CRITICAL(msg, token=None, line=None, column=None):
     global ERROR_WITH_EXIT
     global ERROR_COUNT
     global ERROR_MAX_COUNT
+    global REPORT_COUNT
 
+    REPORT_COUNT += 1
     if token is not None:
         file_path, line = import_msg.get_msg(token.line)
         msg = (
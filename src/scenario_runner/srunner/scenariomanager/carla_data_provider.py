@@ -19,7 +19,11 @@ from numpy import random
 from six import iteritems
 
 import carla
-from agents.navigation.global_route_planner import GlobalRoutePlanner
+from agents.navigation.global_route_planner import get_global_route_planner
+from agents.tools.waypoint_cache import WaypointCache
+from agents.tools.world_state_cache import WorldStateCache
+
+from srunner.tools.lane_network import LaneNetwork
 
 
 def calculate_velocity(actor):
@@ -59,6 +63,7 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
     _map = None
     _sync_flag = False
     _spawn_points = None
+    _map_spawn_points = None  # Spawn points of the map, in their original order
     _spawn_index = 0
     _blueprint_library = None
     _all_actors = None
@@ -68,7 +73,12 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
     _rng = random.RandomState(_random_seed)
     _local_planner = None
     _grp = None
+    _waypoint_cache = None
+    _lane_network = None
+    _traffic_light_annotations = {}
     _runtime_init_flag = False
+    _warm_world_flag = False
+    _warm_world_data = None  # Map derived data kept by cleanup() in warm world mode
     _lock = threading.Lock()
 
     @staticmethod
@@ -131,29 +141,64 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
             CarlaDataProvider.register_actor(actor, transform)
 
     @staticmethod
-    def on_carla_tick():
+    def on_carla_tick(snapshot=None):
         """
         Callback from CARLA
+
+        The registered actors are refreshed in one pass from a world snapshot,
+        by default the current one. Without world nor snapshot, each actor is queried.
         """
         with CarlaDataProvider._lock:
-            for actor in CarlaDataProvider._actor_velocity_map:
-                if actor is not None and actor.is_alive:
-                    CarlaDataProvider._actor_velocity_map[actor] = calculate_velocity(actor)
-
-            for actor in CarlaDataProvider._actor_location_map:
-                if actor is not None and actor.is_alive:
-                    CarlaDataProvider._actor_location_map[actor] = actor.get_location()
-
-            for actor in CarlaDataProvider._actor_transform_map:
-                if actor is not None and actor.is_alive:
-                    CarlaDataProvider._actor_transform_map[actor] = actor.get_transform()
-
             world = CarlaDataProvider._world
             if world is None:
                 print("WARNING: CarlaDataProvider couldn't find the world")
+            elif snapshot is None:
+                snapshot = world.get_snapshot()
+
+            if snapshot is not None:
+                CarlaDataProvider._refresh_from_snapshot(snapshot)
+            else:
+                CarlaDataProvider._refresh_from_actors()
 
             CarlaDataProvider._all_actors = None
 
+    @staticmethod
+    def _refresh_from_snapshot(snapshot):
+        """
+        Fills the velocity, location and transform maps from a carla.WorldSnapshot.
+        Actors missing from the snapshot (i.e. destroyed) keep their last values.
+        """
+        for actor in CarlaDataProvider._actor_velocity_map:
+            if actor is None:
+                continue
+
+            actor_snapshot = snapshot.find(actor.id)
+            if actor_snapshot is None:
+                continue
+
+            transform = actor_snapshot.get_transform()
+            velocity = actor_snapshot.get_velocity()
+            CarlaDataProvider._actor_velocity_map[actor] = math.sqrt(velocity.x**2 + velocity.y**2)
+            CarlaDataProvider._actor_location_map[actor] = transform.location
+            CarlaDataProvider._actor_transform_map[actor] = transform
+
+    @staticmethod
+    def _refresh_from_actors():
+        """
+        Fills the velocity, location and transform maps querying each actor
+        """
+        for actor in CarlaDataProvider._actor_velocity_map:
+            if actor is not None and actor.is_alive:
+                CarlaDataProvider._actor_velocity_map[actor] = calculate_velocity(actor)
+
+        for actor in CarlaDataProvider._actor_location_map:
+            if actor is not None and actor.is_alive:
+                CarlaDataProvider._actor_location_map[actor] = actor.get_location()
+
+        for actor in CarlaDataProvider._actor_transform_map:
+            if actor is not None and actor.is_alive:
+                CarlaDataProvider._actor_transform_map[actor] = actor.get_transform()
+
     @staticmethod
     def get_velocity(actor):
         """
@@ -217,13 +262,33 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
     @staticmethod
     def set_world(world):
         """
-        Set the world and world settings
+        Set the world and world settings.
+        In warm world mode, the map derived data of the previous run is reused if the world is the same.
         """
         CarlaDataProvider._world = world
         CarlaDataProvider._sync_flag = world.get_settings().synchronous_mode
+        WorldStateCache.clear()
+
+        warm_data = CarlaDataProvider._warm_world_data
+        CarlaDataProvider._warm_world_data = None
+        if warm_data is not None and warm_data['world_id'] == world.id:
+            CarlaDataProvider._map = warm_data['map']
+            CarlaDataProvider._blueprint_library = warm_data['blueprint_library']
+            CarlaDataProvider._grp = get_global_route_planner(CarlaDataProvider._map, 2.0)
+            CarlaDataProvider._waypoint_cache = warm_data['waypoint_cache']
+            CarlaDataProvider._lane_network = warm_data['lane_network']
+            CarlaDataProvider._traffic_light_annotations = warm_data['traffic_light_annotations']
+            CarlaDataProvider._traffic_light_map = warm_data['traffic_light_map']
+            CarlaDataProvider.generate_spawn_points(warm_data['spawn_points'])
+            return
+
         CarlaDataProvider._map = world.get_map()
         CarlaDataProvider._blueprint_library = world.get_blueprint_library()
-        CarlaDataProvider._grp = GlobalRoutePlanner(CarlaDataProvider._map, 2.0)
+        CarlaDataProvider._grp = get_global_route_planner(CarlaDataProvider._map, 2.0)
+        WaypointCache.clear()
+        CarlaDataProvider._waypoint_cache = WaypointCache.get(CarlaDataProvider._map)
+        CarlaDataProvider._lane_network = None
+        CarlaDataProvider._traffic_light_annotations = {}
         CarlaDataProvider.generate_spawn_points()
         CarlaDataProvider.prepare_map()
 
@@ -250,6 +315,28 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
 
         return CarlaDataProvider._map
 
+    @staticmethod
+    def get_waypoint(location, project_to_road=True, lane_type=None):
+        """
+        Cached version of the map get_waypoint, shared by all the scenario elements
+        """
+        if CarlaDataProvider._waypoint_cache is None:
+            CarlaDataProvider._waypoint_cache = WaypointCache.get(CarlaDataProvider.get_map())
+        return CarlaDataProvider._waypoint_cache.get_waypoint(location, project_to_road, lane_type)
+
+    @staticmethod
+    def get_lane_network(cache_dir=None):
+        """
+        Returns the offline LaneNetwork of the current map, built the first time it is requested.
+        If a cache directory is given, the network is stored there and reused by later runs.
+        """
+        if CarlaDataProvider._lane_network is None:
+            if cache_dir:
+                CarlaDataProvider._lane_network = LaneNetwork.get(CarlaDataProvider.get_map(), cache_dir)
+            else:
+                CarlaDataProvider._lane_network = LaneNetwork.from_map(CarlaDataProvider.get_map())
+        return CarlaDataProvider._lane_network
+
     @staticmethod
     def get_random_seed():
         """
@@ -298,6 +385,27 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
         """
         return CarlaDataProvider._runtime_init_flag
 
+    @staticmethod
+    def set_warm_world_mode(flag):
+        """
+        Set the warm world mode. If active, cleanup() keeps the map derived data
+        (map, spawn points, traffic lights, route planner and waypoint caches),
+        which is reused by set_world() if the next run uses the same world
+        """
+        CarlaDataProvider._warm_world_flag = flag
+        if not flag:
+            CarlaDataProvider._warm_world_data = None
+
+    @staticmethod
+    def is_warm_world(world, town=None):
+        """
+        @return true if the map derived data of the given world is kept, and it is of the given town
+        """
+        warm_data = CarlaDataProvider._warm_world_data
+        if warm_data is None or warm_data['world_id'] != world.id:
+            return False
+        return town is None or warm_data['map'].name.split('/')[-1] == town
+
     @staticmethod
     def find_weather_presets():
         """
@@ -331,6 +439,10 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
         """
         Get dictionary with traffic light group info for a given traffic light
         """
+        if traffic_light.id in CarlaDataProvider._traffic_light_annotations:
+            annotations = CarlaDataProvider._traffic_light_annotations[traffic_light.id]
+            return {key: list(value) for key, value in annotations.items()}
+
         dict_annotations = {'ref': [], 'opposite': [], 'left': [], 'right': []}
 
         # Get the waypoints
@@ -360,7 +472,8 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
                 elif diff > 30:
                     dict_annotations['left'].append(target_tl)
 
-        return dict_annotations
+        CarlaDataProvider._traffic_light_annotations[traffic_light.id] = dict_annotations
+        return {key: list(value) for key, value in dict_annotations.items()}
 
     @staticmethod
     def get_trafficlight_trigger_location(traffic_light):    # pylint: disable=invalid-name
@@ -440,7 +553,7 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
         else:
             location = CarlaDataProvider.get_location(actor)
 
-        waypoint = CarlaDataProvider.get_map().get_waypoint(location)
+        waypoint = CarlaDataProvider.get_waypoint(location)
         # Create list of all waypoints until next intersection
         list_of_waypoints = []
         while waypoint and not waypoint.is_intersection:
@@ -467,11 +580,14 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
         return relevant_traffic_light
 
     @staticmethod
-    def generate_spawn_points():
+    def generate_spawn_points(map_spawn_points=None):
         """
-        Generate spawn points for the current map
+        Generate spawn points for the current map, optionally from the already known map spawn points
         """
-        spawn_points = list(CarlaDataProvider.get_map(CarlaDataProvider._world).get_spawn_points())
+        if map_spawn_points is None:
+            map_spawn_points = CarlaDataProvider.get_map(CarlaDataProvider._world).get_spawn_points()
+        CarlaDataProvider._map_spawn_points = list(map_spawn_points)
+        spawn_points = list(map_spawn_points)
         CarlaDataProvider._rng.shuffle(spawn_points)
         CarlaDataProvider._spawn_points = spawn_points
         CarlaDataProvider._spawn_index = 0
@@ -979,6 +1095,19 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
                 else:
                     raise e
 
+        if CarlaDataProvider._warm_world_flag and CarlaDataProvider._world is not None \
+                and CarlaDataProvider._map is not None:
+            CarlaDataProvider._warm_world_data = {
+                'world_id': CarlaDataProvider._world.id,
+                'map': CarlaDataProvider._map,
+                'blueprint_library': CarlaDataProvider._blueprint_library,
+                'spawn_points': CarlaDataProvider._map_spawn_points,
+                'traffic_light_map': dict(CarlaDataProvider._traffic_light_map),
+                'traffic_light_annotations': CarlaDataProvider._traffic_light_annotations,
+                'waypoint_cache': CarlaDataProvider._waypoint_cache,
+                'lane_network': CarlaDataProvider._lane_network,
+            }
+
         CarlaDataProvider._actor_velocity_map.clear()
         CarlaDataProvider._actor_location_map.clear()
         CarlaDataProvider._actor_transform_map.clear()
@@ -991,10 +1120,15 @@ class CarlaDataProvider(object):  # pylint: disable=too-many-public-methods
         CarlaDataProvider._carla_actor_pool = {}
         CarlaDataProvider._client = None
         CarlaDataProvider._spawn_points = None
+        CarlaDataProvider._map_spawn_points = None
         CarlaDataProvider._spawn_index = 0
         CarlaDataProvider._rng = random.RandomState(CarlaDataProvider._random_seed)
         CarlaDataProvider._grp = None
+        CarlaDataProvider._waypoint_cache = None
+        CarlaDataProvider._lane_network = None
+        CarlaDataProvider._traffic_light_annotations = {}
         CarlaDataProvider._runtime_init_flag = False
+        WorldStateCache.clear()
 
     @property
     def world(self):
@@ -11,7 +11,9 @@ It must not be modified and is for reference only!
 """
 
 from __future__ import print_function
+from contextlib import contextmanager
 import sys
+import threading
 import time
 
 import py_trees
@@ -19,6 +21,7 @@ import py_trees
 from srunner.autoagents.agent_wrapper import AgentWrapper
 from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
 from srunner.scenariomanager.result_writer import ResultOutputProvider
+from srunner.scenariomanager.tick_profiler import TickProfiler
 from srunner.scenariomanager.timer import GameTime
 from srunner.scenariomanager.watchdog import Watchdog
 
@@ -39,12 +42,20 @@ class ScenarioManager(object):
        the scenario execution
     4. Trigger a result evaluation with manager.analyze_scenario()
     5. If needed, cleanup with manager.stop_scenario()
+
+    In asynchronous mode, the scenario is ticked from the world's on_tick callbacks,
+    so it runs once per server frame without polling the server. Frames missed
+    while the previous one was being processed are counted at dropped_frames.
     """
 
-    def __init__(self, debug_mode=False, sync_mode=False, timeout=2.0):
+    TICK_WAIT_TIMEOUT = 1.0  # Max time waiting for a world tick before checking if still running [s]
+
+    def __init__(self, debug_mode=False, sync_mode=False, timeout=2.0, profile=False):
         """
         Setups up the parameters, which will be filled at load_scenario()
 
+        If profile is True, the duration of each tick phase and behavior update is recorded,
+        and can be written with write_profile() at the end of the run.
         """
         self.scenario = None
         self.scenario_tree = None
@@ -56,6 +67,8 @@ class ScenarioManager(object):
         self._sync_mode = sync_mode
         self._watchdog = None
         self._timeout = timeout
+        self._profile = profile
+        self._profiler = None
 
         self._running = False
         self._timestamp_last_run = 0.0
@@ -64,6 +77,11 @@ class ScenarioManager(object):
         self.start_system_time = None
         self.end_system_time = None
 
+        self._tick_condition = threading.Condition()
+        self._tick_snapshot = None
+        self._last_frame = None
+        self.dropped_frames = 0
+
     def _reset(self):
         """
         Reset all parameters
@@ -74,6 +92,10 @@ class ScenarioManager(object):
         self.scenario_duration_game = 0.0
         self.start_system_time = None
         self.end_system_time = None
+        self._profiler = TickProfiler() if self._profile else None
+        self._tick_snapshot = None
+        self._last_frame = None
+        self.dropped_frames = 0
         GameTime.restart()
 
     def cleanup(self):
@@ -125,15 +147,16 @@ class ScenarioManager(object):
         self._watchdog.start()
         self._running = True
 
-        while self._running:
-            timestamp = None
-            world = CarlaDataProvider.get_world()
-            if world:
-                snapshot = world.get_snapshot()
-                if snapshot:
-                    timestamp = snapshot.timestamp
-            if timestamp:
-                self._tick_scenario(timestamp)
+        if self._sync_mode:
+            self._run_sync()
+        else:
+            self._run_async()
+
+        if self.dropped_frames:
+            print("ScenarioManager: {} frames were dropped".format(self.dropped_frames))
+
+        if self._profiler is not None:
+            self._profiler.detach()
 
         self.cleanup()
 
@@ -147,11 +170,80 @@ class ScenarioManager(object):
         if self.scenario_tree.status == py_trees.common.Status.FAILURE:
             print("ScenarioManager: Terminated due to failure")
 
-    def _tick_scenario(self, timestamp):
+    def _run_sync(self):
+        """
+        Ticks the scenario after each world tick, which is done by the scenario itself
+        """
+        while self._running:
+            snapshot = None
+            world = CarlaDataProvider.get_world()
+            if world:
+                snapshot = world.get_snapshot()
+            if snapshot:
+                self._tick_scenario(snapshot)
+
+    def _run_async(self):
+        """
+        Ticks the scenario once per server frame, waiting for the world's tick notifications
+        """
+        world = CarlaDataProvider.get_world()
+        callback_id = world.on_tick(self._on_world_tick)
+        try:
+            while self._running:
+                snapshot = self._wait_for_tick()
+                if snapshot:
+                    self._check_dropped_frames(snapshot.timestamp)
+                    self._tick_scenario(snapshot)
+        finally:
+            world.remove_on_tick(callback_id)
+
+    def _on_world_tick(self, snapshot):
+        """
+        Callback of the world ticks, keeping the newest snapshot and waking up the scenario
+        """
+        with self._tick_condition:
+            self._tick_snapshot = snapshot
+            self._tick_condition.notify()
+
+    def _wait_for_tick(self):
         """
-        Run next tick of scenario and the agent.
+        Waits for a new world tick, returning its snapshot, or None if none arrived in time
+        """
+        with self._tick_condition:
+            if self._tick_snapshot is None:
+                self._tick_condition.wait(self.TICK_WAIT_TIMEOUT)
+            snapshot = self._tick_snapshot
+            self._tick_snapshot = None
+        return snapshot
+
+    def _check_dropped_frames(self, timestamp):
+        """
+        Counts the server frames that weren't processed since the previous one
+        """
+        if self._last_frame is not None and timestamp.frame > self._last_frame + 1:
+            dropped = timestamp.frame - self._last_frame - 1
+            self.dropped_frames += dropped
+            if self._debug_mode:
+                print("ScenarioManager: Late tick, {} frames dropped before frame {}".format(dropped, timestamp.frame))
+        self._last_frame = timestamp.frame
+
+    @contextmanager
+    def _profile_phase(self, name):
+        """
+        Measures a phase of the tick if profiling, doing nothing otherwise
+        """
+        if self._profiler is None:
+            yield
+        else:
+            with self._profiler.phase(name):
+                yield
+
+    def _tick_scenario(self, snapshot):
+        """
+        Run next tick of scenario and the agent, with the world snapshot of the tick.
         If running synchornously, it also handles the ticking of the world.
         """
+        timestamp = snapshot.timestamp
 
         if self._timestamp_last_run < timestamp.elapsed_seconds and self._running:
             self._timestamp_last_run = timestamp.elapsed_seconds
@@ -161,18 +253,24 @@ class ScenarioManager(object):
             if self._debug_mode:
                 print("\n--------- Tick ---------\n")
 
+            if self._profiler is not None:
+                self._profiler.tick(self.scenario_tree)
+
             # Update game time and actor information
-            GameTime.on_carla_tick(timestamp)
-            CarlaDataProvider.on_carla_tick()
+            with self._profile_phase('CarlaDataProvider'):
+                GameTime.on_carla_tick(timestamp)
+                CarlaDataProvider.on_carla_tick(snapshot)
 
             if self._agent is not None:
-                ego_action = self._agent()  # pylint: disable=not-callable
+                with self._profile_phase('agent'):
+                    ego_action = self._agent()  # pylint: disable=not-callable
 
             if self._agent is not None:
                 self.ego_vehicles[0].apply_control(ego_action)
 
             # Tick scenario
-            self.scenario_tree.tick_once()
+            with self._profile_phase(TickProfiler.TREE_PHASE):
+                self.scenario_tree.tick_once()
 
             if self._debug_mode:
                 print("\n")
@@ -183,7 +281,17 @@ class ScenarioManager(object):
                 self._running = False
 
         if self._sync_mode and self._running and self._watchdog.get_status():
-            CarlaDataProvider.get_world().tick()
+            with self._profile_phase('world.tick'):
+                CarlaDataProvider.get_world().tick()
+
+    def write_profile(self, filename):
+        """
+        Writes the profiling results of the last run, if profiling is enabled
+
+            :param filename (str): path of the files, without extension
+        """
+        if self._profiler is not None:
+            self._profiler.write(filename)
 
     def get_running_status(self):
         """
@@ -197,6 +305,8 @@ class ScenarioManager(object):
         This function is used by the overall signal handler to terminate the scenario execution
         """
         self._running = False
+        with self._tick_condition:
+            self._tick_condition.notify()
 
     def analyze_scenario(self, stdout, filename, junit, json):
         """
@@ -26,6 +26,7 @@ from agents.tools.misc import get_speed
 from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
 from srunner.scenariomanager.timer import GameTime
 from srunner.scenariomanager.traffic_events import TrafficEvent, TrafficEventType
+from srunner.tools.route_geometry import RouteProgress
 
 
 class Criterion(py_trees.behaviour.Behaviour):
@@ -996,7 +997,6 @@ class OutsideRouteLanesTest(Criterion):
     ALLOWED_OUT_DISTANCE = 0.5  # At least 0.5, due to the mini-shoulder between lanes and sidewalks
     MAX_VEHICLE_ANGLE = 120.0  # Maximum angle between the yaw and waypoint lane
     MAX_WAYPOINT_ANGLE = 150.0  # Maximum change between the yaw-lane angle between frames
-    WINDOWS_SIZE = 3  # Amount of additional waypoints checked (in case the first on fails)
 
     def __init__(self, actor, route, optional=False, name="OutsideRouteLanesTest"):
         """
@@ -1007,8 +1007,7 @@ class OutsideRouteLanesTest(Criterion):
 
         self._route = route
         self._current_index = 0
-        self._route_length = len(self._route)
-        self._route_transforms, _ = zip(*self._route)
+        self._progress = RouteProgress.get(actor, route)
 
         self._map = CarlaDataProvider.get_map()
         self._last_ego_waypoint = self._map.get_waypoint(self.actor.get_location())
@@ -1035,7 +1034,7 @@ class OutsideRouteLanesTest(Criterion):
         new_status = py_trees.common.Status.RUNNING
 
         # Some of the vehicle parameters
-        location = CarlaDataProvider.get_location(self.actor)
+        location = self._progress.update().location
         if location is None:
             return new_status
 
@@ -1052,29 +1051,19 @@ class OutsideRouteLanesTest(Criterion):
             self.test_status = "FAILURE"
 
         # Get the traveled distance
-        for index in range(self._current_index + 1,
-                           min(self._current_index + self.WINDOWS_SIZE + 1, self._route_length)):
-            # Get the dot product to know if it has passed this location
-            route_transform = self._route_transforms[index]
-            route_location = route_transform.location
-
-            wp_dir = route_transform.get_forward_vector()  # Waypoint's forward vector
-            wp_veh = location - route_location  # vector waypoint - vehicle
-
-            if wp_veh.dot(wp_dir) > 0:
-                # Get the distance traveled and add it to the total distance
-                prev_route_location = self._route_transforms[self._current_index].location
-                new_dist = prev_route_location.distance(route_location)
-                self._total_distance += new_dist
+        if self._progress.index > self._current_index:
+            accum_dist = self._progress.geometry.accum_dist
+            new_dist = float(accum_dist[self._progress.index] - accum_dist[self._current_index])
+            self._total_distance += new_dist
 
-                # And to the wrong one if outside route lanes
-                if self._outside_lane_active or (self._wrong_direction_active and self._wrong_lane_active):
-                    self._wrong_distance += new_dist
+            # And to the wrong one if outside route lanes
+            if self._outside_lane_active or (self._wrong_direction_active and self._wrong_lane_active):
+                self._wrong_distance += new_dist
 
-                if self._wrong_distance:
-                    self._set_traffic_event()
+            if self._wrong_distance:
+                self._set_traffic_event()
 
-                self._current_index = index
+            self._current_index = self._progress.index
 
         self.logger.debug("%s.update()[%s->%s]" % (self.__class__.__name__, self.status, new_status))
         return new_status
@@ -1107,8 +1096,8 @@ class OutsideRouteLanesTest(Criterion):
         """
         Detects if the ego_vehicle is outside driving lanes
         """
-        driving_wp = self._map.get_waypoint(location, lane_type=carla.LaneType.Driving)
-        parking_wp = self._map.get_waypoint(location, lane_type=carla.LaneType.Parking)
+        driving_wp = CarlaDataProvider.get_waypoint(location, lane_type=carla.LaneType.Driving)
+        parking_wp = CarlaDataProvider.get_waypoint(location, lane_type=carla.LaneType.Parking)
 
         driving_distance = location.distance(driving_wp.transform.location)
         if parking_wp is not None:  # Some towns have no parking
@@ -1129,7 +1118,7 @@ class OutsideRouteLanesTest(Criterion):
         """
         Detects if the ego_vehicle has invaded a wrong lane
         """
-        waypoint = self._map.get_waypoint(location, lane_type=carla.LaneType.Driving)
+        waypoint = CarlaDataProvider.get_waypoint(location, lane_type=carla.LaneType.Driving)
         lane_id = waypoint.lane_id
         road_id = waypoint.road_id
 
@@ -1205,7 +1194,7 @@ class WrongLaneTest(Criterion):
         if self._terminate_on_failure and (self.test_status == "FAILURE"):
             new_status = py_trees.common.Status.FAILURE
 
-        lane_waypoint = self._map.get_waypoint(self.actor.get_location())
+        lane_waypoint = CarlaDataProvider.get_waypoint(self.actor.get_location())
         current_lane_id = lane_waypoint.lane_id
         current_road_id = lane_waypoint.road_id
 
@@ -1398,7 +1387,6 @@ class InRouteTest(Criterion):
     - terminate_on_failure [optional]: If True, the complete scenario will terminate upon failure of this test
     """
     MAX_ROUTE_PERCENTAGE = 30  # %
-    WINDOWS_SIZE = 5  # Amount of additional waypoints checked
 
     def __init__(self, actor, route, offroad_min=None, offroad_max=30, name="InRouteTest", terminate_on_failure=False):
         """
@@ -1415,21 +1403,12 @@ class InRouteTest(Criterion):
             self._offroad_min = self._offroad_min
 
         self._world = CarlaDataProvider.get_world()
-        self._route_transforms, _ = zip(*self._route)
-        self._route_length = len(self._route)
+        self._progress = RouteProgress.get(actor, route)
         self._current_index = 0
         self._out_route_distance = 0
         self._in_safe_route = True
 
-        self._accum_meters = []
-        prev_loc = self._route_transforms[0].location
-        for i, tran in enumerate(self._route_transforms):
-            loc = tran.location
-            d = loc.distance(prev_loc)
-            accum = 0 if i == 0 else self._accum_meters[i - 1]
-
-            self._accum_meters.append(d + accum)
-            prev_loc = loc
+        self._accum_meters = self._progress.geometry.accum_dist
 
         # Blackboard variable
         blackv = py_trees.blackboard.Blackboard()
@@ -1441,7 +1420,7 @@ class InRouteTest(Criterion):
         """
         new_status = py_trees.common.Status.RUNNING
 
-        location = CarlaDataProvider.get_location(self.actor)
+        location = self._progress.update().location
         if location is None:
             return new_status
 
@@ -1452,19 +1431,11 @@ class InRouteTest(Criterion):
 
             off_route = True
 
-            shortest_distance = float('inf')
-            closest_index = -1
-
             # Get the closest distance
-            for index in range(self._current_index,
-                               min(self._current_index + self.WINDOWS_SIZE + 1, self._route_length)):
-                ref_location = self._route_transforms[index].location
-                distance = math.sqrt(((location.x - ref_location.x) ** 2) + ((location.y - ref_location.y) ** 2))
-                if distance <= shortest_distance:
-                    closest_index = index
-                    shortest_distance = distance
-
-            if closest_index == -1 or shortest_distance == float('inf'):
+            closest_index = self._progress.closest_index
+            shortest_distance = self._progress.deviation
+
+            if shortest_distance == float('inf'):
                 return new_status
 
             # Check if the actor is out of route
@@ -1475,12 +1446,12 @@ class InRouteTest(Criterion):
             # If actor advanced a step, record the distance
             if self._current_index != closest_index:
 
-                new_dist = self._accum_meters[closest_index] - self._accum_meters[self._current_index]
+                new_dist = float(self._accum_meters[closest_index] - self._accum_meters[self._current_index])
 
                 # If too far from the route, add it and check if its value
                 if not self._in_safe_route:
                     self._out_route_distance += new_dist
-                    out_route_percentage = 100 * self._out_route_distance / self._accum_meters[-1]
+                    out_route_percentage = 100 * self._out_route_distance / self._progress.geometry.length
                     if out_route_percentage > self.MAX_ROUTE_PERCENTAGE:
                         off_route = True
 
@@ -1520,8 +1491,6 @@ class RouteCompletionTest(Criterion):
     - route: Route to be checked
     - terminate_on_failure [optional]: If True, the complete scenario will terminate upon failure of this test
     """
-    WINDOWS_SIZE = 2
-
     # Thresholds to return that a route has been completed
     DISTANCE_THRESHOLD = 10.0  # meters
     PERCENTAGE_THRESHOLD = 99  # %
@@ -1536,38 +1505,22 @@ class RouteCompletionTest(Criterion):
         self._map = CarlaDataProvider.get_map()
 
         self._index = 0
-        self._route_length = len(self._route)
-        self._route_transforms, _ = zip(*self._route)
-        self._route_accum_perc = self._get_acummulated_percentages()
+        self._progress = RouteProgress.get(actor, route)
 
-        self.target_location = self._route_transforms[-1].location
+        self.target_location = self._progress.geometry.transforms[-1].location
 
         self._traffic_event = TrafficEvent(event_type=TrafficEventType.ROUTE_COMPLETION, frame=0)
         self._traffic_event.set_dict({'route_completed': self.actual_value})
         self._traffic_event.set_message("Agent has completed {} of the route".format(self.actual_value))
         self.events.append(self._traffic_event)
 
-    def _get_acummulated_percentages(self):
-        """Gets the accumulated percentage of each of the route transforms"""
-        accum_meters = []
-        prev_loc = self._route_transforms[0].location
-        for i, tran in enumerate(self._route_transforms):
-            d = tran.location.distance(prev_loc)
-            new_d = 0 if i == 0 else accum_meters[i - 1]
-
-            accum_meters.append(d + new_d)
-            prev_loc = tran.location
-
-        max_dist = accum_meters[-1]
-        return [x / max_dist * 100 for x in accum_meters]
-
     def update(self):
         """
         Check if the actor location is within trigger region
         """
         new_status = py_trees.common.Status.RUNNING
 
-        location = CarlaDataProvider.get_location(self.actor)
+        location = self._progress.update().location
         if location is None:
             return new_status
 
@@ -1576,16 +1529,10 @@ class RouteCompletionTest(Criterion):
 
         elif self.test_status in ('RUNNING', 'INIT'):
 
-            for index in range(self._index, min(self._index + self.WINDOWS_SIZE + 1, self._route_length)):
-                # Get the dot product to know if it has passed this location
-                route_transform = self._route_transforms[index]
-                route_location = route_transform.location
-                wp_dir = route_transform.get_forward_vector()          # Waypoint's forward vector
-                wp_veh = location - route_location                     # vector route - vehicle
-
-                if wp_veh.dot(wp_dir) > 0:
-                    self._index = index
-                    self.actual_value = self._route_accum_perc[self._index]
+            # Get the furthest route point the actor has passed
+            if self._progress.index != self._index:
+                self._index = self._progress.index
+                self.actual_value = self._progress.percentage
 
             self.actual_value = round(self.actual_value, 2)
             self._traffic_event.set_dict({'route_completed': self.actual_value})
@@ -1645,6 +1592,64 @@ class RunningRedLightTest(Criterion):
                 center, waypoints = self.get_traffic_light_waypoints(_actor)
                 self._list_traffic_lights.append((_actor, center, waypoints))
 
+        self._build_stop_lines()
+
+    def _build_stop_lines(self):
+        """
+        Precomputes the stop lines of all the traffic lights as arrays, and a grid
+        of the traffic light centers with cells of DISTANCE_LIGHT meters
+        """
+        self._light_centers = np.zeros((len(self._list_traffic_lights), 3))
+        self._light_grid = {}
+
+        stop_lines = []
+        stop_line_dirs = []
+        stop_line_lanes = []
+        self._light_stop_lines = []
+
+        for i, (_, center, waypoints) in enumerate(self._list_traffic_lights):
+            self._light_centers[i] = (center.x, center.y, center.z)
+            cell = (int(center.x // self.DISTANCE_LIGHT), int(center.y // self.DISTANCE_LIGHT))
+            self._light_grid.setdefault(cell, []).append(i)
+
+            first_line = len(stop_lines)
+            for wp in waypoints:
+                yaw_wp = wp.transform.rotation.yaw
+                lane_width = wp.lane_width
+                location_wp = wp.transform.location
+
+                lft_lane_wp = self.rotate_point(carla.Vector3D(0.6 * lane_width, 0, 0), yaw_wp + 90)
+                rgt_lane_wp = self.rotate_point(carla.Vector3D(0.6 * lane_width, 0, 0), yaw_wp - 90)
+                wp_dir = wp.transform.get_forward_vector()
+
+                stop_lines.append((location_wp.x + lft_lane_wp.x, location_wp.y + lft_lane_wp.y,
+                                   location_wp.x + rgt_lane_wp.x, location_wp.y + rgt_lane_wp.y))
+                stop_line_dirs.append((wp_dir.x, wp_dir.y, wp_dir.z))
+                stop_line_lanes.append((wp.road_id, wp.lane_id))
+            self._light_stop_lines.append(slice(first_line, len(stop_lines)))
+
+        self._stop_lines = np.array(stop_lines, dtype=float).reshape(-1, 4)
+        self._stop_line_dirs = np.array(stop_line_dirs, dtype=float).reshape(-1, 3)
+        self._stop_line_lanes = np.array(stop_line_lanes, dtype=int).reshape(-1, 2)
+
+    def _get_close_traffic_lights(self, location):
+        """
+        Returns the sorted indexes of the traffic lights closer than DISTANCE_LIGHT to the location
+        """
+        cell_x = int(location.x // self.DISTANCE_LIGHT)
+        cell_y = int(location.y // self.DISTANCE_LIGHT)
+
+        candidates = []
+        for i in range(cell_x - 1, cell_x + 2):
+            for j in range(cell_y - 1, cell_y + 2):
+                candidates.extend(self._light_grid.get((i, j), []))
+        if not candidates:
+            return []
+
+        candidates = np.array(sorted(candidates))
+        distances = np.linalg.norm(self._light_centers[candidates] - (location.x, location.y, location.z), axis=1)
+        return candidates[distances <= self.DISTANCE_LIGHT].tolist()
+
     # pylint: disable=no-self-use
     def is_vehicle_crossing_line(self, seg1, seg2):
         """
@@ -1656,6 +1661,40 @@ class RunningRedLightTest(Criterion):
 
         return not inter.is_empty
 
+    @staticmethod
+    def are_segments_crossing(segment, lines):
+        """
+        Vectorized version of is_vehicle_crossing_line, checking a segment ((x1, y1), (x2, y2))
+        against an array of lines with shape (N, 4). Touching and overlapping segments count as crossing,
+        and zero-length ones never do.
+        """
+        p1 = np.asarray(segment[0], dtype=float)
+        p2 = np.asarray(segment[1], dtype=float)
+        q1 = lines[:, 0:2]
+        q2 = lines[:, 2:4]
+
+        def orientation(a, b, c):
+            return (b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0])
+
+        o1 = orientation(p1, p2, q1)
+        o2 = orientation(p1, p2, q2)
+        o3 = orientation(q1, q2, p1)
+        o4 = orientation(q1, q2, p2)
+
+        collinear = (o1 == 0) & (o2 == 0)
+        crossing = (o1 * o2 <= 0) & (o3 * o4 <= 0) & ~collinear
+
+        # Collinear segments only cross if their bounding boxes overlap
+        overlap = ((np.minimum(q1[:, 0], q2[:, 0]) <= max(p1[0], p2[0]))
+                   & (np.maximum(q1[:, 0], q2[:, 0]) >= min(p1[0], p2[0]))
+                   & (np.minimum(q1[:, 1], q2[:, 1]) <= max(p1[1], p2[1]))
+                   & (np.maximum(q1[:, 1], q2[:, 1]) >= min(p1[1], p2[1])))
+
+        # As in shapely, zero-length segments never cross
+        valid = np.any(q1 != q2, axis=1) & np.any(p1 != p2)
+
+        return (crossing | (collinear & overlap)) & valid
+
     def update(self):
         """
         Check if the actor is running a red light
@@ -1675,9 +1714,8 @@ class RunningRedLightTest(Criterion):
         tail_far_pt = self.rotate_point(carla.Vector3D(-veh_extent - 1, 0, 0), transform.rotation.yaw)
         tail_far_pt = location + carla.Location(tail_far_pt)
 
-        for traffic_light, center, waypoints in self._list_traffic_lights:
-
-            if self.debug:
+        if self.debug:
+            for traffic_light, center, waypoints in self._list_traffic_lights:
                 z = 2.1
                 if traffic_light.state == carla.TrafficLightState.Red:
                     color = carla.Color(155, 0, 0)
@@ -1693,53 +1731,53 @@ class RunningRedLightTest(Criterion):
                     self._world.debug.draw_point(
                         wp.transform.location + carla.Location(z=z), size=0.1, color=color, life_time=0.01)
 
-            center_loc = carla.Location(center)
+        tail_wp = None
+        ve_dir = None
+
+        for index in self._get_close_traffic_lights(location):
+            traffic_light = self._list_traffic_lights[index][0]
 
             if self._last_red_light_id and self._last_red_light_id == traffic_light.id:
                 continue
-            if center_loc.distance(location) > self.DISTANCE_LIGHT:
-                continue
             if traffic_light.state != carla.TrafficLightState.Red:
                 continue
 
-            for wp in waypoints:
-
-                tail_wp = self._map.get_waypoint(tail_far_pt)
+            lines = self._light_stop_lines[index]
+            if lines.start == lines.stop:
+                continue
 
-                # Calculate the dot product (Might be unscaled, as only its sign is important)
+            if tail_wp is None:
+                tail_wp = CarlaDataProvider.get_waypoint(tail_far_pt)
                 ve_dir = CarlaDataProvider.get_transform(self.actor).get_forward_vector()
-                wp_dir = wp.transform.get_forward_vector()
+                ve_dir = np.array([ve_dir.x, ve_dir.y, ve_dir.z])
 
-                # Check the lane until all the "tail" has passed
-                if tail_wp.road_id == wp.road_id and tail_wp.lane_id == wp.lane_id and ve_dir.dot(wp_dir) > 0:
-                    # This light is red and is affecting our lane
-                    yaw_wp = wp.transform.rotation.yaw
-                    lane_width = wp.lane_width
-                    location_wp = wp.transform.location
+            # Check the lane until all the "tail" has passed, and only if the light is affecting our lane
+            affected = ((self._stop_line_lanes[lines, 0] == tail_wp.road_id)
+                        & (self._stop_line_lanes[lines, 1] == tail_wp.lane_id)
+                        & (self._stop_line_dirs[lines].dot(ve_dir) > 0))
+            if not affected.any():
+                continue
 
-                    lft_lane_wp = self.rotate_point(carla.Vector3D(0.6 * lane_width, 0, 0), yaw_wp + 90)
-                    lft_lane_wp = location_wp + carla.Location(lft_lane_wp)
-                    rgt_lane_wp = self.rotate_point(carla.Vector3D(0.6 * lane_width, 0, 0), yaw_wp - 90)
-                    rgt_lane_wp = location_wp + carla.Location(rgt_lane_wp)
+            # Is the vehicle traversing the stop line?
+            crossing = self.are_segments_crossing(
+                ((tail_close_pt.x, tail_close_pt.y), (tail_far_pt.x, tail_far_pt.y)),
+                self._stop_lines[lines][affected])
 
-                    # Is the vehicle traversing the stop line?
-                    if self.is_vehicle_crossing_line((tail_close_pt, tail_far_pt), (lft_lane_wp, rgt_lane_wp)):
+            if crossing.any():
+                self.test_status = "FAILURE"
+                self.actual_value += 1
+                location = traffic_light.get_transform().location
+                red_light_event = TrafficEvent(event_type=TrafficEventType.TRAFFIC_LIGHT_INFRACTION, frame=GameTime.get_frame())
+                red_light_event.set_message(
+                    "Agent ran a red light {} at (x={}, y={}, z={})".format(
+                        traffic_light.id,
+                        round(location.x, 3),
+                        round(location.y, 3),
+                        round(location.z, 3)))
+                red_light_event.set_dict({'id': traffic_light.id, 'location': location})
 
-                        self.test_status = "FAILURE"
-                        self.actual_value += 1
-                        location = traffic_light.get_transform().location
-                        red_light_event = TrafficEvent(event_type=TrafficEventType.TRAFFIC_LIGHT_INFRACTION, frame=GameTime.get_frame())
-                        red_light_event.set_message(
-                            "Agent ran a red light {} at (x={}, y={}, z={})".format(
-                                traffic_light.id,
-                                round(location.x, 3),
-                                round(location.y, 3),
-                                round(location.z, 3)))
-                        red_light_event.set_dict({'id': traffic_light.id, 'location': location})
-
-                        self.events.append(red_light_event)
-                        self._last_red_light_id = traffic_light.id
-                        break
+                self.events.append(red_light_event)
+                self._last_red_light_id = traffic_light.id
 
         if self._terminate_on_failure and (self.test_status == "FAILURE"):
             new_status = py_trees.common.Status.FAILURE
@@ -1964,7 +2002,6 @@ class MinimumSpeedRouteTest(Criterion):
     - route: Route to be checked
     - terminate_on_failure [optional]: If True, the complete scenario will terminate upon failure of this test
     """
-    WINDOWS_SIZE = 2
     RATIO = 1
 
     def __init__(self, actor, route, checkpoints=1, name="MinimumSpeedRouteTest", terminate_on_failure=False):
@@ -1976,23 +2013,13 @@ class MinimumSpeedRouteTest(Criterion):
         self.actual_value = 100
 
         self._route = route
-        self._accum_dist = []
-        prev_trans = None
-        for trans, _ in route:
-            if prev_trans:
-                dist = trans.location.distance(prev_trans.location)
-                self._accum_dist.append(dist + self._accum_dist[-1])
-            else:
-                self._accum_dist.append(0)
-            prev_trans = trans
-        self._route_length = len(self._route)
+        self._progress = RouteProgress.get(actor, route)
+        self._progress.track_speeds()
+        self._accum_dist = self._progress.geometry.accum_dist
 
         self._checkpoints = checkpoints
         self._checkpoint_dist = self._accum_dist[-1] / self._checkpoints
-
-        self._mean_speed = 0
-        self._actor_speed = 0
-        self._speed_points = 0
+        self._checkpoint_speed_totals = np.zeros(3)  # Speed totals of the progress at the checkpoint start
 
         self._current_dist = 0
         self._checkpoint_values = []
@@ -2009,58 +2036,34 @@ class MinimumSpeedRouteTest(Criterion):
         if self._terminate_on_failure and (self.test_status == "FAILURE"):
             new_status = py_trees.common.Status.FAILURE
 
-        # Check the actor progress through the route 
-        location = CarlaDataProvider.get_location(self.actor)
+        # Check the actor progress through the route. Its speed and the one of the
+        # surrounding Background Activity are also recorded by the progress
+        location = self._progress.update().location
         if location is None:
             return new_status
 
-        for index in range(self._index, min(self._index + self.WINDOWS_SIZE + 1, self._route_length)):
-            # Get the dot product to know if it has passed this location
-            route_transform = self._route[index][0]
-            route_location = route_transform.location
-            wp_dir = route_transform.get_forward_vector()
-            wp_veh = location - route_location
-
-            if wp_veh.dot(wp_dir) > 0:
-                self._index = index
+        self._index = self._progress.index
 
+        # The checkpoint doesn't include the speeds of this frame
         if self._accum_dist[self._index] - self._current_dist > self._checkpoint_dist:
-            self._set_traffic_event()
+            self._set_traffic_event(self._progress.previous_speed_totals)
             self._current_dist = self._accum_dist[self._index]
-            self._mean_speed = 0
-            self._actor_speed = 0
-            self._speed_points = 0
-
-        # Get the actor speed
-        velocity = CarlaDataProvider.get_velocity(self.actor)
-        if velocity is None:
-            return new_status
-
-        # Get the speed of the surrounding Background Activity
-        all_vehicles = CarlaDataProvider.get_all_actors().filter('vehicle*')
-        background_vehicles = [v for v in all_vehicles if v.attributes['role_name'] == 'background']
-
-        if background_vehicles:
-            frame_mean_speed = 0
-            for vehicle in background_vehicles:
-                frame_mean_speed += CarlaDataProvider.get_velocity(vehicle)
-            frame_mean_speed /= len(background_vehicles)
-
-            # Record the data
-            self._mean_speed += frame_mean_speed
-            self._actor_speed += velocity
-            self._speed_points += 1
 
         self.logger.debug("%s.update()[%s->%s]" % (self.__class__.__name__, self.status, new_status))
 
         return new_status
 
-    def _set_traffic_event(self):
+    def _set_traffic_event(self, speed_totals):
+        """
+        Records the checkpoint ending at the given speed totals of the route progress
+        """
+        actor_speed, mean_speed, speed_points = speed_totals - self._checkpoint_speed_totals
+        self._checkpoint_speed_totals = speed_totals
 
-        if self._speed_points > 0 and self._mean_speed:
-            self._mean_speed /= self._speed_points
-            self._actor_speed /= self._speed_points
-            checkpoint_value = round(self._actor_speed / (self.RATIO * self._mean_speed) * 100, 2)
+        if speed_points > 0 and mean_speed:
+            mean_speed /= speed_points
+            actor_speed /= speed_points
+            checkpoint_value = round(float(actor_speed / (self.RATIO * mean_speed) * 100), 2)
         else:
             checkpoint_value = 100
 
@@ -2083,7 +2086,7 @@ class MinimumSpeedRouteTest(Criterion):
         """
         # Routes end at around 99%, so make sure the last checkpoint is recorded
         if self._accum_dist[self._index] / self._accum_dist[-1] > 0.95:
-            self._set_traffic_event()
+            self._set_traffic_event(self._progress.speed_totals)
 
         if len(self._checkpoint_values):
             self.actual_value = round(sum(self._checkpoint_values) / len(self._checkpoint_values), 2)
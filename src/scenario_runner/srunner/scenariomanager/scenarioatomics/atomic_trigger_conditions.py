@@ -26,7 +26,7 @@ import math
 import py_trees
 import carla
 
-from agents.navigation.global_route_planner import GlobalRoutePlanner
+from agents.navigation.global_route_planner import get_global_route_planner
 
 from srunner.scenariomanager.scenarioatomics.atomic_behaviors import calculate_distance
 from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
@@ -186,7 +186,7 @@ class InTriggerDistanceToOSCPosition(AtomicCondition):
 
         if self._along_route:
             # Get the global route planner, used to calculate the route
-            self._grp = GlobalRoutePlanner(self._map, 0.5)
+            self._grp = get_global_route_planner(self._map, 0.5)
         else:
             self._grp = None
 
@@ -251,7 +251,7 @@ class InTimeToArrivalToOSCPosition(AtomicCondition):
 
         if self._along_route:
             # Get the global route planner, used to calculate the route
-            self._grp = GlobalRoutePlanner(self._map, 0.5)
+            self._grp = get_global_route_planner(self._map, 0.5)
         else:
             self._grp = None
 
@@ -931,7 +931,7 @@ class InTimeToArrivalToVehicle(AtomicCondition):
 
         if self._along_route:
             # Get the global route planner, used to calculate the route
-            self._grp = GlobalRoutePlanner(self._map, 0.5)
+            self._grp = get_global_route_planner(self._map, 0.5)
         else:
             self._grp = None
 
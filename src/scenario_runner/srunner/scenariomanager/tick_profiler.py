@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides an opt-in profiler of the ScenarioManager ticks. It measures the time spent
+at each phase of the tick and at the update of each behavior of the scenario tree, and writes
+a JSON report together with a collapsed stack file that can be read by flamegraph tools.
+"""
+
+from __future__ import print_function
+
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class TickProfiler(object):
+
+    """
+    Records the duration of the tick phases and of the behaviors' updates.
+
+    Phases are measured with `with profiler.phase(name)`, and the behaviors of a tree
+    are timed after `attach(tree)`, which wraps their update functions until `detach` is called.
+    """
+
+    TREE_PHASE = 'scenario_tree'
+
+    def __init__(self):
+        self.ticks = 0
+        self._phases = OrderedDict()  # name - list of durations
+        self._behaviours = OrderedDict()  # id - behavior, stack and list of durations
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Measures the duration of a phase of the tick
+
+            :param name (str): name of the phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.setdefault(name, []).append(time.perf_counter() - start)
+
+    def tick(self, tree):
+        """
+        Counts a new tick, timing the behaviors added to the tree since the previous one
+
+            :param tree (py_trees.behaviour.Behaviour): root of the scenario tree
+        """
+        self.ticks += 1
+        self.attach(tree)
+
+    def attach(self, tree):
+        """
+        Wraps the update of all the behaviors of the tree that aren't already timed
+
+            :param tree (py_trees.behaviour.Behaviour): root of the scenario tree
+        """
+        for behaviour in tree.iterate():
+            if id(behaviour) not in self._behaviours:
+                self._wrap(behaviour)
+
+    def detach(self):
+        """
+        Restores the original update of all the timed behaviors
+        """
+        for data in self._behaviours.values():
+            behaviour = data['behaviour']
+            if 'update' in vars(behaviour):
+                del behaviour.update
+
+    def _wrap(self, behaviour):
+        """
+        Replaces the update of a behavior by a timed one
+        """
+        stack = []
+        node = behaviour
+        while node is not None:
+            stack.insert(0, node.name.replace(';', ',').replace(' ', '_'))
+            node = node.parent
+
+        durations = []
+        self._behaviours[id(behaviour)] = {'behaviour': behaviour, 'stack': stack, 'durations': durations}
+
+        update = behaviour.update
+
+        def timed_update():
+            start = time.perf_counter()
+            try:
+                return update()
+            finally:
+                durations.append(time.perf_counter() - start)
+
+        behaviour.update = timed_update
+
+    @staticmethod
+    def _get_stats(durations):
+        """
+        Returns the number of calls, total, p50 and p99 times, in milliseconds
+        """
+        if not durations:
+            return {'calls': 0, 'total_ms': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0}
+        values = np.array(durations) * 1000
+        return {
+            'calls': len(values),
+            'total_ms': round(float(values.sum()), 4),
+            'p50_ms': round(float(np.percentile(values, 50)), 4),
+            'p99_ms': round(float(np.percentile(values, 99)), 4),
+        }
+
+    def get_report(self):
+        """
+        Returns the profiling results as a dictionary, with the behaviors sorted by their total time
+        """
+        behaviours = []
+        for data in self._behaviours.values():
+            stats = self._get_stats(data['durations'])
+            stats['name'] = data['behaviour'].name
+            stats['type'] = type(data['behaviour']).__name__
+            stats['path'] = '/'.join(data['stack'])
+            behaviours.append(stats)
+        behaviours.sort(key=lambda x: x['total_ms'], reverse=True)
+
+        return {
+            'ticks': self.ticks,
+            'phases': OrderedDict((name, self._get_stats(durations)) for name, durations in self._phases.items()),
+            'behaviours': behaviours,
+        }
+
+    def get_collapsed_stacks(self):
+        """
+        Returns the lines of the collapsed stack format, with the time in microseconds.
+        The time of the tree phase not spent at the behaviors' updates is assigned to the phase itself.
+        """
+        lines = []
+        behaviours_time = 0
+        for data in self._behaviours.values():
+            value = int(round(sum(data['durations']) * 1e6))
+            behaviours_time += value
+            if value > 0:
+                lines.append('tick;{};{} {}'.format(self.TREE_PHASE, ';'.join(data['stack']), value))
+
+        for name, durations in self._phases.items():
+            value = int(round(sum(durations) * 1e6))
+            if name == self.TREE_PHASE:
+                value -= behaviours_time
+            if value > 0:
+                lines.append('tick;{} {}'.format(name.replace(';', ',').replace(' ', '_'), value))
+
+        return lines
+
+    def write(self, filename):
+        """
+        Writes the JSON report and the collapsed stack file
+
+            :param filename (str): path of the files, without extension
+        """
+        with open(filename + '.json', 'w') as fd:
+            json.dump(self.get_report(), fd, indent=4)
+        with open(filename + '.folded', 'w') as fd:
+            fd.write('\n'.join(self.get_collapsed_stacks()) + '\n')
+
+        print("ScenarioManager: Profile written to {}.json and {}.folded".format(filename, filename))
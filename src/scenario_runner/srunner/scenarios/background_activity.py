@@ -17,6 +17,7 @@ from agents.navigation.local_planner import RoadOption
 
 from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
 from srunner.scenariomanager.scenarioatomics.atomic_behaviors import AtomicBehavior
+from srunner.tools.route_geometry import RouteGeometry
 from srunner.tools.scenario_helper import get_same_dir_lanes, get_opposite_dir_lanes
 
 JUNCTION_ENTRY = 'entry'
@@ -162,6 +163,78 @@ class Junction(object):
         return False
 
 
+class ActorCommandBuffer(object):
+
+    """
+    Coalesces the commands sent to the background actors. The last value sent to each actor
+    is remembered, and only changes are sent. The Traffic Manager speeds are sent directly,
+    as they have no batch command, while the velocity, light and autopilot commands are
+    queued and sent together with a single `apply_batch` on `flush`.
+
+    Target velocities are only applied once by the server, so they are always sent,
+    only keeping the last one queued for each actor.
+    """
+
+    def __init__(self, client, tm, tm_port, speed_tolerance=0.1):
+        """
+            :param client (carla.Client): client used to send the batches
+            :param tm (carla.TrafficManager): traffic manager of the actors
+            :param tm_port (int): port of the traffic manager
+            :param speed_tolerance (float): min change of the desired speed sent to the TM [km/h]
+        """
+        self._client = client
+        self._tm = tm
+        self._tm_port = tm_port
+        self._speed_tolerance = speed_tolerance
+
+        self._speeds = {}
+        self._lights = {}
+        self._autopilots = {}
+        self._pending = OrderedDict()  # (actor id, command type) - command
+
+    def set_desired_speed(self, actor, speed):
+        """Sets the Traffic Manager speed of the actor, if it has changed"""
+        last_speed = self._speeds.get(actor.id, None)
+        if last_speed is not None and abs(last_speed - speed) <= self._speed_tolerance:
+            return
+        self._tm.set_desired_speed(actor, speed)
+        self._speeds[actor.id] = speed
+
+    def set_target_velocity(self, actor, velocity):
+        """Queues the target velocity of the actor, replacing the one queued before"""
+        self._pending[(actor.id, 'velocity')] = carla.command.ApplyTargetVelocity(actor.id, velocity)
+
+    def set_light_state(self, actor, light_state):
+        """Queues the light state of the actor, if it has changed"""
+        light_state = carla.VehicleLightState(light_state)
+        if self._lights.get(actor.id, None) == light_state:
+            return
+        self._lights[actor.id] = light_state
+        self._pending[(actor.id, 'lights')] = carla.command.SetVehicleLightState(actor.id, light_state)
+
+    def set_autopilot(self, actor, enabled):
+        """Queues the autopilot state of the actor, if it has changed"""
+        if self._autopilots.get(actor.id, None) == enabled:
+            return
+        self._autopilots[actor.id] = enabled
+        self._pending[(actor.id, 'autopilot')] = carla.command.SetAutopilot(actor.id, enabled, self._tm_port)
+
+    def forget(self, actor):
+        """Removes all the stored values and queued commands of the actor"""
+        self._speeds.pop(actor.id, None)
+        self._lights.pop(actor.id, None)
+        self._autopilots.pop(actor.id, None)
+        for key in [key for key in self._pending if key[0] == actor.id]:
+            del self._pending[key]
+
+    def flush(self):
+        """Sends all the queued commands in a single batch"""
+        if not self._pending:
+            return
+        self._client.apply_batch(list(self._pending.values()))
+        self._pending.clear()
+
+
 class BackgroundBehavior(AtomicBehavior):
     """
     Handles the background activity
@@ -178,6 +251,7 @@ class BackgroundBehavior(AtomicBehavior):
         self._tm_port = CarlaDataProvider.get_traffic_manager_port()
         self._tm = CarlaDataProvider.get_client().get_trafficmanager(self._tm_port)
         self._tm.global_percentage_speed_difference(0.0)
+        self._commands = ActorCommandBuffer(CarlaDataProvider.get_client(), self._tm, self._tm_port)
         self._rng = CarlaDataProvider.get_random_seed()
 
         self._attribute_filter = {'base_type': 'car', 'special_type': '', 'has_lights': True, }
@@ -261,19 +335,10 @@ class BackgroundBehavior(AtomicBehavior):
 
     def _get_route_data(self, route):
         """Extract the information from the route"""
-        self._route = []  # Transform the route into a list of waypoints
-        self._route_options = []  # Extract the RoadOptions from the route
-        self._accum_dist = []  # Save the total traveled distance for each waypoint
-        prev_trans = None
-        for trans, option in route:
-            self._route.append(self._map.get_waypoint(trans.location))
-            self._route_options.append(option)
-            if prev_trans:
-                dist = trans.location.distance(prev_trans.location)
-                self._accum_dist.append(dist + self._accum_dist[-1])
-            else:
-                self._accum_dist.append(0)
-            prev_trans = trans
+        self._route_geometry = RouteGeometry.get(route)
+        self._route = self._route_geometry.waypoints  # Waypoints of the route, queried when first used
+        self._route_options = self._route_geometry.road_options
+        self._accum_dist = self._route_geometry.accum_dist  # Total traveled distance for each waypoint
 
         self._route_length = len(route)
         self._route_index = 0
@@ -339,6 +404,9 @@ class BackgroundBehavior(AtomicBehavior):
         # Update the speed of all vehicles
         self._set_actors_speed()
 
+        # Send all the commands of the tick at once
+        self._commands.flush()
+
         return py_trees.common.Status.RUNNING
 
     def terminate(self, new_status):
@@ -1110,7 +1178,7 @@ class BackgroundBehavior(AtomicBehavior):
                 speed = self._ego_actor.get_velocity().length()
                 if len(source.actors):
                     speed = min(speed, source.actors[-1].get_velocity().length())
-                actor.set_target_velocity(speed * forward_vec)
+                self._commands.set_target_velocity(actor, speed * forward_vec)
 
                 source.actors.append(actor)
 
@@ -1750,7 +1818,7 @@ class BackgroundBehavior(AtomicBehavior):
                     self._tm.update_vehicle_lights(actor, False)
                     lights = actor.get_light_state()
                     lights |= carla.VehicleLightState.Brake
-                    actor.set_light_state(carla.VehicleLightState(lights))
+                    self._commands.set_light_state(actor, lights)
 
     def _start_road_front_vehicles(self):
         """
@@ -1761,7 +1829,7 @@ class BackgroundBehavior(AtomicBehavior):
             self._tm.update_vehicle_lights(actor, True)
             lights = actor.get_light_state()
             lights &= ~carla.VehicleLightState.Brake
-            actor.set_light_state(carla.VehicleLightState(lights))
+            self._commands.set_light_state(actor, lights)
         self._scenario_stopped_actors = []
 
     def _stop_road_back_vehicles(self):
@@ -1855,7 +1923,7 @@ class BackgroundBehavior(AtomicBehavior):
             if collision_dist < destruction_dist:
                 self._destroy_actor(actor)
             elif collision_dist < stop_dist:
-                actor.set_target_velocity(carla.Vector3D())
+                self._commands.set_target_velocity(actor, carla.Vector3D())
 
     def _remove_road_lane(self, lane_wp):
         """Removes a road lane"""
@@ -1925,7 +1993,7 @@ class BackgroundBehavior(AtomicBehavior):
             actor = self._spawn_actor(spawn_wp)
             if not actor:
                 continue
-            actor.set_target_velocity(spawn_wp.transform.get_forward_vector() * ego_speed)
+            self._commands.set_target_velocity(actor, spawn_wp.transform.get_forward_vector() * ego_speed)
             actors.append(actor)
 
         self._road_dict[add_lane_key] = Source(prev_wp, actors, active=self._active_road_sources)
@@ -2215,20 +2283,20 @@ class BackgroundBehavior(AtomicBehavior):
                     continue
 
                 # TODO: Lane changes are weird with the TM, so just stop them
-                actor_wp = self._map.get_waypoint(location)
+                actor_wp = CarlaDataProvider.get_waypoint(location)
                 if actor_wp.lane_width < self._lane_width_threshold:
 
                     # Ensure only ending lanes are affected. not sure if it is needed though
                     next_wps = actor_wp.next(0.5)
                     if next_wps and next_wps[0].lane_width < actor_wp.lane_width:
-                        actor.set_target_velocity(carla.Vector3D(0, 0, 0))
+                        self._commands.set_target_velocity(actor, carla.Vector3D(0, 0, 0))
                         self._actors_speed_perc[actor] = 0
                         lights = actor.get_light_state()
                         lights |= carla.VehicleLightState.RightBlinker
                         lights |= carla.VehicleLightState.LeftBlinker
                         lights |= carla.VehicleLightState.Position
-                        actor.set_light_state(carla.VehicleLightState(lights))
-                        actor.set_autopilot(False, self._tm_port)
+                        self._commands.set_light_state(actor, lights)
+                        self._commands.set_autopilot(actor, False)
                         continue
 
                 self._set_road_actor_speed(location, actor)
@@ -2412,7 +2480,7 @@ class BackgroundBehavior(AtomicBehavior):
 
                 # Monitor its entry
                 elif state == JUNCTION_ENTRY:
-                    actor_wp = self._map.get_waypoint(location)
+                    actor_wp = CarlaDataProvider.get_waypoint(location)
                     if self._is_junction(actor_wp) and junction.contains_wp(actor_wp):
                         if junction.clear_middle:
                             self._destroy_actor(actor)  # Don't clutter the junction if a junction scenario is active
@@ -2421,7 +2489,7 @@ class BackgroundBehavior(AtomicBehavior):
 
                 # Monitor its exit and destroy an actor if needed
                 elif state == JUNCTION_MIDDLE:
-                    actor_wp = self._map.get_waypoint(location)
+                    actor_wp = CarlaDataProvider.get_waypoint(location)
                     actor_lane_key = get_lane_key(actor_wp)
                     if not self._is_junction(actor_wp) and actor_lane_key in exit_dict:
                         if i < max_index and actor_lane_key in junction.route_exit_keys:
@@ -2488,7 +2556,7 @@ class BackgroundBehavior(AtomicBehavior):
 
             # Ending / starting lanes create issues as the lane width gradually decreases until reaching 0,
             # where the lane starts / ends. Set their speed to 0, and they'll eventually dissapear.
-            actor_wp = self._map.get_waypoint(location)
+            actor_wp = CarlaDataProvider.get_waypoint(location)
             if actor_wp.lane_width < self._lane_width_threshold:
                 self._actors_speed_perc[actor] = 0
 
@@ -2504,7 +2572,7 @@ class BackgroundBehavior(AtomicBehavior):
 
             # TODO: Fix very high speed traffic
             speed = min(speed, 90)
-            self._tm.set_desired_speed(actor, speed)
+            self._commands.set_desired_speed(actor, speed)
 
     def _remove_actor_info(self, actor):
         """Removes all the references of the actor"""
@@ -2541,6 +2609,7 @@ class BackgroundBehavior(AtomicBehavior):
                     break
 
         self._actors_speed_perc.pop(actor, None)
+        self._commands.forget(actor)
         if actor in self._all_actors:
             self._all_actors.remove(actor)
 
@@ -2562,15 +2631,7 @@ class BackgroundBehavior(AtomicBehavior):
         location = CarlaDataProvider.get_location(self._ego_actor)
 
         prev_index = self._route_index
-        for index in range(self._route_index, min(self._route_index + self._route_buffer, self._route_length)):
-            route_wp = self._route[index]
-
-            route_wp_dir = route_wp.transform.get_forward_vector()    # Waypoint's forward vector
-            veh_wp_dir = location - route_wp.transform.location       # vector waypoint - vehicle
-            dot_ve_wp = veh_wp_dir.x * route_wp_dir.x + veh_wp_dir.y * route_wp_dir.y + veh_wp_dir.z * route_wp_dir.z
-
-            if dot_ve_wp > 0:
-                self._route_index = index
+        self._route_index = self._route_geometry.advance_index(location, self._route_index, self._route_buffer - 1)
 
         # Monitor route changes for those scenario that remove and readd a specific lane
         if self._scenario_removed_lane:
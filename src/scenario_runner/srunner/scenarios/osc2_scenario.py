@@ -9,7 +9,7 @@ import sys
 from typing import List, Tuple
 
 import py_trees
-from agents.navigation.global_route_planner import GlobalRoutePlanner
+from agents.navigation.global_route_planner import get_global_route_planner
 
 from srunner.osc2.ast_manager import ast_node
 from srunner.osc2.ast_manager.ast_vistor import ASTVisitor
@@ -364,7 +364,7 @@ def process_location_modifier(config, modifiers, duration: float, father_tree):
         current_car_transform = current_car_conf.get_arg("init_transform")
 
         # Get the global route planner, used to calculate the route
-        grp = GlobalRoutePlanner(CarlaDataProvider.get_world().get_map(), 0.5)
+        grp = get_global_route_planner(CarlaDataProvider.get_world().get_map(), 0.5)
         # grp.setup()
 
         distance = calculate_distance(
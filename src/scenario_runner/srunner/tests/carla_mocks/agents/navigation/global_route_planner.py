@@ -8,7 +8,10 @@
 This module provides GlobalRoutePlanner implementation.
 """
 
+import hashlib
 import math
+import threading
+from collections import OrderedDict
 import numpy as np
 import networkx as nx
 
@@ -16,6 +19,50 @@ import carla
 from agents.navigation.local_planner import RoadOption
 from agents.tools.misc import vector
 
+_planners = {}
+_planners_lock = threading.Lock()
+_map_hashes = OrderedDict()  # id of the map - map and the hash of its OpenDRIVE content
+
+
+def get_map_hash(wmap):
+    """
+    Returns the hash of the OpenDRIVE content of a map, computed once per carla.Map object
+    """
+    with _planners_lock:
+        entry = _map_hashes.get(id(wmap), None)
+        if entry is not None and entry[0] is wmap:
+            return entry[1]
+
+    map_hash = hashlib.sha1(wmap.to_opendrive().encode('utf-8')).hexdigest()
+    with _planners_lock:
+        _map_hashes[id(wmap)] = (wmap, map_hash)
+        while len(_map_hashes) > 8:
+            _map_hashes.popitem(last=False)
+    return map_hash
+
+
+def get_global_route_planner(wmap, sampling_resolution, route_cache_size=1024):  # pylint: disable=unused-argument
+    """
+    Returns the planner shared by the whole process for a map and sampling resolution
+    """
+    key = (get_map_hash(wmap), float(sampling_resolution))
+    with _planners_lock:
+        planner = _planners.get(key, None)
+        if planner is None:
+            planner = GlobalRoutePlanner(wmap, sampling_resolution)
+            _planners[key] = planner
+    return planner
+
+
+def clear_global_route_planners():
+    """
+    Forgets all the shared planners
+    """
+    with _planners_lock:
+        _planners.clear()
+        _map_hashes.clear()
+
+
 class GlobalRoutePlanner(object):
     """
     This class provides a very high level route plan.
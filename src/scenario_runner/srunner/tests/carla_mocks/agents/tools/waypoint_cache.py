@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+Loads the waypoint cache of the carla_agent package, which only depends on the standard library,
+so that the tests use the real module instead of a copy.
+"""
+
+import importlib.util
+import os
+import sys
+
+_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), *[os.pardir] * 6,
+                     'carla_agent', 'tools', 'waypoint_cache.py')
+
+_spec = importlib.util.spec_from_file_location(__name__, os.path.normpath(_PATH))
+_spec.loader.exec_module(sys.modules[__name__])
@@ -35,6 +35,9 @@ class command:
     def SetVehicleLightState():
         return None
 
+    def ApplyTargetVelocity(actor, velocity):
+        return None
+
     def DestroyActor(actor):
         return None
 
@@ -74,6 +77,15 @@ class GeoLocation:
     latitude = 0
 
 
+class Color:
+
+    def __init__(self, r=0, g=0, b=0, a=255):
+        self.r = r
+        self.g = g
+        self.b = b
+        self.a = a
+
+
 class Vector3D:
     x = 0
     y = 0
@@ -148,6 +160,9 @@ class Map:
     def get_topology(self):
         return []
 
+    def to_opendrive(self):
+        return ""
+
 
 class TrafficLightState:
     Red = 0
@@ -156,6 +171,20 @@ class TrafficLightState:
     Off = 3
 
 
+class LandmarkType:
+    MaximumSpeed = "274"
+    StopSign = "206"
+    YieldSign = "205"
+    Roundabout = "215"
+
+
+class VehicleLightState(int):
+    NONE = 0
+    Position = 1
+    LowBeam = 2
+    Brake = 8
+
+
 class WeatherParameters:
     cloudiness = 0.000000
     cloudiness = 0.000000
@@ -214,6 +243,7 @@ class Actor:
         self.location = Location()
         self.rotation = Rotation()
         self.transform = Transform(self.location, self.rotation)
+        self.velocity = Vector3D()
         self.is_alive = True
 
     def get_transform(self):
@@ -222,6 +252,9 @@ class Actor:
     def get_location(self):
         return self.location
 
+    def get_velocity(self):
+        return self.velocity
+
     def get_world(self):
         return World()
 
@@ -243,6 +276,39 @@ class Vehicle(Actor):
     is_vehicle = True
 
 
+class ActorSnapshot:
+
+    def __init__(self, actor):
+        self.id = actor.id
+        self._transform = actor.transform
+        self._velocity = actor.velocity
+
+    def get_transform(self):
+        return self._transform
+
+    def get_velocity(self):
+        return self._velocity
+
+
+class WorldSnapshot:
+    timestamp = None
+
+    def __init__(self, actors):
+        self._actor_snapshots = {actor.id: ActorSnapshot(actor) for actor in actors if actor.is_alive}
+
+    def find(self, actor_id):
+        return self._actor_snapshots.get(actor_id, None)
+
+    def has_actor(self, actor_id):
+        return actor_id in self._actor_snapshots
+
+    def __len__(self):
+        return len(self._actor_snapshots)
+
+    def __iter__(self):
+        return iter(self._actor_snapshots.values())
+
+
 class World:
     actors = []
 
@@ -258,6 +324,9 @@ class World:
     def wait_for_tick(self):
         pass
 
+    def get_snapshot(self):
+        return WorldSnapshot(self.actors)
+
     def get_actors(self, ids=[]):
         actor_list = []
         for actor in self.actors:
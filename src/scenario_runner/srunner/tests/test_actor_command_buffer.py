@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the buffer of the commands sent to the background actors
+"""
+
+from unittest import TestCase, mock
+
+import carla
+
+from srunner.scenarios.background_activity import ActorCommandBuffer
+
+
+class RecordingClient(object):
+    """Client recording the batches and the desired speeds sent"""
+
+    def __init__(self):
+        self.batches = []
+        self.speeds = []
+
+    def apply_batch(self, commands):
+        """Records a batch"""
+        self.batches.append(commands)
+
+    def set_desired_speed(self, actor, speed):
+        """Records a Traffic Manager speed"""
+        self.speeds.append((actor.id, speed))
+
+
+def make_actor(actor_id):
+    """Creates an actor with the given id"""
+    actor = carla.Vehicle()
+    actor.id = actor_id
+    return actor
+
+
+class TestActorCommandBuffer(TestCase):
+    """
+    Checks which commands are sent, and when
+    """
+
+    def setUp(self):
+        # The commands are described by their name and arguments
+        patches = [
+            mock.patch.object(carla.command, name, side_effect=lambda *args, name=name: (name,) + args)
+            for name in ('ApplyTargetVelocity', 'SetVehicleLightState', 'SetAutopilot')]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.client = RecordingClient()
+        self.buffer = ActorCommandBuffer(self.client, self.client, 8000)
+        self.actors = [make_actor(1), make_actor(2)]
+
+    def test_target_velocity_always_sent(self):
+        """
+        The target velocities are sent every tick, even if they haven't changed,
+        and only the last one of each actor in a tick
+        """
+        zero = carla.Vector3D(0, 0, 0)
+        for _ in range(3):
+            self.buffer.set_target_velocity(self.actors[0], carla.Vector3D(5, 0, 0))
+            self.buffer.set_target_velocity(self.actors[0], zero)
+            self.buffer.set_target_velocity(self.actors[1], zero)
+            self.buffer.flush()
+
+        self.assertEqual(len(self.client.batches), 3)
+        for batch in self.client.batches:
+            self.assertEqual(batch, [('ApplyTargetVelocity', 1, zero), ('ApplyTargetVelocity', 2, zero)])
+
+    def test_changes_only(self):
+        """
+        The lights, autopilot and desired speeds are only sent when they change
+        """
+        for light_state in (carla.VehicleLightState.Position, carla.VehicleLightState.Position,
+                            carla.VehicleLightState.Brake):
+            self.buffer.set_light_state(self.actors[0], light_state)
+            self.buffer.set_autopilot(self.actors[0], True)
+            self.buffer.set_desired_speed(self.actors[0], 30)
+            self.buffer.flush()
+        self.buffer.set_desired_speed(self.actors[0], 30.05)
+        self.buffer.set_desired_speed(self.actors[0], 35)
+
+        self.assertEqual(self.client.batches, [
+            [('SetVehicleLightState', 1, carla.VehicleLightState.Position), ('SetAutopilot', 1, True, 8000)],
+            [('SetVehicleLightState', 1, carla.VehicleLightState.Brake)]])
+        self.assertEqual(self.client.speeds, [(1, 30), (1, 35)])
+
+    def test_forget(self):
+        """
+        Forgotten actors don't send their queued commands, and send again their next ones
+        """
+        self.buffer.set_autopilot(self.actors[0], True)
+        self.buffer.set_autopilot(self.actors[1], True)
+        self.buffer.set_target_velocity(self.actors[0], carla.Vector3D(1, 0, 0))
+        self.buffer.forget(self.actors[0])
+        self.buffer.flush()
+        self.buffer.flush()
+        self.assertEqual(self.client.batches, [[('SetAutopilot', 2, True, 8000)]])
+
+        self.buffer.set_autopilot(self.actors[0], True)
+        self.buffer.flush()
+        self.assertEqual(self.client.batches[-1], [('SetAutopilot', 1, True, 8000)])
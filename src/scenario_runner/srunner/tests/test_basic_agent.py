@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the BasicAgent of the carla_agent package. The mocked
+agents only include a copy of its dependencies, so the agent is loaded from its file.
+"""
+
+from collections import deque
+from types import SimpleNamespace
+from unittest import TestCase
+import importlib.util
+import math
+import os
+import random
+
+import carla
+
+from agents.tools.world_state_cache import WorldStateCache
+
+from srunner.tests.test_world_state_cache import StateActor, TickingWorld
+
+# pylint: disable=protected-access
+
+AGENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, os.pardir,
+                          'carla_agent', 'navigation', 'basic_agent.py')
+
+
+def load_basic_agent():
+    """Returns the basic_agent module of the carla_agent package"""
+    spec = importlib.util.spec_from_file_location('carla_agent_basic_agent', os.path.normpath(AGENT_PATH))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+basic_agent = load_basic_agent()
+
+
+class Vector(object):
+    """Vector with the arithmetic of carla.Vector3D and carla.Location"""
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        if isinstance(x, Vector):
+            x, y, z = x.x, x.y, x.z
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __add__(self, other):
+        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, value):
+        return Vector(self.x * value, self.y * value, self.z * value)
+
+    __rmul__ = __mul__
+
+    def distance(self, other):
+        """Euclidean distance to another location"""
+        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2 + (self.z - other.z) ** 2)
+
+
+class Transform(object):
+    """Transform with the forward and right vectors of carla.Transform"""
+
+    def __init__(self, location, pitch=0.0, yaw=0.0):
+        self.location = location
+        self.rotation = carla.Rotation(pitch=pitch, yaw=yaw)
+
+    def get_forward_vector(self):
+        """Unit vector pointing forward"""
+        pitch = math.radians(self.rotation.pitch)
+        yaw = math.radians(self.rotation.yaw)
+        return Vector(math.cos(pitch) * math.cos(yaw), math.cos(pitch) * math.sin(yaw), math.sin(pitch))
+
+    def get_right_vector(self):
+        """Unit vector pointing to the right, on the horizontal plane"""
+        yaw = math.radians(self.rotation.yaw)
+        return Vector(-math.sin(yaw), math.cos(yaw), 0)
+
+
+class BoundingBox(object):
+    """Bounding box with the world vertices of carla.BoundingBox"""
+
+    def __init__(self, location, extent):
+        self.location = location
+        self.extent = extent
+
+    def get_world_vertices(self, transform):
+        """Returns the eight corners of the box placed at a transform"""
+        forward = transform.get_forward_vector()
+        right = transform.get_right_vector()
+        vertices = []
+        for i in (-1, 1):
+            for j in (-1, 1):
+                for k in (-1, 1):
+                    vertices.append(transform.location + forward * (self.location.x + i * self.extent.x) +
+                                    right * (self.location.y + j * self.extent.y) +
+                                    Vector(0, 0, self.location.z + k * self.extent.z))
+        return vertices
+
+
+class GridMap(object):
+    """Map of straight roads 40 meters long along x, with lanes 3.5 meters wide"""
+
+    def get_waypoint(self, location, project_to_road=True, lane_type=None):  # pylint: disable=unused-argument
+        """Returns the waypoint at the center of the lane of a location"""
+        lane = math.floor(location.y / 3.5)
+        waypoint = SimpleNamespace(road_id=int(location.x // 40), lane_id=int(lane) or 1,
+                                   is_junction=location.x % 40 < 8, lane_width=3.5)
+        waypoint.transform = Transform(Vector(location.x, (lane + 0.5) * 3.5, 0))
+        waypoint.id = hash((waypoint.road_id, waypoint.lane_id, round(location.x, 1)))
+        return waypoint
+
+
+class Vehicle(object):
+    """Vehicle whose getters return a new transform, as the ones of the server"""
+
+    def __init__(self, actor_id, transform, bounding_box):
+        self.id = actor_id
+        self.type_id = "vehicle.test"
+        self.transform = transform
+        self.velocity = Vector()
+        self.bounding_box = bounding_box
+        self.is_alive = True
+
+    def get_transform(self):
+        """Copy of the transform of the vehicle"""
+        return Transform(Vector(self.transform.location), self.transform.rotation.pitch, self.transform.rotation.yaw)
+
+    def get_location(self):
+        """Copy of the location of the vehicle"""
+        return Vector(self.transform.location)
+
+
+class LocalPlanner(object):
+    """Local planner following a fixed plan"""
+
+    def __init__(self, plan):
+        self._plan = deque(plan)
+
+    def get_plan(self):
+        """Returns the plan"""
+        return self._plan
+
+    def get_incoming_waypoint_and_direction(self, steps=3):
+        """Returns the waypoint of the plan some steps ahead"""
+        if len(self._plan) > steps:
+            return self._plan[steps]
+        return self._plan[-1] if self._plan else (None, None)
+
+
+# The obstacle detection needs the geometry of the carla classes, missing from the mocked ones
+obstacle_agent = load_basic_agent()
+obstacle_agent.carla = SimpleNamespace(Location=Vector, LaneType=SimpleNamespace(Any=-1))
+
+
+class TestTrafficLights(TestCase):
+    """
+    Checks that the agent reads the traffic lights through the world state cache
+    """
+
+    def setUp(self):
+        WorldStateCache.clear()
+        self.light = StateActor(3, "traffic.traffic_light", 0, 0, carla.TrafficLightState.Red)
+        self.vehicle = StateActor(1, "vehicle.tesla.model3", 10, 0)
+        self.world = TickingWorld(1, [self.vehicle, self.light])
+
+        agent = object.__new__(basic_agent.BasicAgent)
+        agent._vehicle = self.vehicle
+        agent._world_state = WorldStateCache.get(self.world)
+        agent._ignore_traffic_lights = False
+        agent._base_tlight_threshold = 5.0
+        agent._last_traffic_light = self.light
+        # The stop line of the light is on another road, so only the last light can affect the agent
+        agent._lights_map = {self.light.id: SimpleNamespace(road_id=2, transform=carla.Transform())}
+        agent._waypoint_cache = SimpleNamespace(get_waypoint=lambda location: SimpleNamespace(road_id=1))
+        self.agent = agent
+
+    def tearDown(self):
+        WorldStateCache.clear()
+
+    def test_state_read_once_per_frame(self):
+        """
+        The agent stops at the red light, reading its state once per frame
+        """
+        for _ in range(3):
+            self.assertEqual(self.agent._affected_by_traffic_light([self.light]), (True, self.light))
+        self.assertEqual(self.light.state_reads, 1)
+
+        self.light._state = carla.TrafficLightState.Green
+        self.world.tick()
+        self.assertEqual(self.agent._affected_by_traffic_light([self.light]), (False, None))
+        self.assertIsNone(self.agent._last_traffic_light)
+        self.assertEqual(self.light.state_reads, 2)
+
+
+class TestVehicleObstacles(TestCase):
+    """
+    Checks that discarding the obstacle candidates at once doesn't change the detected vehicles
+    """
+
+    def setUp(self):
+        WorldStateCache.clear()
+        self.rng = random.Random(1)
+
+    def tearDown(self):
+        WorldStateCache.clear()
+
+    def make_agent(self, ego, world, plan, exhaustive=False):
+        """
+        Creates an agent, which checks all the vehicles one by one if exhaustive,
+        as done before the candidates were computed
+        """
+        agent = object.__new__(obstacle_agent.BasicAgent)
+        agent._vehicle = ego
+        agent._world = world
+        agent._map = GridMap()
+        agent._world_state = WorldStateCache.get(world)
+        agent._local_planner = LocalPlanner(plan)
+        agent._ignore_vehicles = False
+        agent._base_vehicle_threshold = 5.0
+        agent._offset = self.rng.choice([0, 0, 1.5])
+        agent._use_bbs_detection = self.rng.random() < 0.5
+        agent._actor_arrays = None
+        agent._actor_sizes = {}
+        agent._route_polygon = None
+        if exhaustive:
+            agent._get_obstacle_candidates = lambda actor_list, *args: [
+                i for i, actor in enumerate(actor_list) if actor.id != ego.id]
+        return agent
+
+    def make_world(self, world_id):
+        """Creates a world with an ego and randomly placed vehicles around it"""
+        ego = Vehicle(0, Transform(Vector(self.rng.uniform(0, 200), self.rng.uniform(-10, 10), 0),
+                                   yaw=self.rng.uniform(-30, 30)), BoundingBox(Vector(), Vector(2.4, 1, 0.8)))
+        vehicles = [ego]
+        for i in range(1, self.rng.choice([5, 30, 100])):
+            location = ego.transform.location + Vector(
+                self.rng.uniform(-60, 60), self.rng.uniform(-15, 15), self.rng.uniform(-0.5, 0.5))
+            transform = Transform(location, self.rng.uniform(-5, 5), self.rng.uniform(-180, 180))
+            extent = Vector(self.rng.uniform(0.3, 3), self.rng.uniform(0.3, 1.2), 0.8)
+            vehicles.append(Vehicle(i, transform, BoundingBox(Vector(self.rng.uniform(-0.3, 0.3), 0, 0.7), extent)))
+        return ego, TickingWorld(world_id, vehicles)
+
+    def make_plan(self, ego):
+        """Creates a plan starting at the ego, slightly curved"""
+        yaw = math.radians(ego.transform.rotation.yaw)
+        start = ego.transform.location
+        curve = 0.02 * self.rng.choice([1, -1])
+        return [(GridMap().get_waypoint(Vector(start.x + 2 * k * math.cos(yaw) + curve * k * k,
+                                               start.y + 2 * k * math.sin(yaw))), None)
+                for k in range(self.rng.choice([0, 1, 30]))]
+
+    def test_same_detections(self):
+        """
+        The agent detects the same vehicles as when checking all of them
+        """
+        detections = 0
+        for world_id in range(500):
+            ego, world = self.make_world(world_id)
+            plan = self.make_plan(ego)
+            state = self.rng.getstate()
+            exhaustive = self.make_agent(ego, world, plan, exhaustive=True)
+            self.rng.setstate(state)
+            agent = self.make_agent(ego, world, plan)
+
+            arguments = {
+                'max_distance': self.rng.choice([None, 8, 20, 40]),
+                'up_angle_th': self.rng.choice([90, 180]),
+                'low_angle_th': self.rng.choice([0, 160]),
+                'lane_offset': self.rng.choice([0, 1, -1])
+            }
+            expected = exhaustive._vehicle_obstacle_detected(world.actors, **arguments)
+            for _ in range(2):
+                result = agent._vehicle_obstacle_detected(world.actors, **arguments)
+                self.assertEqual(result[:2], expected[:2])
+                self.assertAlmostEqual(result[2], expected[2])
+            detections += expected[0]
+
+        self.assertGreater(detections, 50)
+
+    def test_destroyed_actor_sizes(self):
+        """
+        The sizes of the destroyed vehicles are forgotten
+        """
+        ego, world = self.make_world(1)
+        agent = self.make_agent(ego, world, self.make_plan(ego))
+        agent._vehicle_obstacle_detected(world.actors)
+        self.assertEqual(set(agent._actor_sizes), set(actor.id for actor in world.actors))
+
+        for i in range(10):
+            world.actors = [ego, Vehicle(1000 + i, Transform(Vector(-1000, 0, 0)), ego.bounding_box)]
+            world.tick()
+            agent._vehicle_obstacle_detected(world.actors)
+        self.assertLessEqual(len(agent._actor_sizes), 3)
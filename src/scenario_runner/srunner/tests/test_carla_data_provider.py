@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the per tick refresh of the CarlaDataProvider
+"""
+
+from unittest import TestCase
+
+import carla
+from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
+
+
+class CountingActor(carla.Vehicle):
+    """
+    Mocked actor counting the calls that would be a request to the server
+    """
+
+    calls = 0
+
+    def get_transform(self):
+        CountingActor.calls += 1
+        return super(CountingActor, self).get_transform()
+
+    def get_location(self):
+        CountingActor.calls += 1
+        return super(CountingActor, self).get_location()
+
+    def get_velocity(self):
+        CountingActor.calls += 1
+        return super(CountingActor, self).get_velocity()
+
+
+def register_actors(amount):
+    """
+    Creates a world with the given amount of moving actors and registers them
+    """
+    world = carla.World()
+    world.actors = []
+    for i in range(amount):
+        actor = CountingActor()
+        actor.id = i
+        actor.location = carla.Location(i, 2 * i, 0)
+        actor.transform = carla.Transform(actor.location, carla.Rotation(yaw=i))
+        actor.velocity = carla.Vector3D(3, 4, 1)
+        world.actors.append(actor)
+
+    CarlaDataProvider._world = world  # pylint: disable=protected-access
+    CarlaDataProvider.register_actors(world.actors)
+    return world
+
+
+def count_calls(refresh, ticks=5):
+    """
+    Returns the mean actor calls of one refresh
+    """
+    CountingActor.calls = 0
+    for _ in range(ticks):
+        refresh()
+    return CountingActor.calls / ticks
+
+
+class TestDataProviderRefresh(TestCase):
+    """
+    Test class of CarlaDataProvider.on_carla_tick
+    """
+
+    def tearDown(self):
+        CarlaDataProvider.cleanup()
+
+    def test_snapshot_refresh(self):
+        """
+        Refreshing from a snapshot gives the same values as querying the actors,
+        without any actor call
+        """
+        world = register_actors(10)
+
+        CountingActor.calls = 0
+        CarlaDataProvider.on_carla_tick()
+        self.assertEqual(CountingActor.calls, 0)
+
+        for actor in world.actors:
+            self.assertEqual(CarlaDataProvider.get_velocity(actor), 5)
+            self.assertIs(CarlaDataProvider.get_location(actor), actor.location)
+            self.assertIs(CarlaDataProvider.get_transform(actor), actor.transform)
+
+    def test_destroyed_actor_keeps_last_state(self):
+        """
+        Actors missing from the snapshot are not updated
+        """
+        world = register_actors(2)
+        CarlaDataProvider.on_carla_tick()
+
+        destroyed = world.actors[1]
+        destroyed.is_alive = False
+        destroyed.velocity = carla.Vector3D(0, 0, 0)
+        CarlaDataProvider.on_carla_tick()
+
+        self.assertEqual(CarlaDataProvider.get_velocity(destroyed), 5)
+
+    def test_tick_calls_scaling(self):
+        """
+        Refreshing from the actors makes calls for each of them, while the snapshot makes none
+        """
+        for amount in (10, 300):
+            world = register_actors(amount)
+            actor_calls = count_calls(CarlaDataProvider._refresh_from_actors)  # pylint: disable=protected-access
+            snapshot_calls = count_calls(
+                lambda: CarlaDataProvider._refresh_from_snapshot(world.get_snapshot()))  # pylint: disable=protected-access
+            CarlaDataProvider.cleanup()
+
+            self.assertEqual(snapshot_calls, 0)
+            self.assertGreaterEqual(actor_calls, 3 * amount)
+
+
+class CountingWorld(carla.World):
+    """
+    Mocked world counting the map downloads
+    """
+
+    map_calls = 0
+
+    def __init__(self, world_id):
+        self.id = world_id  # pylint: disable=invalid-name
+
+    def get_map(self):
+        CountingWorld.map_calls += 1
+        world_map = super(CountingWorld, self).get_map()
+        world_map.name = 'Carla/Maps/Town01'
+        return world_map
+
+
+class TestWarmWorld(TestCase):
+    """
+    Test class of the warm world mode of the CarlaDataProvider
+    """
+
+    def tearDown(self):
+        CarlaDataProvider.set_warm_world_mode(False)
+        CarlaDataProvider.cleanup()
+
+    def test_map_data_reused(self):
+        """
+        The map data is only kept in warm world mode, and only reused by the same world
+        """
+        CountingWorld.map_calls = 0
+        world = CountingWorld(1)
+
+        CarlaDataProvider.set_world(world)
+        CarlaDataProvider.cleanup()
+        self.assertFalse(CarlaDataProvider.is_warm_world(world))
+        CarlaDataProvider.set_world(world)
+        self.assertEqual(CountingWorld.map_calls, 2)
+
+        CarlaDataProvider.set_warm_world_mode(True)
+        CarlaDataProvider.cleanup()
+        self.assertTrue(CarlaDataProvider.is_warm_world(world, 'Town01'))
+        self.assertFalse(CarlaDataProvider.is_warm_world(world, 'Town02'))
+        CarlaDataProvider.set_world(world)
+        self.assertEqual(CountingWorld.map_calls, 2)
+        self.assertEqual(CarlaDataProvider.get_map().name, 'Carla/Maps/Town01')
+
+        CarlaDataProvider.cleanup()
+        CarlaDataProvider.set_world(CountingWorld(2))
+        self.assertEqual(CountingWorld.map_calls, 3)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the offline LaneNetwork, using a small synthetic map
+"""
+
+from unittest import TestCase
+from types import SimpleNamespace
+import os
+import random
+import shutil
+import tempfile
+
+import srunner.tools.lane_network as lane_network
+from srunner.tools.lane_network import LaneNetwork
+
+ROAD_LENGTH = 50.0
+LANE_WIDTH = 3.5
+LANE_IDS = (2, 1, -1, -2)
+
+
+class StraightWaypoint(object):
+    """
+    Waypoint of a map made of two consecutive straight roads along the x axis, each one with
+    two lanes per direction. Negative lanes drive towards +x, positive ones towards -x.
+    """
+
+    def __init__(self, road_id, lane_id, s):
+        self.road_id = road_id
+        self.section_id = 0
+        self.lane_id = lane_id
+        self.s = s
+        self.lane_width = LANE_WIDTH
+        self.is_junction = False
+
+        x = (road_id - 1) * ROAD_LENGTH + s
+        y = (abs(lane_id) - 0.5) * LANE_WIDTH * (1 if lane_id < 0 else -1)
+        yaw = 0.0 if lane_id < 0 else 180.0
+        self.transform = SimpleNamespace(
+            location=SimpleNamespace(x=x, y=y, z=0.0), rotation=SimpleNamespace(yaw=yaw))
+
+    def next(self, distance):
+        """Moves along the driving direction, jumping to the other road at the end"""
+        s = self.s + distance if self.lane_id < 0 else self.s - distance
+        if 0 <= s <= ROAD_LENGTH:
+            return [StraightWaypoint(self.road_id, self.lane_id, s)]
+        if self.lane_id < 0 and self.road_id == 1:
+            return [StraightWaypoint(2, self.lane_id, s - ROAD_LENGTH)]
+        if self.lane_id > 0 and self.road_id == 2:
+            return [StraightWaypoint(1, self.lane_id, s + ROAD_LENGTH)]
+        return []
+
+
+class StraightMap(object):
+    """
+    Map of StraightWaypoints
+    """
+
+    name = 'Carla/Maps/Straight'
+
+    def get_topology(self):
+        topology = []
+        for road_id in (1, 2):
+            for lane_id in LANE_IDS:
+                entry = StraightWaypoint(road_id, lane_id, 0.0 if lane_id < 0 else ROAD_LENGTH)
+                topology.append((entry, entry))
+        return topology
+
+    def to_opendrive(self):
+        return 'straight'
+
+    def get_waypoint(self, location):
+        road_id = 1 if location.x < ROAD_LENGTH else 2
+        s = min(max(location.x - (road_id - 1) * ROAD_LENGTH, 0.0), ROAD_LENGTH)
+        lane = min(int(abs(location.y) // LANE_WIDTH) + 1, 2)
+        lane_id = -lane if location.y > 0 else lane
+        return StraightWaypoint(road_id, lane_id, s)
+
+
+class TestLaneNetwork(TestCase):
+    """
+    Checks the queries of the LaneNetwork against the synthetic map
+    """
+
+    def setUp(self):
+        self.map = StraightMap()
+        self.network = LaneNetwork.from_map(self.map, precision=0.5)
+
+    def test_nearest_matches_recorded_waypoints(self):
+        """
+        The nearest lanes match the ones given by the map, away from the lane and road borders
+        """
+        rng = random.Random(0)
+        recorded = []
+        for _ in range(500):
+            x = rng.uniform(0, ROAD_LENGTH - 1) + rng.choice([0, ROAD_LENGTH + 1])
+            y = rng.choice([-1, 1]) * (rng.uniform(0.1, 1.6) + rng.choice([0, LANE_WIDTH]))
+            location = SimpleNamespace(x=x, y=y, z=0.0)
+            recorded.append((location, self.map.get_waypoint(location)))
+
+        self.assertEqual(self.network.validate(recorded), 1.0)
+
+    def test_lane_at_point(self):
+        """
+        Locations outside the lanes don't have a lane
+        """
+        point = self.network.get_lane_at(SimpleNamespace(x=10.2, y=3.0, z=0.0))
+        self.assertEqual((point.road_id, point.lane_id), (1, -1))
+        self.assertIsNone(self.network.get_lane_at(SimpleNamespace(x=10.2, y=7.5, z=0.0)))
+
+    def test_neighbours(self):
+        """
+        Left and right lanes follow the driving direction of the lane
+        """
+        point = self.network.get_nearest(SimpleNamespace(x=20.0, y=1.75, z=0.0))
+        self.assertEqual(point.lane_id, -1)
+        self.assertEqual(self.network.get_left_lane(point).lane_id, 1)
+        self.assertEqual(self.network.get_right_lane(point).lane_id, -2)
+        self.assertIsNone(self.network.get_right_lane(self.network.get_right_lane(point)))
+
+        point = self.network.get_nearest(SimpleNamespace(x=20.0, y=-1.75, z=0.0))
+        self.assertEqual(self.network.get_left_lane(point).lane_id, -1)
+        self.assertEqual(self.network.get_right_lane(point).lane_id, 2)
+        self.assertAlmostEqual(self.network.get_right_lane(point).x, point.x)
+
+    def test_next_and_successors(self):
+        """
+        Moving forward continues into the successor lanes
+        """
+        point = self.network.get_nearest(SimpleNamespace(x=45.0, y=1.75, z=0.0))
+        next_points = self.network.get_next(point, 10.0)
+        self.assertEqual(len(next_points), 1)
+        self.assertEqual((next_points[0].road_id, next_points[0].lane_id), (2, -1))
+        self.assertAlmostEqual(next_points[0].x, 55.0)
+
+        successors = self.network.get_successors(point)
+        self.assertEqual([(p.road_id, p.lane_id) for p in successors], [(2, -1)])
+
+        point = self.network.get_nearest(SimpleNamespace(x=5.0, y=-1.75, z=0.0))
+        self.assertEqual(self.network.get_next(point, 10.0), [])
+
+    def test_disk_cache(self):
+        """
+        The stored network gives the same answers as the built one
+        """
+        cache_dir = tempfile.mkdtemp()
+        try:
+            LaneNetwork.get(self.map, cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            loaded = LaneNetwork.get(self.map, cache_dir)
+        finally:
+            shutil.rmtree(cache_dir)
+
+        points = [[x, y] for x in range(0, 100, 7) for y in (-6, -2, 1, 3, 5)]
+        self.assertEqual(loaded.get_nearest_indexes(points).tolist(),
+                         self.network.get_nearest_indexes(points).tolist())
+        self.assertEqual(loaded.successors.tolist(), self.network.successors.tolist())
+
+    def test_grid_index(self):
+        """
+        The grid used without scipy finds the same samples
+        """
+        points = [[x + 0.3, y] for x in range(-20, 130, 3) for y in (-9, -2, 1, 3, 12)]
+        tree = lane_network.cKDTree
+        lane_network.cKDTree = None
+        try:
+            network = LaneNetwork.from_map(self.map, precision=0.5)
+            indexes = network.get_nearest_indexes(points)
+        finally:
+            lane_network.cKDTree = tree
+
+        self.assertEqual(len(indexes), len(points))
+        for (x, y), i in zip(points, indexes):
+            best = ((network.positions[:, :2] - (x, y)) ** 2).sum(axis=1).min()
+            self.assertAlmostEqual(((network.positions[i, :2] - (x, y)) ** 2).sum(), best)
+
+    def test_overpass(self):
+        """
+        The nearest lane is the one at the height of the location, also without scipy
+        """
+        # A lane along the x axis, and an overpass crossing it 8 meters above
+        xs = [float(x) for x in range(-20, 21)]
+        positions = [[x, 0.0, 0.0] for x in xs] + [[0.5, x, 8.0] for x in xs]
+        samples = len(positions)
+        network = LaneNetwork([(1, 0, -1), (2, 0, -1)], [0, len(xs), samples], positions,
+                              [0.0] * len(xs) + [90.0] * len(xs), [LANE_WIDTH] * samples, [False] * samples,
+                              xs + xs, [0] * len(xs) + [1] * len(xs), [])
+
+        tree = lane_network.cKDTree
+        for kd_tree in (tree, None):
+            lane_network.cKDTree = kd_tree
+            try:
+                network._trees = {}  # pylint: disable=protected-access
+                self.assertEqual(network.get_nearest(SimpleNamespace(x=0.1, y=0.2, z=8.5)).road_id, 2)
+                self.assertEqual(network.get_nearest(SimpleNamespace(x=0.1, y=0.2, z=0.5)).road_id, 1)
+                self.assertEqual(network.get_lane_at(SimpleNamespace(x=0.3, y=0.5, z=8.5)).road_id, 2)
+                self.assertEqual(network.get_lane_at(SimpleNamespace(x=0.3, y=0.5, z=0.5)).road_id, 1)
+                self.assertEqual(network.get_nearest_indexes([[0.1, 0.2]]).tolist(), [20])
+            finally:
+                lane_network.cKDTree = tree
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the columnar queries of the MetricsLog, using a synthetic log
+"""
+
+from unittest import TestCase
+
+import numpy as np
+
+import carla
+
+from srunner.metrics.tools.metrics_log import MetricsLog
+
+FRAMES = 10
+
+
+def make_log():
+    """
+    Creates a log with an actor alive the whole simulation, one spawned at frame 3 and
+    destroyed after frame 6, and one whose velocity is missing at frame 5
+    """
+    frames = []
+    for frame in range(1, FRAMES + 1):
+        actors = {}
+        actors[1] = make_state(frame, 1)
+        if 3 <= frame <= 6:
+            actors[2] = make_state(frame, 2)
+        actors[3] = make_state(frame, 3)
+        if frame == 5:
+            del actors[3]["velocity"]
+        frames.append({"frame": {"elapsed_time": 0.05 * frame, "delta_time": 0.05, "platform_time": 0.0},
+                       "actors": actors, "events": {}})
+
+    simulation = {"total_frames": FRAMES}
+    log = MetricsLog.__new__(MetricsLog)
+    log._set_parsed_info((simulation, {}, frames))  # pylint: disable=protected-access
+    return log
+
+
+def make_state(frame, actor_id):
+    """Creates the numeric states of an actor at a frame"""
+    value = float(frame * 10 + actor_id)
+    return {
+        "transform": carla.Transform(carla.Location(value, value + 1, 0.5), carla.Rotation(0.0, 0.0, value)),
+        "velocity": carla.Vector3D(value, 0.0, 0.0),
+        "angular_velocity": carla.Vector3D(0.0, 0.0, value),
+        "acceleration": carla.Vector3D(0.0, value, 0.0),
+    }
+
+
+class TestMetricsLogArrays(TestCase):
+    """
+    Checks that the arrays match the per frame getters
+    """
+
+    def setUp(self):
+        self.log = make_log()
+
+    def assert_matches(self, actor_id, first_frame=None, last_frame=None):
+        """The arrays have the same values as the lists of carla objects, and NaN where these are None"""
+        transforms = self.log.get_all_actor_transforms(actor_id, first_frame, last_frame)
+        transforms_array = self.log.get_all_actor_transforms_array(actor_id, first_frame, last_frame)
+        velocities = self.log.get_all_actor_velocities(actor_id, first_frame, last_frame)
+        velocities_array = self.log.get_all_actor_velocities_array(actor_id, first_frame, last_frame)
+        self.assertEqual(len(transforms_array), len(transforms))
+
+        for i, transform in enumerate(transforms):
+            if transform is None:
+                self.assertTrue(np.isnan(transforms_array[i]).all())
+            else:
+                self.assertEqual(list(transforms_array[i]), [
+                    transform.location.x, transform.location.y, transform.location.z,
+                    transform.rotation.pitch, transform.rotation.yaw, transform.rotation.roll])
+
+        for i, velocity in enumerate(velocities):
+            if velocity is None:
+                self.assertTrue(np.isnan(velocities_array[i]).all())
+            else:
+                self.assertEqual(list(velocities_array[i]), [velocity.x, velocity.y, velocity.z])
+
+    def test_arrays(self):
+        """
+        The arrays match for all the actors and frame intervals
+        """
+        for actor_id in [1, 2, 3, 4]:
+            self.assert_matches(actor_id)
+            self.assert_matches(actor_id, 2, 4)
+            self.assert_matches(actor_id, 6, FRAMES)
+            self.assert_matches(actor_id, 5, 5)
+
+        self.assertTrue(np.isnan(self.log.get_all_actor_velocities_array(3)[4]).all())
+        self.assertFalse(np.isnan(self.log.get_all_actor_transforms_array(3)[4]).any())
+
+    def test_alive_mask(self):
+        """
+        The alive mask tells the frames where the actor is part of the log
+        """
+        self.assertTrue(self.log.get_actor_alive_mask(1).all())
+        self.assertEqual(list(self.log.get_actor_alive_mask(2)), [2 < frame < 7 for frame in range(1, FRAMES + 1)])
+        self.assertEqual(list(self.log.get_actor_alive_mask(2, 5, 8)), [True, True, False, False])
+        self.assertEqual(list(self.log.get_actor_alive_mask(2, 1, 2)), [False, False])
+        self.assertTrue(self.log.get_actor_alive_mask(3).all())
+        self.assertFalse(self.log.get_actor_alive_mask(4).any())
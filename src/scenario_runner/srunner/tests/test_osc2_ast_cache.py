@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the OSC2ASTCache, using a small scenario with an import
+"""
+
+from types import SimpleNamespace
+from unittest import TestCase, mock
+import os
+import shutil
+import tempfile
+
+from srunner.tools.osc2_helper import OSC2ASTCache, OSC2Helper
+import srunner.osc2.utils.log_manager as log_manager
+
+BASE_OSC = """type time is SI(s: 1)
+unit s of time is SI(s: 1, factor: 1)
+type speed is SI(m: 1, s: -1)
+unit kmph of speed is SI(m: 1, s: -1, factor: 0.277777778)
+
+actor car:
+    max_speed: speed
+
+"""
+
+TOP_OSC = """import base.osc
+
+scenario top:
+    ego_vehicle: car
+    do serial:
+        wait elapsed(3s)
+
+"""
+
+
+class TestOSC2ASTCache(TestCase):
+    """
+    Checks that the ASTs are reused from memory and disk, that changing an import invalidates them,
+    and that the ASTs with errors or warnings aren't reused
+    """
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.work_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.work_dir, "cache")
+        self.cache_env = os.environ.get(OSC2ASTCache.CACHE_DIR_ENV, None)
+        os.environ[OSC2ASTCache.CACHE_DIR_ENV] = self.cache_dir
+
+        os.chdir(self.work_dir)
+        self.write("base.osc", BASE_OSC)
+        self.write("top.osc", TOP_OSC)
+        OSC2ASTCache.clear()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.work_dir)
+        if self.cache_env is None:
+            os.environ.pop(OSC2ASTCache.CACHE_DIR_ENV, None)
+        else:
+            os.environ[OSC2ASTCache.CACHE_DIR_ENV] = self.cache_env
+        OSC2ASTCache.clear()
+
+    def write(self, filename, content):
+        """Writes a scenario file"""
+        with open(os.path.join(self.work_dir, filename), 'w', encoding='utf-8') as fd:
+            fd.write(content)
+
+    def test_cache(self):
+        """
+        The AST is shared in memory, loaded from disk in new processes, and rebuilt after changing an import
+        """
+        ast_tree = OSC2Helper.gen_osc2_ast("top.osc")
+        self.assertEqual(ast_tree.get_child_count(), 6)
+        self.assertIs(OSC2Helper.gen_osc2_ast("top.osc"), ast_tree)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # As in a new process
+        OSC2ASTCache.clear()
+        cached_tree = OSC2Helper.gen_osc2_ast("top.osc")
+        self.assertIsNot(cached_tree, ast_tree)
+        self.assertEqual(cached_tree.get_child_count(), 6)
+        self.assertEqual(cached_tree.get_scope().__class__, ast_tree.get_scope().__class__)
+
+        self.write("base.osc", BASE_OSC + "actor bicycle:\n    max_speed: speed\n\n")
+        self.assertEqual(OSC2Helper.gen_osc2_ast("top.osc").get_child_count(), 7)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_disk_cache_opt_in(self):
+        """
+        Without a cache directory, the ASTs are only kept in memory
+        """
+        del os.environ[OSC2ASTCache.CACHE_DIR_ENV]
+        self.assertIsNone(OSC2ASTCache.get_cache_dir())
+
+        ast_tree = OSC2Helper.gen_osc2_ast("top.osc")
+        self.assertIs(OSC2Helper.gen_osc2_ast("top.osc"), ast_tree)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_errors_not_cached(self):
+        """
+        The ASTs with errors aren't cached, even if the errors are collected by log_msg
+        """
+        messages = []
+        collector = SimpleNamespace(is_open=True, add_log_msg=messages.append)
+        self.write("top.osc", TOP_OSC.replace("ego_vehicle: car", "ego_vehicle: truck"))
+        with mock.patch.object(log_manager, "log_msg", collector):
+            OSC2Helper.gen_osc2_ast("top.osc")
+            self.assertTrue(messages)
+            del messages[:]
+            OSC2Helper.gen_osc2_ast("top.osc")
+            self.assertTrue(messages)
+        self.assertFalse(os.path.exists(self.cache_dir))
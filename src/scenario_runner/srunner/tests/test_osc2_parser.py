@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the two stage parsing of the OSC2 files
+"""
+
+from unittest import TestCase
+import os
+
+from antlr4.error.ErrorListener import ErrorListener
+from antlr4.InputStream import InputStream
+
+from srunner.osc2.benchmark.osc2_benchmark import CORPUS_DIR
+from srunner.tools.osc2_helper import OSC2Helper
+
+INVALID_OSC = """actor car:
+    x: int = (1 +
+
+scenario top:
+    v: car
+"""
+
+
+class RecordingListener(ErrorListener):
+    """Records the syntax errors"""
+
+    def __init__(self):
+        super(RecordingListener, self).__init__()
+        self.errors = []
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.errors.append((line, column, msg))
+
+
+def parse(source, two_stage):
+    """Returns the parse tree as a string, and the syntax errors"""
+    listener = RecordingListener()
+    tokens = OSC2Helper.gen_token_stream(InputStream(source), listener)
+    parse_tree = OSC2Helper.parse_osc2(tokens, listener, two_stage)
+    return parse_tree.toStringTree(recog=parse_tree.parser), listener.errors
+
+
+class TestOSC2Parser(TestCase):
+    """
+    Checks that the two stage parsing gives the same results as the full LL one
+    """
+
+    def test_valid_file(self):
+        """
+        The SLL stage gives the same parse tree
+        """
+        with open(os.path.join(CORPUS_DIR, "scenario_005.osc"), encoding="utf-8") as fd:
+            source = fd.read()
+        tree, errors = parse(source, True)
+        self.assertEqual(errors, [])
+        self.assertEqual(tree, parse(source, False)[0])
+
+    def test_invalid_file(self):
+        """
+        The errors are only reported by the LL stage
+        """
+        tree, errors = parse(INVALID_OSC, True)
+        self.assertTrue(errors)
+        self.assertEqual((tree, errors), parse(INVALID_OSC, False))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the OSC2 import preprocessing
+"""
+
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from srunner.osc2.osc_preprocess.import_file import clear_file_cache
+from srunner.osc2.osc_preprocess.pre_process import Preprocess
+
+
+class TestPreprocess(TestCase):
+    """
+    Checks the expansion of the imports and the mapping of the lines to their files
+    """
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.work_dir = tempfile.mkdtemp()
+        os.chdir(self.work_dir)
+        os.mkdir("lib")
+        os.mkdir("sub")
+        # top imports a and sub/b, which both import lib/common
+        self.write("lib/common.osc", "# common\nactor common:\n    x: int\n")
+        self.write("a.osc", "import lib/common.osc\nactor a:\n    x: int\n")
+        self.write("sub/b.osc", "import ../lib/common.osc\n\nactor b:\n    x: int\n")
+        self.write("top.osc", "import a.osc\nimport sub/b.osc\n\nscenario top:\n    a1: a\n")
+        clear_file_cache()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.work_dir)
+        clear_file_cache()
+
+    def write(self, filename, content):
+        """Writes a scenario file"""
+        with open(os.path.join(self.work_dir, filename), 'w', encoding='utf-8') as fd:
+            fd.write(content)
+
+    def test_import_process(self):
+        """
+        Each file is included once, in memory, before the files importing it
+        """
+        input_stream, import_msg = Preprocess("top.osc").import_process()
+        source = input_stream.strdata
+
+        self.assertEqual(source.count("actor common"), 1)
+        self.assertLess(source.index("actor common"), source.index("actor a"))
+        self.assertLess(source.index("actor b"), source.index("scenario top"))
+        self.assertNotIn("\nimport", "\n" + source)
+        self.assertEqual(sorted(os.listdir(self.work_dir)), ["a.osc", "lib", "sub", "top.osc"])
+
+        self.assertEqual([os.path.basename(f) for f in import_msg.files], ["common.osc", "a.osc", "b.osc", "top.osc"])
+        scenario_line = source[:source.index("scenario top")].count("\n") + 1
+        file_path, line = import_msg.get_msg(scenario_line)
+        self.assertTrue(file_path.endswith("top.osc"))
+        self.assertEqual(line, 4)
+
+    def test_modified_file(self):
+        """
+        Cached files are read again once modified
+        """
+        Preprocess("top.osc").import_process()
+        self.write("lib/common.osc", "actor common:\n    y: int\n")
+        os.utime("lib/common.osc", ns=(0, 0))
+
+        input_stream, import_msg = Preprocess("top.osc").import_process()
+        self.assertIn("    y: int", input_stream.strdata)
+        self.assertEqual(len(import_msg.files), 4)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the parallel mode, using the carla mocks as servers
+"""
+
+from unittest import TestCase
+from types import SimpleNamespace
+import json
+import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+
+import carla
+
+from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
+from srunner.tools.parallel_runner import ParallelRunner, ServerLostError, merge_results, parse_servers
+
+LOST_PORT = 2004
+DEAD_PORT = 2006
+
+
+class FakeRunner(object):
+    """
+    Stand-in of the ScenarioRunner, writing the outputs of a passed scenario.
+    The server at LOST_PORT stops answering when running its first job, and the
+    worker of the server at DEAD_PORT dies without reporting anything.
+    """
+
+    def __init__(self, args):
+        self._args = args
+        CarlaDataProvider.set_client(carla.Client())
+        CarlaDataProvider.set_traffic_manager_port(int(args.trafficManagerPort))
+
+    def run_job(self, job):
+        if int(self._args.port) == LOST_PORT:
+            raise ServerLostError()
+        if int(self._args.port) == DEAD_PORT:
+            os._exit(1)  # pylint: disable=protected-access
+
+        prefix = os.path.join(self._args.outputDir, "Scenario{}_{}".format(job, self._args.port))
+        with open(prefix + ".json", 'w', encoding='utf-8') as fd:
+            json.dump({"scenario": "Scenario{}".format(job), "success": job != 3, "criteria": []}, fd)
+        with open(prefix + ".xml", 'w', encoding='utf-8') as fd:
+            fd.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     '<testsuites tests="2" failures="{}" time="1.00">\n'
+                     '  <testsuite name="Scenario{}" tests="2" failures="0" time="1.00"></testsuite>\n'
+                     '</testsuites>\n'.format(1 if job == 3 else 0, job))
+
+        # Each worker owns its CarlaDataProvider
+        return CarlaDataProvider.get_traffic_manager_port() == int(self._args.trafficManagerPort), \
+            [prefix + ".json", prefix + ".xml"]
+
+    def destroy(self):
+        CarlaDataProvider.cleanup()
+
+
+class TestParallelRunner(TestCase):
+    """
+    Checks the sharding of the jobs, the retries after losing a server and the merged outputs
+    """
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.args = SimpleNamespace(host='127.0.0.1', port='2000', trafficManagerPort='8000',
+                                    servers=None, outputDir=self.output_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_parse_servers(self):
+        """
+        Traffic manager ports are optional
+        """
+        endpoints = parse_servers("localhost:2000, 10.0.0.2:3000:9000,localhost:2002", 8000)
+        self.assertEqual([(e.host, e.port, e.tm_port) for e in endpoints],
+                         [('localhost', 2000, 8000), ('10.0.0.2', 3000, 9000), ('localhost', 2002, 8002)])
+        with self.assertRaises(ValueError):
+            parse_servers("localhost", 8000)
+
+    def test_run_and_merge(self):
+        """
+        All the jobs are run, even if a server is lost, and their outputs are merged
+        """
+        endpoints = parse_servers("localhost:2000,localhost:{},localhost:2008".format(LOST_PORT), 8000)
+        results = ParallelRunner(FakeRunner, self.args, endpoints).run(list(range(6)))
+
+        self.assertEqual([result['job'] for result in results], list(range(6)))
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertTrue(all(result['server'] != 'localhost:{}'.format(LOST_PORT) for result in results))
+
+        merged_files = merge_results(results, os.path.join(self.output_dir, "merged"))
+        self.assertEqual(len(merged_files), 2)
+
+        with open(merged_files[0], 'r', encoding='utf-8') as fd:
+            report = json.load(fd)
+        self.assertFalse(report['success'])
+        self.assertEqual(sorted(s['scenario'] for s in report['scenarios']),
+                         ["Scenario{}".format(i) for i in range(6)])
+
+        root = ET.parse(merged_files[1]).getroot()
+        self.assertEqual(root.get('tests'), '12')
+        self.assertEqual(root.get('failures'), '1')
+        self.assertEqual(len(root.findall('testsuite')), 6)
+
+    def test_all_servers_lost(self):
+        """
+        The jobs fail once their retries are exhausted or no servers are left
+        """
+        endpoints = parse_servers("localhost:{}".format(LOST_PORT), 8000)
+        runner = ParallelRunner(FakeRunner, self.args, endpoints, max_retries=1)
+        runner.RESULT_TIMEOUT = 0.1
+        results = runner.run([0, 1])
+        self.assertFalse(any(result['success'] for result in results))
+
+    def test_dead_worker(self):
+        """
+        The job of a worker that dies without reporting it is given to another worker
+        """
+        endpoints = parse_servers("localhost:{},localhost:2000".format(DEAD_PORT), 8000)
+        runner = ParallelRunner(FakeRunner, self.args, endpoints)
+        runner.RESULT_TIMEOUT = 0.1
+        results = runner.run(list(range(20)))
+
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(set(result['server'] for result in results), {'localhost:2000'})
+        self.assertEqual(sorted(result['attempts'] for result in results), [1] * 19 + [2])
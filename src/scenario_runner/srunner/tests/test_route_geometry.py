@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the RouteGeometry and RouteProgress, using a synthetic route
+"""
+
+from unittest import TestCase
+from types import SimpleNamespace
+import math
+
+from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
+from srunner.scenariomanager.timer import GameTime
+from srunner.tools.route_geometry import RouteGeometry, RouteProgress
+
+
+def make_route(points):
+    """Creates a route of (transform, option) from a list of (x, y, yaw) points"""
+    route = []
+    for x, y, yaw in points:
+        transform = SimpleNamespace(
+            location=SimpleNamespace(x=x, y=y, z=0.0), rotation=SimpleNamespace(pitch=0.0, yaw=yaw, roll=0.0))
+        route.append((transform, 'LANEFOLLOW'))
+    return route
+
+
+class FakeActor(object):
+    """Hashable actor, as used by the CarlaDataProvider maps"""
+
+    def __init__(self, actor_id):
+        self.id = actor_id  # pylint: disable=invalid-name
+
+
+def location(x, y):
+    """Creates a location at the ground"""
+    return SimpleNamespace(x=x, y=y, z=0.0)
+
+
+class TestRouteGeometry(TestCase):
+    """
+    Checks the route geometry and the tracking of the route progress
+    """
+
+    def setUp(self):
+        # 10 meters east, and then 10 meters north
+        self.route = make_route([(float(x), 0.0, 0.0) for x in range(11)] +
+                                [(10.0, float(y), 90.0) for y in range(1, 11)])
+        self.geometry = RouteGeometry(self.route)
+
+    def test_arrays(self):
+        """
+        The accumulated distance and forward vectors match the route points
+        """
+        self.assertEqual(len(self.geometry), 21)
+        self.assertAlmostEqual(self.geometry.length, 20.0)
+        self.assertAlmostEqual(self.geometry.accum_dist[15], 15.0)
+        self.assertAlmostEqual(self.geometry.get_percentage(5), 25.0)
+        self.assertAlmostEqual(self.geometry.forward_vectors[3][0], 1.0)
+        self.assertAlmostEqual(self.geometry.forward_vectors[15][1], 1.0)
+
+    def test_advance_index(self):
+        """
+        The index only moves to passed points inside the window, and never backwards
+        """
+        self.assertEqual(self.geometry.advance_index(location(2.5, 0.3), 0, 2), 2)
+        self.assertEqual(self.geometry.advance_index(location(2.5, 0.3), 0, 5), 2)
+        self.assertEqual(self.geometry.advance_index(location(8.5, 0.3), 0, 2), 2)
+        self.assertEqual(self.geometry.advance_index(location(1.0, 0.0), 4, 2), 4)
+        self.assertEqual(self.geometry.advance_index(location(10.2, 4.5), 12, 2), 14)
+        self.assertEqual(self.geometry.advance_index(location(10.2, 40.0), 19, 5), 20)
+
+    def test_advance_index_matches_loop(self):
+        """
+        The vectorized projection gives the same index as checking the points one by one
+        """
+        index = 0
+        for i in range(200):
+            t = i / 10.0
+            loc = location(min(t, 10.0) + 0.1, max(t - 10.0, 0.0) + 0.2)
+
+            expected = index
+            for j in range(index, min(index + 3, len(self.route))):
+                transform = self.route[j][0]
+                yaw = math.radians(transform.rotation.yaw)
+                dot = (loc.x - transform.location.x) * math.cos(yaw) + (loc.y - transform.location.y) * math.sin(yaw)
+                if dot > 0:
+                    expected = j
+
+            index = self.geometry.advance_index(loc, index, 2)
+            self.assertEqual(index, expected)
+
+    def test_closest_index(self):
+        """
+        The closest point is searched inside the window
+        """
+        index, distance = self.geometry.closest_index(location(3.2, 1.0), 0, 5)
+        self.assertEqual(index, 3)
+        self.assertAlmostEqual(distance, math.hypot(0.2, 1.0))
+
+        index, _ = self.geometry.closest_index(location(9.0, 0.0), 0, 5)
+        self.assertEqual(index, 5)
+
+        index, _ = self.geometry.closest_index(location(3.5, 0.0), 0, 5)
+        self.assertEqual(index, 4)
+
+    def test_shared_instance(self):
+        """
+        The same route list shares its geometry
+        """
+        RouteGeometry.clear()
+        geometry = RouteGeometry.get(self.route)
+        self.assertIs(RouteGeometry.get(self.route), geometry)
+        self.assertIsNot(RouteGeometry.get(list(self.route)), geometry)
+        RouteGeometry.clear()
+
+
+class TestRouteProgress(TestCase):
+    """
+    Checks that the route progress is shared and only computed once per frame
+    """
+
+    def setUp(self):
+        self.route = make_route([(float(x), 0.0, 0.0) for x in range(21)])
+        self.actor = FakeActor(1)
+        RouteProgress.clear()
+        GameTime.restart()
+
+    def tearDown(self):
+        CarlaDataProvider._actor_location_map.pop(self.actor, None)  # pylint: disable=protected-access
+        RouteProgress.clear()
+        GameTime.restart()
+
+    def move(self, frame, x, y=0.0):
+        """Moves the actor to a new location at a new frame"""
+        CarlaDataProvider._actor_location_map[self.actor] = location(x, y)  # pylint: disable=protected-access
+        GameTime._last_frame = frame  # pylint: disable=protected-access
+
+    def test_shared_progress(self):
+        """
+        All the subscribers of an actor and route share the progress
+        """
+        progress = RouteProgress.get(self.actor, self.route)
+        self.assertIs(RouteProgress.get(self.actor, self.route), progress)
+        self.assertIsNot(RouteProgress.get(FakeActor(2), self.route), progress)
+
+    def test_progress(self):
+        """
+        The index, deviation and distance follow the actor
+        """
+        progress = RouteProgress.get(self.actor, self.route)
+
+        self.move(1, 2.5, 1.5)
+        progress.update()
+        self.assertEqual(progress.index, 2)
+        self.assertEqual(progress.closest_index, 3)
+        self.assertAlmostEqual(progress.deviation, math.hypot(0.5, 1.5))
+        self.assertAlmostEqual(progress.distance, 2.0)
+        self.assertAlmostEqual(progress.percentage, 10.0)
+
+        # Same frame, nothing is computed
+        self.move(1, 4.5)
+        progress.update()
+        self.assertEqual(progress.index, 2)
+
+        self.move(2, 4.5)
+        progress.update()
+        self.assertEqual(progress.index, 4)
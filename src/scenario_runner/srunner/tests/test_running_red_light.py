@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the stop line crossings and the traffic light grid
+of the RunningRedLightTest criterion
+"""
+
+from unittest import TestCase
+import itertools
+import random
+
+import numpy as np
+
+import carla
+from srunner.scenariomanager.scenarioatomics.atomic_criteria import RunningRedLightTest
+
+# pylint: disable=protected-access
+
+
+def make_criterion(centers):
+    """
+    Creates a criterion with traffic lights at the given centers, without stop lines
+    """
+    criterion = object.__new__(RunningRedLightTest)
+    criterion._list_traffic_lights = [(None, carla.Location(*center), []) for center in centers]
+    criterion._build_stop_lines()
+    return criterion
+
+
+class TestSegmentCrossing(TestCase):
+    """
+    Checks that are_segments_crossing gives the same results as is_vehicle_crossing_line
+    """
+
+    def assert_same_crossings(self, segments):
+        """
+        Compares the crossings of all the pairs of segments, given as (x1, y1, x2, y2)
+        """
+        criterion = object.__new__(RunningRedLightTest)
+        lines = np.array(segments, dtype=float)
+        for segment in segments:
+            crossing = RunningRedLightTest.are_segments_crossing((segment[0:2], segment[2:4]), lines)
+            points = (carla.Location(*segment[0:2]), carla.Location(*segment[2:4]))
+            expected = [criterion.is_vehicle_crossing_line(
+                points, (carla.Location(*line[0:2]), carla.Location(*line[2:4]))) for line in segments]
+            self.assertEqual(crossing.tolist(), expected, segment)
+
+    def test_random_segments(self):
+        """
+        Segments with random real coordinates
+        """
+        rng = random.Random(1)
+        self.assert_same_crossings([[rng.uniform(-10, 10) for _ in range(4)] for _ in range(200)])
+
+    def test_grid_segments(self):
+        """
+        Segments between the points of a small grid, which include the touching,
+        collinear, overlapping and zero-length ones
+        """
+        points = list(itertools.product(range(4), range(4)))
+        self.assert_same_crossings([p + q for p, q in itertools.product(points, points)])
+
+    def test_zero_length(self):
+        """
+        Zero-length segments don't cross any line, even the ones going through them
+        """
+        lines = np.array([[1, 4, 4, 0], [0, 1, 4, 1], [2, 0, 2, 2], [2, 1, 2, 1]], dtype=float)
+        for point in ((2, 3), (2, 1)):
+            crossing = RunningRedLightTest.are_segments_crossing((point, point), lines)
+            self.assertEqual(crossing.tolist(), [False, False, False, False])
+        crossing = RunningRedLightTest.are_segments_crossing(((0, 0), (4, 2)), lines)
+        self.assertEqual(crossing.tolist(), [True, True, True, False])
+
+
+class TestCloseTrafficLights(TestCase):
+    """
+    Checks that the grid returns the same traffic lights as checking all of them
+    """
+
+    def test_close_lights(self):
+        """
+        Random lights and locations, many of them at the borders of the grid cells
+        """
+        rng = random.Random(2)
+        size = RunningRedLightTest.DISTANCE_LIGHT
+
+        def coordinate():
+            if rng.random() < 0.5:
+                return rng.randint(-4, 4) * size + rng.choice([0, 1e-9, -1e-9, 0.5, -0.5])
+            return rng.uniform(-4 * size, 4 * size)
+
+        centers = [(coordinate(), coordinate(), rng.uniform(-2, 2)) for _ in range(200)]
+        criterion = make_criterion(centers)
+        found = 0
+        for _ in range(500):
+            location = carla.Location(coordinate(), coordinate(), rng.uniform(-2, 2))
+            expected = [i for i, center in enumerate(centers) if np.linalg.norm(
+                np.array(center) - (location.x, location.y, location.z)) <= size]
+            self.assertEqual(criterion._get_close_traffic_lights(location), expected)
+            found += len(expected)
+        self.assertGreater(found, 100)
+
+    def test_exact_distance(self):
+        """
+        Lights at exactly DISTANCE_LIGHT meters are close, in any of the neighbouring cells
+        """
+        size = RunningRedLightTest.DISTANCE_LIGHT
+        criterion = make_criterion([(size, 0, 0), (-size, 0, 0), (0, 2 * size, 0), (0, -size, 0)])
+        self.assertEqual(criterion._get_close_traffic_lights(carla.Location(0, 0, 0)), [0, 1, 3])
+        self.assertEqual(make_criterion([])._get_close_traffic_lights(carla.Location(0, 0, 0)), [])
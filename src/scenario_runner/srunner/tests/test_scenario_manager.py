@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the ticks of the ScenarioManager in asynchronous mode
+"""
+
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+import py_trees
+
+import carla
+from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
+from srunner.scenariomanager.scenario_manager import ScenarioManager
+from srunner.scenariomanager.timer import GameTime
+from srunner.tests.test_carla_data_provider import register_actors
+
+
+class TestAsyncTick(TestCase):
+    """
+    Checks that each tick uses the snapshot received from the world
+    """
+
+    def tearDown(self):
+        CarlaDataProvider.cleanup()
+        GameTime.restart()
+
+    def test_tick_snapshot(self):
+        """
+        The game time and the actors come from the snapshot of the tick, without requesting a newer one
+        """
+        world = register_actors(2)
+        snapshot = world.get_snapshot()
+        snapshot.timestamp = SimpleNamespace(frame=5, elapsed_seconds=1.0, delta_seconds=0.05)
+        ticked_transform = world.actors[0].transform
+
+        # The server is already at a later frame
+        world.actors[0].transform = carla.Transform(carla.Location(100, 0, 0), carla.Rotation())
+        world.get_snapshot = mock.Mock(side_effect=AssertionError("Snapshot requested"))
+
+        manager = ScenarioManager()
+        manager.TICK_WAIT_TIMEOUT = 0.01
+        manager._running = True  # pylint: disable=protected-access
+        manager._watchdog = mock.Mock()  # pylint: disable=protected-access
+        manager.scenario_tree = mock.Mock(status=py_trees.common.Status.RUNNING)
+        GameTime.restart()
+
+        manager._on_world_tick(snapshot)  # pylint: disable=protected-access
+        manager._tick_scenario(manager._wait_for_tick())  # pylint: disable=protected-access
+
+        self.assertEqual(manager.scenario_tree.tick_once.call_count, 1)
+        self.assertEqual(GameTime.get_frame(), 5)
+        self.assertIs(CarlaDataProvider.get_transform(world.actors[0]), ticked_transform)
+        self.assertIsNone(manager._wait_for_tick())  # pylint: disable=protected-access
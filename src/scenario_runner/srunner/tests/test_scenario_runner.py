@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the runs of the ScenarioRunner, with the scenarios mocked
+"""
+
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+import carla
+
+from scenario_runner import ScenarioRunner
+from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
+
+
+class TownWorld(carla.World):
+    """
+    Mocked world of Town01, recording the traffic light resets
+    """
+
+    def __init__(self, world_id):
+        self.id = world_id  # pylint: disable=invalid-name
+        self.actors = []
+        self.light_resets = 0
+
+    def get_map(self):
+        world_map = super(TownWorld, self).get_map()
+        world_map.name = 'Carla/Maps/Town01'
+        return world_map
+
+    def freeze_all_traffic_lights(self, frozen):
+        """Traffic lights are never frozen"""
+
+    def reset_all_traffic_lights(self):
+        """Records a reset"""
+        self.light_resets += 1
+
+
+class TownClient(carla.Client):
+    """
+    Mocked client recording the loaded worlds and the destroyed actors
+    """
+
+    def __init__(self):
+        self.world = TownWorld(1)
+        self.loads = 0
+        self.destroyed = 0
+
+    def load_world(self, name):
+        self.loads += 1
+        self.world = TownWorld(self.world.id + 1)
+        return self.world
+
+    def apply_batch_sync(self, batch, sync_mode=False):
+        self.destroyed += len(batch)
+        return []
+
+
+class TestRouteRuns(TestCase):
+    """
+    Checks the cleanup between consecutive routes
+    """
+
+    def tearDown(self):
+        CarlaDataProvider.set_warm_world_mode(False)
+        CarlaDataProvider.cleanup()
+
+    def test_warm_world_cleanup(self):
+        """
+        Three routes on the same town are all cleaned up, and all but the first one reuse the world
+        """
+        CarlaDataProvider.set_warm_world_mode(True)
+        runner = object.__new__(ScenarioRunner)
+        runner._args = SimpleNamespace(  # pylint: disable=protected-access
+            route='routes.xml', repetitions=1, reloadWorld=True, warmWorld=True, sync=False, waitForEgo=False)
+        runner.client = TownClient()
+        runner.manager = mock.Mock()
+        runner.ego_vehicles = []
+        runner._shutdown_requested = False  # pylint: disable=protected-access
+        runner.get_configurations = lambda args: [SimpleNamespace(town='Town01') for _ in range(3)]
+
+        egos = []
+
+        def load_and_run_scenario(config):
+            """Spawns an ego and another actor, cleaning up at the end as the real scenarios do"""
+            if not runner._load_and_wait_for_world(config.town):  # pylint: disable=protected-access
+                return False
+            ego = carla.Vehicle()
+            ego.destroy = mock.Mock()
+            egos.append(ego)
+            runner.ego_vehicles.append(ego)
+            CarlaDataProvider.register_actor(ego)
+            CarlaDataProvider._carla_actor_pool[len(egos)] = carla.Vehicle()  # pylint: disable=protected-access
+            runner._cleanup()  # pylint: disable=protected-access
+            return True
+
+        runner._load_and_run_scenario = load_and_run_scenario  # pylint: disable=protected-access
+        self.assertTrue(runner._run_route())  # pylint: disable=protected-access
+
+        self.assertEqual(runner.manager.cleanup.call_count, 3)
+        self.assertEqual(runner.client.destroyed, 3)
+        self.assertEqual([ego.destroy.call_count for ego in egos], [1, 1, 1])
+        self.assertEqual(runner.client.loads, 1)
+        self.assertEqual(runner.client.world.light_resets, 2)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the compact scene layout, comparing it with the full one
+over a small synthetic map. The scene_layout module is loaded from its file.
+"""
+
+from types import SimpleNamespace
+from unittest import TestCase
+import importlib.util
+import math
+import os
+
+import numpy as np
+
+LAYOUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, os.pardir,
+                           'scene_layout.py')
+
+EARTH_RADIUS = 6378137.0
+GEO_REFERENCE = (49.0, 8.0, 10.0)
+ROAD_LENGTH = 2.0
+LANE_WIDTH = 3.5
+
+
+def load_scene_layout():
+    """Returns the scene_layout module"""
+    spec = importlib.util.spec_from_file_location('scene_layout', os.path.normpath(LAYOUT_PATH))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+scene_layout = load_scene_layout()
+
+
+class Vector(object):
+    """Vector with the arithmetic of carla.Location"""
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __add__(self, other):
+        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __mul__(self, value):
+        return Vector(self.x * value, self.y * value, self.z * value)
+
+    __rmul__ = __mul__
+
+
+class Transform(object):
+    """Transform with the forward vector of carla.Transform"""
+
+    def __init__(self, location, yaw):
+        self.location = location
+        self.rotation = SimpleNamespace(roll=0.0, pitch=2.0, yaw=yaw)
+
+    def get_forward_vector(self):
+        """Unit vector pointing forward"""
+        pitch, yaw = math.radians(self.rotation.pitch), math.radians(self.rotation.yaw)
+        return Vector(math.cos(pitch) * math.cos(yaw), math.cos(pitch) * math.sin(yaw), math.sin(pitch))
+
+
+class StraightWaypoint(object):
+    """
+    Waypoint of two consecutive straight roads, the second one on a bridge. Negative lanes
+    drive towards +x, and positive ones towards -x
+    """
+
+    def __init__(self, road_id, lane_id, s):
+        self.road_id = road_id
+        self.lane_id = lane_id
+        self.s = s
+        self.lane_width = LANE_WIDTH
+        self.id = road_id * 100000 + (lane_id + 10) * 1000 + int(round(s / 0.05))
+
+    @property
+    def transform(self):
+        """New transform at each access, as the one of carla.Waypoint"""
+        x = (self.road_id - 1) * ROAD_LENGTH + (self.s if self.lane_id < 0 else ROAD_LENGTH - self.s)
+        y = (abs(self.lane_id) - 0.5) * LANE_WIDTH * (1 if self.lane_id < 0 else -1)
+        return Transform(Vector(x, y, 5.0 * (self.road_id - 1)), 0.0 if self.lane_id < 0 else 180.0)
+
+    def next(self, distance):
+        """Moves along the lane, jumping to the other road at the end"""
+        s = self.s + distance
+        if s <= ROAD_LENGTH + 1e-9:
+            return [StraightWaypoint(self.road_id, self.lane_id, s)]
+        if self.road_id == 1:
+            return [StraightWaypoint(2, self.lane_id, 0.0)]
+        return []
+
+
+class StraightMap(object):
+    """Map of StraightWaypoints, whose second road has only two lanes"""
+
+    def get_topology(self):
+        """Pairs of lane entries, with a repeated one"""
+        lanes = [(2, -1), (2, 1), (1, -2), (1, -1), (1, 1), (1, -1)]
+        return [(StraightWaypoint(road_id, lane_id, 0.0), None) for road_id, lane_id in lanes]
+
+    def transform_to_geolocation(self, location):
+        """Mercator projection of carla.Map.transform_to_geolocation"""
+        lat_ref, lon_ref, alt_ref = GEO_REFERENCE
+        scale = math.cos(lat_ref * math.pi / 180.0)
+        mx = scale * lon_ref * math.pi * EARTH_RADIUS / 180.0 + location.x
+        my = scale * EARTH_RADIUS * math.log(math.tan((90.0 + lat_ref) * math.pi / 360.0)) - location.y
+        return SimpleNamespace(
+            longitude=mx * 180.0 / (math.pi * EARTH_RADIUS * scale),
+            latitude=360.0 * math.atan(math.exp(my / (EARTH_RADIUS * scale))) / math.pi - 90.0,
+            altitude=alt_ref + location.z)
+
+
+class TestCompactSceneLayout(TestCase):
+    """
+    Checks that the compact scene layout describes the same waypoints as get_scene_layout
+    """
+
+    def test_same_layout(self):
+        """
+        Every waypoint has the same lane, geolocations, successors and neighbours in both layouts
+        """
+        carla_map = StraightMap()
+        layout = scene_layout.get_scene_layout(carla_map)
+        compact = scene_layout.get_compact_scene_layout(carla_map)
+
+        ids = compact["waypoint_ids"].tolist()
+        self.assertEqual(sorted(ids), sorted(layout))
+        self.assertEqual(len(ids), 5 * 41)
+
+        for i, waypoint_id in enumerate(ids):
+            waypoint = layout[waypoint_id]
+            self.assertEqual((compact["road_ids"][i], compact["lane_ids"][i]),
+                             (waypoint["road_id"], waypoint["lane_id"]))
+            np.testing.assert_allclose(compact["positions"][i], waypoint["position"], rtol=0, atol=1e-9)
+            np.testing.assert_allclose(compact["left_margin_positions"][i], waypoint["left_margin_position"],
+                                       rtol=0, atol=1e-9)
+            np.testing.assert_allclose(compact["right_margin_positions"][i], waypoint["right_margin_position"],
+                                       rtol=0, atol=1e-9)
+            np.testing.assert_allclose(compact["orientations"][i], waypoint["orientation"])
+
+            next_ids = []
+            index = i
+            while compact["next_offsets"][index] < compact["next_offsets"][index + 1]:
+                index = compact["next_indices"][compact["next_offsets"][index]]
+                next_ids.append(ids[index])
+            self.assertEqual(next_ids, waypoint["next_waypoints_ids"])
+
+            for side in ("left", "right"):
+                neighbour = compact["{}_lane_indices".format(side)][i]
+                self.assertEqual(ids[neighbour] if neighbour >= 0 else -1,
+                                 waypoint["{}_lane_waypoint_id".format(side)])
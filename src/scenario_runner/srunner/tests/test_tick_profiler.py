@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the TickProfiler
+"""
+
+from unittest import TestCase
+
+import py_trees
+
+from srunner.scenariomanager.tick_profiler import TickProfiler
+
+
+class CountingBehaviour(py_trees.behaviour.Behaviour):
+    """
+    Behavior that counts its updates
+    """
+
+    def __init__(self, name):
+        super(CountingBehaviour, self).__init__(name)
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+        return py_trees.common.Status.RUNNING
+
+
+class TestTickProfiler(TestCase):
+    """
+    Checks the recorded behaviors and phases, and the restoration of the behaviors
+    """
+
+    def setUp(self):
+        self.leaf = CountingBehaviour("Leaf behavior")
+        self.root = py_trees.composites.Sequence("Root", memory=True)
+        self.root.add_child(self.leaf)
+
+    def test_report(self):
+        """
+        All the updates are recorded, and the behaviors are restored after detaching
+        """
+        profiler = TickProfiler()
+        for _ in range(10):
+            profiler.tick(self.root)
+            with profiler.phase(TickProfiler.TREE_PHASE):
+                self.root.tick_once()
+        profiler.detach()
+
+        report = profiler.get_report()
+        self.assertEqual(report['ticks'], 10)
+        self.assertEqual(report['phases'][TickProfiler.TREE_PHASE]['calls'], 10)
+
+        leaf_stats = [b for b in report['behaviours'] if b['name'] == "Leaf behavior"][0]
+        self.assertEqual(leaf_stats['calls'], 10)
+        self.assertEqual(leaf_stats['path'], "Root/Leaf_behavior")
+        self.assertEqual(self.leaf.updates, 10)
+        self.assertNotIn('update', vars(self.leaf))
+
+        stacks = profiler.get_collapsed_stacks()
+        self.assertTrue(all(line.startswith('tick;') and line.rsplit(' ', 1)[1].isdigit() for line in stacks))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the cache of the map waypoint lookups
+"""
+
+from unittest import TestCase
+
+import carla
+
+from agents.tools.waypoint_cache import WaypointCache
+from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
+
+
+class LookupMap(carla.Map):
+    """Map whose waypoints are the location and arguments of the lookup"""
+
+    name = "OpenDriveMap"
+
+    def __init__(self, opendrive="<OpenDRIVE/>"):
+        self.calls = 0
+        self.opendrive = opendrive
+
+    def to_opendrive(self):
+        return self.opendrive
+
+    def get_waypoint(self, location, project_to_road=True, lane_type=None):  # pylint: disable=arguments-differ
+        self.calls += 1
+        return (location.x, location.y, location.z, project_to_road, lane_type)
+
+
+class TestWaypointCache(TestCase):
+    """
+    Checks that the cached lookups match the ones of the map
+    """
+
+    def setUp(self):
+        self.map = LookupMap()
+        WaypointCache.clear()
+
+    def tearDown(self):
+        WaypointCache.clear()
+        CarlaDataProvider._map = None  # pylint: disable=protected-access
+        CarlaDataProvider._waypoint_cache = None  # pylint: disable=protected-access
+
+    def test_exact_lookups(self):
+        """
+        By default, close locations are different lookups, and repeated ones are only computed once
+        """
+        cache = WaypointCache.get(self.map)
+        locations = [carla.Location(10.0, 5.0, 0.0), carla.Location(10.04, 5.0, 0.0), carla.Location(10.0, 5.0, 0.0)]
+        waypoints = [cache.get_waypoint(location) for location in locations]
+
+        self.assertEqual(waypoints, [(l.x, l.y, l.z, True, None) for l in locations])
+        self.assertEqual(self.map.calls, 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        self.assertEqual(cache.get_waypoint(locations[0], False), (10.0, 5.0, 0.0, False, None))
+        self.assertEqual(self.map.calls, 3)
+
+    def test_snapped_lookups(self):
+        """
+        With a resolution, the locations are snapped to the closest grid point
+        """
+        cache = WaypointCache(self.map, resolution=0.1)
+        first = cache.get_waypoint(carla.Location(10.04, 4.96, 0.0))
+        second = cache.get_waypoint(carla.Location(9.96, 5.04, 0.0))
+
+        self.assertEqual(first, second)
+        self.assertAlmostEqual(first[0], 10.0)
+        self.assertAlmostEqual(first[1], 5.0)
+        self.assertEqual(self.map.calls, 1)
+
+    def test_shared_cache(self):
+        """
+        The cache is shared by the maps with the same content, and bounded in size
+        """
+        self.assertIs(WaypointCache.get(self.map), WaypointCache.get(self.map))
+        self.assertIs(WaypointCache.get(LookupMap()), WaypointCache.get(self.map))
+        # Maps generated from different OpenDRIVE files share the name, but not the cache
+        self.assertIsNot(WaypointCache.get(LookupMap('<OpenDRIVE><road/></OpenDRIVE>')), WaypointCache.get(self.map))
+
+        cache = WaypointCache(self.map, max_size=2)
+        for x in range(3):
+            cache.get_waypoint(carla.Location(x, 0, 0))
+        self.assertEqual(len(cache), 2)
+        cache.get_waypoint(carla.Location(0, 0, 0))
+        self.assertEqual(self.map.calls, 4)
+
+    def test_data_provider(self):
+        """
+        The data provider returns the same waypoints as the map
+        """
+        CarlaDataProvider._map = self.map  # pylint: disable=protected-access
+        location = carla.Location(1.234, -5.678, 0.3)
+        self.assertEqual(CarlaDataProvider.get_waypoint(location), self.map.get_waypoint(location))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides unit tests of the cache of the world state shared by the agents
+"""
+
+from unittest import TestCase
+
+import numpy as np
+
+import carla
+
+from agents.tools.world_state_cache import WorldStateCache
+from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
+
+
+class Extent(object):
+    """Bounding box of the mocked actors"""
+
+    def __init__(self, x, y, z):
+        self.extent = carla.Vector3D(x, y, z)
+
+
+class StateActor(carla.Vehicle):
+    """Mocked actor with a bounding box and a traffic light state"""
+
+    def __init__(self, actor_id, type_id, x, y, state=None):
+        super(StateActor, self).__init__()
+        self.id = actor_id
+        self.type_id = type_id
+        self.location = carla.Location(x, y, 0)
+        self.transform = carla.Transform(self.location, carla.Rotation(yaw=90))
+        self.velocity = carla.Vector3D(3, 4, 0)
+        self.bounding_box = Extent(2, 1, 0.5)
+        self.state_reads = 0
+        self._state = state
+
+    @property
+    def state(self):
+        """State of the traffic light, counting the reads"""
+        self.state_reads += 1
+        return self._state
+
+
+class TickingWorld(carla.World):
+    """Mocked world whose frame is increased by tick, counting the actor list requests"""
+
+    def __init__(self, world_id, actors):
+        self.id = world_id
+        self.actors = actors
+        self.frame = 1
+        self.actor_calls = 0
+
+    def tick(self):
+        """Advances the simulation one frame"""
+        self.frame += 1
+
+    def get_snapshot(self):
+        snapshot = super(TickingWorld, self).get_snapshot()
+        snapshot.frame = self.frame
+        return snapshot
+
+    def get_actors(self, ids=None):
+        self.actor_calls += 1
+        return carla.ActorList(list(self.actors))
+
+
+class TestWorldStateCache(TestCase):
+    """
+    Checks that the cached state matches the one of the actors, and is read once per frame
+    """
+
+    def setUp(self):
+        WorldStateCache.clear()
+        self.light = StateActor(3, "traffic.traffic_light", 0, 0, carla.TrafficLightState.Red)
+        self.world = TickingWorld(1, [
+            StateActor(1, "vehicle.tesla.model3", 10, 0),
+            StateActor(2, "walker.pedestrian.0001", 0, 20),
+            self.light])
+
+    def tearDown(self):
+        WorldStateCache.clear()
+        CarlaDataProvider.cleanup()
+
+    def test_refresh(self):
+        """
+        The arrays match the actors, and the actor list is only requested when it changes
+        """
+        cache = WorldStateCache.get(self.world)
+        self.assertIs(cache, WorldStateCache.get(self.world))
+
+        vehicles = cache.get_actors("*vehicle*")
+        self.assertEqual([actor.id for actor in vehicles], [1])
+        index = cache.get_indexes(vehicles)[0]
+        self.assertEqual(list(cache.locations[index]), [10, 0, 0])
+        self.assertEqual(list(cache.extents[index]), [2, 1, 0.5])
+        np.testing.assert_allclose(cache.forward_vectors[index], [0, 1, 0], atol=1e-9)
+        self.assertEqual(cache.get_speed(vehicles[0]), 5.0)
+
+        self.world.tick()
+        cache.get_actors()
+        self.assertEqual(self.world.actor_calls, 1)
+
+        self.world.actors = self.world.actors[1:]
+        self.world.tick()
+        self.assertFalse(cache.has_actor(vehicles[0]))
+        self.assertEqual(self.world.actor_calls, 2)
+        self.assertRaises(KeyError, cache.get_indexes, vehicles)
+
+    def test_actors_in_radius(self):
+        """
+        Only the actors closer than the radius are returned
+        """
+        cache = WorldStateCache.get(self.world)
+        actors = cache.get_actors_in_radius(carla.Location(0, 15, 0), 10)
+        self.assertEqual([actor.id for actor in actors], [2])
+        self.assertEqual(cache.get_actors_in_radius(carla.Location(0, 15, 0), 10, "*vehicle*"), [])
+
+    def test_traffic_light_state(self):
+        """
+        The state of the traffic lights is read once per frame
+        """
+        cache = WorldStateCache.get(self.world)
+        for _ in range(3):
+            self.assertEqual(cache.get_traffic_light_state(self.light), carla.TrafficLightState.Red)
+        self.assertEqual(self.light.state_reads, 1)
+
+        self.light._state = carla.TrafficLightState.Green  # pylint: disable=protected-access
+        self.assertEqual(cache.get_traffic_light_state(self.light), carla.TrafficLightState.Red)
+        self.world.tick()
+        self.assertEqual(cache.get_traffic_light_state(self.light), carla.TrafficLightState.Green)
+        self.assertEqual(self.light.state_reads, 2)
+
+    def test_cleared_with_the_world(self):
+        """
+        Setting a new world forgets the caches of the previous one
+        """
+        cache = WorldStateCache.get(self.world)
+        CarlaDataProvider.set_world(self.world)
+        self.assertIsNot(cache, WorldStateCache.get(self.world))
@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides an offline model of the lanes of a map, built once from densely sampled
+waypoints. It answers nearest lane, lane at point, neighbour lane and successor queries
+locally, without querying the server, so it can also be used over recorder logs.
+"""
+
+from __future__ import print_function
+
+import hashlib
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+LanePoint = namedtuple('LanePoint', [
+    'index', 'road_id', 'section_id', 'lane_id', 's', 'x', 'y', 'z', 'yaw', 'lane_width', 'is_junction'])
+
+
+class _GridIndex(object):
+
+    """
+    Nearest neighbour search over a uniform 2D grid of the x and y coordinates, used when scipy
+    isn't available. The distances are computed with all the coordinates given to the query
+    """
+
+    def __init__(self, points, cell_size=5.0):
+        self._points = points
+        self._cell_size = cell_size
+        self._cells = {}
+
+        cells = np.floor(points[:, :2] / cell_size).astype(int)
+        for i, cell in enumerate(map(tuple, cells.tolist())):
+            self._cells.setdefault(cell, []).append(i)
+        self._cells = {cell: np.array(indexes) for cell, indexes in self._cells.items()}
+
+        self._min_cell = cells.min(axis=0) if len(cells) else np.zeros(2, dtype=int)
+        self._max_cell = cells.max(axis=0) if len(cells) else np.zeros(2, dtype=int)
+
+    @staticmethod
+    def _get_ring(cell_x, cell_y, ring):
+        """
+        Returns the cells at 'ring' cells of distance of a cell
+        """
+        if ring == 0:
+            return [(cell_x, cell_y)]
+        cells = []
+        for i in range(cell_x - ring, cell_x + ring + 1):
+            cells.extend([(i, cell_y - ring), (i, cell_y + ring)])
+        for j in range(cell_y - ring + 1, cell_y + ring):
+            cells.extend([(cell_x - ring, j), (cell_x + ring, j)])
+        return cells
+
+    def query(self, point):
+        """
+        Returns the distance to the closest point and its index. The point has either the x and y
+        coordinates, or all of them
+        """
+        point = np.asarray(point, dtype=float)
+        cell_x, cell_y = (int(math.floor(value / self._cell_size)) for value in point[:2])
+        best_distance, best_index = float('inf'), -1
+
+        # Rings further than this don't contain any point
+        max_ring = max(abs(cell_x - self._min_cell[0]), abs(cell_x - self._max_cell[0]),
+                       abs(cell_y - self._min_cell[1]), abs(cell_y - self._max_cell[1]))
+
+        for ring in range(max_ring + 1):
+            # Cells further than this ring can't be closer than the best point found
+            if best_distance < (ring - 1) * self._cell_size:
+                break
+
+            for cell in self._get_ring(cell_x, cell_y, ring):
+                indexes = self._cells.get(cell, None)
+                if indexes is None:
+                    continue
+                distances = np.linalg.norm(self._points[indexes, :len(point)] - point, axis=1)
+                closest = np.argmin(distances)
+                if distances[closest] < best_distance or \
+                        (distances[closest] == best_distance and indexes[closest] < best_index):
+                    best_distance, best_index = distances[closest], indexes[closest]
+
+        return best_distance, best_index
+
+
+class LaneNetwork(object):
+
+    """
+    Offline model of the driving lanes of a map. The lanes are stored as samples of their
+    centerline, every 'precision' meters, and the nearest sample of a location is found with
+    a KD-tree (or a grid if scipy isn't installed). The search includes the height of the
+    locations, so that the lanes of overpasses aren't mistaken for the ones below them.
+
+    Use LaneNetwork.from_map to build it, and LaneNetwork.get to also keep it on disk.
+    """
+
+    def __init__(self, lane_keys, lane_starts, positions, yaws, widths, junctions, s_values, lanes, successors):
+        """
+        Creates the network from its arrays, see from_map
+
+        :param lane_keys: (road_id, section_id, lane_id) of each lane, with shape (L, 3)
+        :param lane_starts: index of the first sample of each lane, with shape (L + 1,)
+        :param positions: location of each sample, with shape (N, 3)
+        :param yaws: yaw of each sample, in degrees
+        :param widths: lane width of each sample
+        :param junctions: whether or not each sample is part of a junction
+        :param s_values: OpenDRIVE s of each sample
+        :param lanes: lane of each sample
+        :param successors: pairs of (lane, successor lane), with shape (M, 2)
+        """
+        self.lane_keys = np.asarray(lane_keys, dtype=int).reshape(-1, 3)
+        self.lane_starts = np.asarray(lane_starts, dtype=int)
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        self.yaws = np.asarray(yaws, dtype=float)
+        self.widths = np.asarray(widths, dtype=float)
+        self.junctions = np.asarray(junctions, dtype=bool)
+        self.s_values = np.asarray(s_values, dtype=float)
+        self.lanes = np.asarray(lanes, dtype=int)
+        self.successors = np.asarray(successors, dtype=int).reshape(-1, 2)
+
+        self._lane_index = {tuple(key): i for i, key in enumerate(self.lane_keys.tolist())}
+        self._lane_successors = {}
+        for lane, successor in self.successors.tolist():
+            self._lane_successors.setdefault(lane, []).append(successor)
+
+        self._trees = {}
+
+    @classmethod
+    def from_map(cls, wmap, precision=0.5):
+        """
+        Builds the network sampling the lanes of the map topology every 'precision' meters
+
+        :param wmap: carla.Map to be sampled
+        :param precision: distance between the samples of a lane
+        """
+        lane_keys = []
+        lane_index = {}
+        lane_starts = [0]
+        samples = []
+        successor_keys = []
+
+        for entry, _ in wmap.get_topology():
+            key = (entry.road_id, entry.section_id, entry.lane_id)
+            if key in lane_index:
+                continue
+
+            waypoint = entry
+            lane_samples = [entry]
+            while True:
+                next_waypoints = waypoint.next(precision)
+                same_lane = [w for w in next_waypoints if (w.road_id, w.section_id, w.lane_id) == key]
+                if not same_lane or same_lane[0].s == waypoint.s or len(lane_samples) > 1e6:
+                    successor_keys.extend((key, (w.road_id, w.section_id, w.lane_id)) for w in next_waypoints)
+                    break
+                waypoint = same_lane[0]
+                lane_samples.append(waypoint)
+
+            lane = len(lane_keys)
+            lane_index[key] = lane
+            lane_keys.append(key)
+            for waypoint in lane_samples:
+                location = waypoint.transform.location
+                samples.append((location.x, location.y, location.z, waypoint.transform.rotation.yaw,
+                                waypoint.lane_width, waypoint.is_junction, waypoint.s, lane))
+            lane_starts.append(len(samples))
+
+        successors = set()
+        for key, next_key in successor_keys:
+            if next_key in lane_index and next_key != key:
+                successors.add((lane_index[key], lane_index[next_key]))
+
+        samples = np.array(samples, dtype=float).reshape(-1, 8)
+        return cls(lane_keys, lane_starts, samples[:, 0:3], samples[:, 3], samples[:, 4],
+                   samples[:, 5].astype(bool), samples[:, 6], samples[:, 7].astype(int), sorted(successors))
+
+    @classmethod
+    def get(cls, wmap, cache_dir, precision=0.5):
+        """
+        Returns the network of a map, loading it from the cache directory if it was already built.
+        The cache files are identified by the OpenDRIVE content and the precision.
+
+        :param wmap: carla.Map of the network
+        :param cache_dir: directory where the networks are stored
+        :param precision: distance between the samples of a lane
+        """
+        map_hash = hashlib.sha1(wmap.to_opendrive().encode('utf-8')).hexdigest()
+        map_name = os.path.basename(wmap.name)
+        cache_path = os.path.join(cache_dir, '{}_{}_{}.npz'.format(map_name, map_hash, float(precision)))
+
+        if os.path.exists(cache_path):
+            try:
+                return cls.load(cache_path)
+            except (IOError, OSError, KeyError, ValueError) as e:
+                print("WARNING: Ignoring the lane network cache {}: {}".format(cache_path, e))
+
+        network = cls.from_map(wmap, precision)
+        try:
+            network.save(cache_path)
+        except (IOError, OSError) as e:
+            print("WARNING: Couldn't store the lane network cache {}: {}".format(cache_path, e))
+        return network
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a network stored with save
+        """
+        with np.load(path) as data:
+            return cls(data['lane_keys'], data['lane_starts'], data['positions'], data['yaws'], data['widths'],
+                       data['junctions'], data['s_values'], data['lanes'], data['successors'])
+
+    def save(self, path):
+        """
+        Stores the network in a .npz file
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Write to a temporary file first so that concurrent readers never see a partial file
+        tmp_path = path + '.tmp.{}.npz'.format(os.getpid())
+        np.savez_compressed(tmp_path, lane_keys=self.lane_keys, lane_starts=self.lane_starts,
+                            positions=self.positions, yaws=self.yaws, widths=self.widths,
+                            junctions=self.junctions, s_values=self.s_values, lanes=self.lanes,
+                            successors=self.successors)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def get_point(self, index):
+        """
+        Returns the LanePoint of a sample
+        """
+        road_id, section_id, lane_id = self.lane_keys[self.lanes[index]].tolist()
+        x, y, z = self.positions[index].tolist()
+        return LanePoint(int(index), road_id, section_id, lane_id, float(self.s_values[index]), x, y, z,
+                         float(self.yaws[index]), float(self.widths[index]), bool(self.junctions[index]))
+
+    def _get_tree(self, dimensions):
+        """
+        Returns the nearest neighbour index over the first 'dimensions' coordinates of the samples,
+        building it the first time
+        """
+        if cKDTree is None:
+            # The grid computes the distances with the coordinates of the query, one is enough
+            dimensions = 3
+        tree = self._trees.get(dimensions, None)
+        if tree is None:
+            tree = cKDTree(self.positions[:, :dimensions]) if cKDTree is not None else _GridIndex(self.positions)
+            self._trees[dimensions] = tree
+        return tree
+
+    def get_nearest_indexes(self, locations):
+        """
+        Returns the index of the sample closest to each of the locations, given as an array of
+        shape (N, 3), or of shape (N, 2) to ignore the height of the lanes
+        """
+        points = np.asarray(locations, dtype=float).reshape(-1, np.shape(locations)[-1])[:, :3]
+        if len(self.positions) == 0:
+            return np.full(len(points), -1, dtype=int)
+        tree = self._get_tree(points.shape[1])
+        if cKDTree is not None:
+            return np.asarray(tree.query(points)[1], dtype=int)
+        return np.array([tree.query(point)[1] for point in points], dtype=int)
+
+    def get_nearest(self, location):
+        """
+        Returns the LanePoint closest to a location, similar to carla.Map.get_waypoint(location)
+
+        :param location: carla.Location to be projected
+        """
+        index = self.get_nearest_indexes([[location.x, location.y, location.z]])[0]
+        return self.get_point(index) if index >= 0 else None
+
+    def get_lanes_at(self, locations):
+        """
+        Returns, for an array of locations of shape (N, 3) or (N, 2), the sample of the lane
+        they are in, or -1 if they are outside the lanes
+        """
+        points = np.asarray(locations, dtype=float).reshape(-1, np.shape(locations)[-1])[:, :3]
+        indexes = self.get_nearest_indexes(points)
+        if len(self.positions) == 0:
+            return indexes
+
+        offsets = points[:, :2] - self.positions[indexes, :2]
+        yaws = np.radians(self.yaws[indexes])
+        lateral = np.abs(-offsets[:, 0] * np.sin(yaws) + offsets[:, 1] * np.cos(yaws))
+        return np.where(lateral <= self.widths[indexes] / 2, indexes, -1)
+
+    def get_lane_at(self, location):
+        """
+        Returns the LanePoint of the lane a location is in, or None if it is outside the lanes,
+        similar to carla.Map.get_waypoint(location, project_to_road=False)
+
+        :param location: carla.Location to be checked
+        """
+        index = self.get_lanes_at([[location.x, location.y, location.z]])[0]
+        return self.get_point(index) if index >= 0 else None
+
+    def _get_closest_in_lane(self, lane, s):
+        """
+        Returns the sample of a lane with the closest s
+        """
+        start, end = self.lane_starts[lane], self.lane_starts[lane + 1]
+        return start + int(np.argmin(np.abs(self.s_values[start:end] - s)))
+
+    def _get_neighbour(self, point, offset):
+        """
+        Returns the sample next to a point in the lane that is 'offset' lanes away
+        """
+        lane_id = point.lane_id + offset
+        if lane_id == 0:
+            lane_id += offset
+        lane = self._lane_index.get((point.road_id, point.section_id, lane_id), None)
+        if lane is None:
+            return None
+        return self.get_point(self._get_closest_in_lane(lane, point.s))
+
+    def get_left_lane(self, point):
+        """
+        Returns the LanePoint of the lane at the left of a point, in its driving direction, or None
+        """
+        return self._get_neighbour(point, 1 if point.lane_id < 0 else -1)
+
+    def get_right_lane(self, point):
+        """
+        Returns the LanePoint of the lane at the right of a point, in its driving direction, or None
+        """
+        return self._get_neighbour(point, -1 if point.lane_id < 0 else 1)
+
+    def get_next(self, point, distance):
+        """
+        Returns the LanePoints at approximately 'distance' meters ahead of a point, as carla.Waypoint.next
+
+        :param point: LanePoint to start from
+        :param distance: distance to move forward
+        """
+        results = []
+        pending = [(point.index, distance)]
+        visited = set()
+        while pending:
+            index, remaining = pending.pop()
+            if (index, remaining) in visited:
+                continue
+            visited.add((index, remaining))
+            lane = self.lanes[index]
+            end = self.lane_starts[lane + 1]
+            lengths = np.linalg.norm(np.diff(self.positions[index:end], axis=0), axis=1)
+            travelled = np.cumsum(lengths)
+
+            ahead = np.flatnonzero(travelled >= remaining - 1e-6)
+            if len(ahead):
+                results.append(self.get_point(index + 1 + ahead[0]))
+                continue
+
+            remaining -= travelled[-1] if len(travelled) else 0
+            for successor in self._lane_successors.get(lane, []):
+                pending.append((self.lane_starts[successor], remaining))
+
+        return results
+
+    def get_successors(self, point):
+        """
+        Returns the LanePoints at the start of the lanes following the one of a point
+        """
+        return [self.get_point(self.lane_starts[lane]) for lane in self._lane_successors.get(self.lanes[point.index], [])]
+
+    def validate(self, recorded):
+        """
+        Compares the network with waypoints recorded from the server, returning the ratio of
+        locations whose nearest lane matches the road and lane of the recorded waypoint
+
+        :param recorded: list of (carla.Location, carla.Waypoint) pairs,
+            as given by carla.Map.get_waypoint(location)
+        """
+        if not recorded:
+            return 1.0
+        points = np.array([[location.x, location.y, location.z] for location, _ in recorded])
+        indexes = self.get_nearest_indexes(points)
+        matches = 0
+        for index, (_, waypoint) in zip(indexes, recorded):
+            road_id, _, lane_id = self.lane_keys[self.lanes[index]]
+            matches += road_id == waypoint.road_id and lane_id == waypoint.lane_id
+        return matches / float(len(recorded))
@@ -1,13 +1,23 @@
 from __future__ import print_function
 
+import glob
+import hashlib
+import io
 import math
 import operator
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from contextlib import redirect_stdout
 from typing import List, Tuple
 
 import carla
 import numpy as np
+from antlr4.atn.PredictionMode import PredictionMode
 from antlr4.CommonTokenStream import CommonTokenStream
-from antlr4.FileStream import FileStream
+from antlr4.error.Errors import ParseCancellationException
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
 from antlr4.tree.Tree import ParseTreeWalker
 from numpy.linalg import det
 
@@ -18,6 +28,135 @@ from srunner.osc2.osc2_parser.OpenSCENARIO2Parser import (
     OpenSCENARIO2Parser as OSC2Parser,
 )
 from srunner.osc2.osc_preprocess.pre_process import Preprocess
+import srunner.osc2.utils.log_manager as log_manager
+
+
+class OSC2ASTCache(object):
+
+    """
+    Cache of the ASTs built from the OSC2 files, addressed by a hash of the preprocessed source,
+    which includes all the imported files. The ASTs are pickled to a cache directory, so that other
+    processes skip the parsing, and the most recent ones are also kept in memory.
+    The disk cache is only used if its directory is set in the SCENARIO_RUNNER_OSC2_CACHE variable.
+
+    The entries are invalidated whenever the grammar, the ASTBuilder or the symbols change,
+    as the hash of their sources is part of the key. Sources with errors or warnings are never
+    cached, so that they are reported every time.
+    """
+
+    VERSION = 1  # Bump to discard all the cached ASTs
+    MEMORY_SIZE = 8
+    CACHE_DIR_ENV = "SCENARIO_RUNNER_OSC2_CACHE"  # Directory of the disk cache, disabled if unset or empty
+    SOURCE_PACKAGES = ["osc2_parser", "ast_manager", "symbol_manager"]
+
+    _memory = OrderedDict()  # key - AST
+    _version_key = None
+
+    @classmethod
+    def get_cache_dir(cls):
+        """
+        Returns the directory of the cached ASTs, or None if the disk cache is disabled
+        """
+        return os.environ.get(cls.CACHE_DIR_ENV, None) or None
+
+    @classmethod
+    def get_version_key(cls):
+        """
+        Returns the hash of the sources the AST depends on, computed once per process
+        """
+        if cls._version_key is None:
+            osc2_dir = os.path.dirname(os.path.dirname(os.path.abspath(log_manager.__file__)))
+            digest = hashlib.sha256(str(cls.VERSION).encode("utf-8"))
+            for package in cls.SOURCE_PACKAGES:
+                for filename in sorted(glob.glob(os.path.join(osc2_dir, package, "*.py"))):
+                    with open(filename, "rb") as fd:
+                        digest.update(fd.read())
+            cls._version_key = digest.hexdigest()
+        return cls._version_key
+
+    @classmethod
+    def get_key(cls, source):
+        """
+        Returns the key of a preprocessed source
+
+            :param source (str): preprocessed source, with all the imports expanded
+        """
+        digest = hashlib.sha256(cls.get_version_key().encode("utf-8"))
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def _get_path(cls, key):
+        cache_dir = cls.get_cache_dir()
+        if cache_dir is None:
+            return None
+        return os.path.join(cache_dir, key + ".pickle")
+
+    @classmethod
+    def get(cls, key):
+        """
+        Returns the cached AST, or None if it isn't in the cache
+
+            :param key (str): key of the preprocessed source
+        """
+        if key in cls._memory:
+            cls._memory.move_to_end(key)
+            return cls._memory[key]
+
+        path = cls._get_path(key)
+        if path is None or not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as fd:
+                ast_tree = pickle.load(fd)
+        except Exception:  # pylint: disable=broad-except
+            # Corrupted or incompatible entry
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        cls._add_to_memory(key, ast_tree)
+        return ast_tree
+
+    @classmethod
+    def put(cls, key, ast_tree):
+        """
+        Adds an AST to the cache. Failing to write it to disk isn't an error
+
+            :param key (str): key of the preprocessed source
+            :param ast_tree (ast_node.AST): AST built from the source
+        """
+        cls._add_to_memory(key, ast_tree)
+
+        path = cls._get_path(key)
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = pickle.dumps(ast_tree, protocol=pickle.HIGHEST_PROTOCOL)
+            # Written to a temporary file first, so that concurrent processes never read partial entries
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except (OSError, pickle.PicklingError, RecursionError, TypeError, AttributeError) as e:
+            print("OSC2ASTCache: The AST couldn't be cached: {}".format(e))
+
+    @classmethod
+    def _add_to_memory(cls, key, ast_tree):
+        cls._memory[key] = ast_tree
+        cls._memory.move_to_end(key)
+        while len(cls._memory) > cls.MEMORY_SIZE:
+            cls._memory.popitem(last=False)
+
+    @classmethod
+    def clear(cls):
+        """
+        Empties the in-memory cache
+        """
+        cls._memory.clear()
 
 
 class OSC2Helper(object):
@@ -32,28 +171,74 @@ class OSC2Helper(object):
             return cls.ast_tree
         else:
             # preprocessing
-            new_file, _ = Preprocess(osc2_file_name).import_process()
-            input_stream = FileStream(new_file, encoding="utf-8")
+            input_stream, _ = Preprocess(osc2_file_name).import_process()
 
-            osc_error_listeners = OscErrorListener(input_stream)
-            lexer = OSC2Lexer(input_stream)
-            lexer.removeErrorListeners()
-            lexer.addErrorListener(osc_error_listeners)
+            key = OSC2ASTCache.get_key(input_stream.strdata)
+            ast_tree = OSC2ASTCache.get(key)
+            if ast_tree is not None:
+                cls.ast_tree = ast_tree
+                return cls.ast_tree
+
+            # Also counts the reports collected by log_msg, which don't increase the ERROR_COUNT
+            report_count = log_manager.REPORT_COUNT
 
-            tokens = CommonTokenStream(lexer)
-            parser = OSC2Parser(tokens)
-            parser.removeErrorListeners()
-            parser.addErrorListener(osc_error_listeners)
-            parse_tree = parser.osc_file()
+            osc_error_listeners = OscErrorListener(input_stream)
+            tokens = cls.gen_token_stream(input_stream, osc_error_listeners)
+            parse_tree = cls.parse_osc2(tokens, osc_error_listeners)
 
             osc2_ast_builder = ASTBuilder()
             walker = ParseTreeWalker()
             walker.walk(osc2_ast_builder, parse_tree)
 
             cls.ast_tree = osc2_ast_builder.get_ast()
+            if osc_error_listeners.error_count == 0 and log_manager.REPORT_COUNT == report_count:
+                OSC2ASTCache.put(key, cls.ast_tree)
 
         return cls.ast_tree
 
+    @staticmethod
+    def gen_token_stream(input_stream, error_listener):
+        """
+        Returns the token stream of the lexer, reporting the errors to the listener.
+        The tokens are lexed lazily, when the parser consumes them.
+        """
+        lexer = OSC2Lexer(input_stream)
+        lexer.removeErrorListeners()
+        lexer.addErrorListener(error_listener)
+        return CommonTokenStream(lexer)
+
+    @staticmethod
+    def parse_osc2(tokens, error_listener, two_stage=True):
+        """
+        Parses the tokens, returning the parse tree.
+
+        With two stages, the faster SLL prediction is tried first, giving up at the first error,
+        and the full LL prediction is only used if it fails. Only the LL stage reports the syntax
+        errors to the listener, and the output of the grammar actions is discarded if the
+        SLL stage fails, so that the errors are reported once and as in a single LL parse.
+        """
+        parser = OSC2Parser(tokens)
+        parser.removeErrorListeners()
+
+        if two_stage:
+            parser._interp.predictionMode = PredictionMode.SLL  # pylint: disable=protected-access
+            parser._errHandler = BailErrorStrategy()  # pylint: disable=protected-access
+            output = io.StringIO()
+            try:
+                with redirect_stdout(output):
+                    parse_tree = parser.osc_file()
+                print(output.getvalue(), end="")
+                return parse_tree
+            except ParseCancellationException:
+                # The lexed tokens are kept, so the lexer errors aren't reported again
+                tokens.seek(0)
+                parser._errHandler = DefaultErrorStrategy()  # pylint: disable=protected-access
+                parser.reset()
+                parser._interp.predictionMode = PredictionMode.LL  # pylint: disable=protected-access
+
+        parser.addErrorListener(error_listener)
+        return parser.osc_file()
+
     @staticmethod
     def vector_angle(v1: List[int], v2: List[int]) -> int:
         """Calculate the angle between vectors v1 and v2.
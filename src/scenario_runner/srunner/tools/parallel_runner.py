@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides the parallel execution of scenario configurations over a pool of
+CARLA servers. Each server is owned by a worker process, with its own CarlaDataProvider
+and ScenarioManager, and the configurations are handed to the workers as they get free.
+"""
+
+from __future__ import print_function
+
+import copy
+import json
+import multiprocessing
+import os
+import traceback
+import xml.etree.ElementTree as ET
+from collections import deque, namedtuple
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+ServerEndpoint = namedtuple('ServerEndpoint', ['host', 'port', 'tm_port'])
+
+
+class ServerLostError(Exception):
+    """
+    Raised by the workers when their CARLA server stops answering
+    """
+
+
+def parse_servers(servers, default_tm_port=8000):
+    """
+    Parses a comma separated list of 'host:port[:tm_port]' endpoints. If not given,
+    the traffic manager ports are consecutive, starting at the default one.
+
+        :param servers (str): list of endpoints
+        :param default_tm_port (int): traffic manager port of the first endpoint
+    """
+    endpoints = []
+    for i, text in enumerate(entry.strip() for entry in servers.split(',') if entry.strip()):
+        parts = text.split(':')
+        if len(parts) not in (2, 3):
+            raise ValueError("Invalid server endpoint '{}', expected 'host:port[:tm_port]'".format(text))
+        tm_port = int(parts[2]) if len(parts) == 3 else int(default_tm_port) + i
+        endpoints.append(ServerEndpoint(parts[0], int(parts[1]), tm_port))
+    return endpoints
+
+
+def get_endpoint_args(args, endpoint):
+    """
+    Returns a copy of the command line arguments, pointing to the given endpoint
+
+        :param args (argparse.Namespace): command line arguments
+        :param endpoint (ServerEndpoint): server of the worker
+    """
+    args = copy.copy(args)
+    args.host = endpoint.host
+    args.port = str(endpoint.port)
+    args.trafficManagerPort = str(endpoint.tm_port)
+    args.servers = None
+    return args
+
+
+def _run_worker(worker_class, args, endpoint, job_queue, result_queue):
+    """
+    Runs the jobs of the queue on one server, until a None job is received or the server is lost.
+    The worker class is created with the arguments of the endpoint, and must provide
+    `run_job(job)`, returning whether or not it succeeded and its output files, and `destroy()`.
+    The worker reports when it is ready to receive jobs, and the result of each job.
+    """
+    worker = None
+    try:
+        worker = worker_class(get_endpoint_args(args, endpoint))
+        result_queue.put(('ready', None, endpoint, False, []))
+        while True:
+            job = job_queue.get()
+            if job is None:
+                break
+            try:
+                success, output_files = worker.run_job(job)
+                result_queue.put(('done', job, endpoint, bool(success), list(output_files)))
+            except ServerLostError:
+                result_queue.put(('lost', job, endpoint, False, []))
+                break
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+                result_queue.put(('done', job, endpoint, False, []))
+    except Exception:  # pylint: disable=broad-except
+        # The server couldn't even be reached
+        traceback.print_exc()
+        result_queue.put(('lost', None, endpoint, False, []))
+    finally:
+        if worker is not None:
+            try:
+                worker.destroy()
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+
+class ParallelRunner(object):
+
+    """
+    Shards jobs over a pool of servers, one worker process per server.
+    Each worker has its own job queue, and is only given a job once it has finished the previous one,
+    so the job of a worker is always known, even if the worker dies without reporting it.
+    Jobs whose server is lost are given to another worker, up to 'max_retries' times.
+    """
+
+    RESULT_TIMEOUT = 1.0  # Time between checks of the workers' liveness [s]
+
+    def __init__(self, worker_class, args, endpoints, max_retries=2):
+        """
+            :param worker_class (type): class run by each worker, see `_run_worker`
+            :param args (argparse.Namespace): command line arguments
+            :param endpoints (list of ServerEndpoint): servers of the pool
+            :param max_retries (int): times a job is retried after losing its server
+        """
+        self._worker_class = worker_class
+        self._args = args
+        self._endpoints = endpoints
+        self._max_retries = max_retries
+
+    def run(self, jobs):
+        """
+        Runs all the jobs, returning a list with, for each job, a dictionary
+        with its success, output files, server and number of attempts
+
+            :param jobs (list): picklable jobs, given to the workers' run_job
+        """
+        context = multiprocessing.get_context()
+        result_queue = context.Queue()
+
+        results = {job: {'job': job, 'success': False, 'output_files': [], 'server': None, 'attempts': 0}
+                   for job in jobs}
+        waiting = deque(jobs)
+        pending = len(jobs)
+
+        workers = {}
+        job_queues = {}
+        for endpoint in self._endpoints:
+            job_queues[endpoint] = context.Queue()
+            process = context.Process(
+                target=_run_worker,
+                args=(self._worker_class, self._args, endpoint, job_queues[endpoint], result_queue))
+            process.start()
+            workers[endpoint] = process
+
+        idle = []
+        running = {}  # endpoint - job being run
+        while pending > 0:
+            # Hand the waiting jobs to the idle workers
+            while waiting and idle:
+                endpoint = idle.pop(0)
+                job = waiting.popleft()
+                results[job]['attempts'] += 1
+                running[endpoint] = job
+                job_queues[endpoint].put(job)
+
+            try:
+                messages = [result_queue.get(timeout=self.RESULT_TIMEOUT)]
+            except queue.Empty:
+                # Workers that died without reporting lose their job
+                messages = []
+                for endpoint, process in workers.items():
+                    if not process.is_alive():
+                        if endpoint in idle:
+                            idle.remove(endpoint)
+                        if endpoint in running:
+                            messages.append(('lost', running[endpoint], endpoint, False, []))
+                if not messages and not any(process.is_alive() for process in workers.values()):
+                    print("ParallelRunner: All the servers have been lost, {} jobs weren't run".format(pending))
+                    break
+
+            for status, job, endpoint, success, output_files in messages:
+                if status == 'ready':
+                    idle.append(endpoint)
+                    continue
+                running.pop(endpoint, None)
+
+                server = "{}:{}".format(endpoint.host, endpoint.port)
+                if status == 'lost':
+                    print("ParallelRunner: Lost the server at {}".format(server))
+                    if job is None:
+                        continue
+                    if results[job]['attempts'] <= self._max_retries:
+                        waiting.append(job)
+                        continue
+                else:
+                    idle.append(endpoint)
+
+                results[job].update({'success': success, 'output_files': output_files, 'server': server})
+                pending -= 1
+
+        for endpoint in workers:
+            job_queues[endpoint].put(None)
+        for process in workers.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+        return [results[job] for job in jobs]
+
+
+def merge_json_results(filenames, filename):
+    """
+    Merges the JSON reports of several scenarios into a single one
+
+        :param filenames (list of str): JSON reports, as written by the ResultOutputProvider
+        :param filename (str): path of the merged report
+    """
+    scenarios = []
+    for name in filenames:
+        with open(name, 'r', encoding='utf-8') as fd:
+            scenarios.append(json.load(fd))
+
+    result_object = {
+        "success": all(scenario["success"] for scenario in scenarios),
+        "scenarios": scenarios
+    }
+    with open(filename, 'w', encoding='utf-8') as fd:
+        json.dump(result_object, fd, indent=4)
+
+
+def merge_junit_results(filenames, filename):
+    """
+    Merges the JUnit reports of several scenarios into a single one, with one test suite per scenario
+
+        :param filenames (list of str): JUnit reports, as written by the ResultOutputProvider
+        :param filename (str): path of the merged report
+    """
+    merged = ET.Element('testsuites', {'disabled': '0', 'errors': '0', 'name': 'Simulation', 'package': 'Scenarios'})
+    tests = failures = 0
+    total_time = 0.0
+    for name in filenames:
+        root = ET.parse(name).getroot()
+        tests += int(root.get('tests', 0))
+        failures += int(root.get('failures', 0))
+        total_time += float(root.get('time', 0))
+        if 'timestamp' not in merged.attrib and root.get('timestamp'):
+            merged.set('timestamp', root.get('timestamp'))
+        for suite in root.findall('testsuite'):
+            merged.append(suite)
+
+    merged.set('tests', str(tests))
+    merged.set('failures', str(failures))
+    merged.set('time', "%5.2f" % total_time)
+
+    with open(filename, 'wb') as fd:
+        ET.ElementTree(merged).write(fd, encoding='UTF-8', xml_declaration=True)
+
+
+def merge_results(results, output_prefix):
+    """
+    Merges the JSON and JUnit outputs of all the jobs. Returns the paths of the merged files
+
+        :param results (list of dict): results given by ParallelRunner.run
+        :param output_prefix (str): path of the merged files, without extension
+    """
+    output_files = [f for result in results for f in result['output_files'] if os.path.isfile(f)]
+    merged_files = []
+
+    json_files = [f for f in output_files if f.endswith('.json')]
+    if json_files:
+        merge_json_results(json_files, output_prefix + '.json')
+        merged_files.append(output_prefix + '.json')
+
+    junit_files = [f for f in output_files if f.endswith('.xml')]
+    if junit_files:
+        merge_junit_results(junit_files, output_prefix + '.xml')
+        merged_files.append(output_prefix + '.xml')
+
+    return merged_files
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+
+# This work is licensed under the terms of the MIT license.
+# For a copy, see <https://opensource.org/licenses/MIT>.
+
+"""
+This module provides the geometry of a route as NumPy arrays, built once per route and
+shared by all the behaviors and criteria that follow the ego's progress through it,
+together with the tracking of that progress, computed once per frame.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from srunner.scenariomanager.carla_data_provider import CarlaDataProvider
+from srunner.scenariomanager.timer import GameTime
+
+
+class RouteWaypoints(object):
+
+    """
+    Sequence of the waypoints of a route, only asking for them to the map when accessed
+    """
+
+    def __init__(self, geometry):
+        self._geometry = geometry
+
+    def __getitem__(self, index):
+        return self._geometry.get_waypoint(index)
+
+    def __len__(self):
+        return len(self._geometry)
+
+
+class RouteGeometry(object):
+
+    """
+    Positions, forward vectors, accumulated distances and road options of a route.
+    Use RouteGeometry.get(route) to share the same instance between all the users of a route.
+
+    The ego's progress is tracked with `advance_index`, which only checks a small window
+    of route points after the current one, so its cost doesn't depend on the route length.
+    """
+
+    MAX_SHARED_ROUTES = 4
+
+    _routes = OrderedDict()  # id(route) - (route, geometry)
+    _routes_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, route):
+        """
+        Returns the geometry of a route, shared by all the users of the same route list.
+
+            :param route (list): list of (carla.Transform, RoadOption) of the route
+        """
+        with cls._routes_lock:
+            entry = cls._routes.get(id(route), None)
+            if entry is not None and entry[0] is route:
+                cls._routes.move_to_end(id(route))
+                return entry[1]
+
+            geometry = RouteGeometry(route)
+            cls._routes[id(route)] = (route, geometry)  # Keep the route alive, so its id isn't reused
+            while len(cls._routes) > cls.MAX_SHARED_ROUTES:
+                cls._routes.popitem(last=False)
+        return geometry
+
+    @classmethod
+    def clear(cls):
+        """
+        Forgets all the shared geometries
+        """
+        with cls._routes_lock:
+            cls._routes.clear()
+
+    def __init__(self, route):
+        """
+            :param route (list): list of (carla.Transform, RoadOption) of the route
+        """
+        self.transforms = [transform for transform, _ in route]
+        self.road_options = [option for _, option in route]
+
+        self.positions = np.array(
+            [(t.location.x, t.location.y, t.location.z) for t in self.transforms], dtype=float).reshape(-1, 3)
+
+        pitch = np.radians([t.rotation.pitch for t in self.transforms])
+        yaw = np.radians([t.rotation.yaw for t in self.transforms])
+        self.forward_vectors = np.stack(
+            [np.cos(pitch) * np.cos(yaw), np.cos(pitch) * np.sin(yaw), np.sin(pitch)], axis=1).reshape(-1, 3)
+
+        steps = np.linalg.norm(np.diff(self.positions, axis=0), axis=1)
+        self.accum_dist = np.concatenate([[0.0], np.cumsum(steps)])
+
+        self.waypoints = RouteWaypoints(self)
+        self._waypoints = {}
+
+    @property
+    def length(self):
+        """
+        Returns the total length of the route, in meters
+        """
+        return float(self.accum_dist[-1]) if len(self.accum_dist) else 0.0
+
+    def get_percentage(self, index):
+        """
+        Returns the percentage of the route completed at a route point
+
+            :param index (int): index of the route point
+        """
+        if not self.length:
+            return 0.0
+        return float(self.accum_dist[index] / self.length * 100)
+
+    def get_waypoint(self, index):
+        """
+        Returns the map waypoint of a route point, asking the map for it the first time
+
+            :param index (int): index of the route point
+        """
+        if index < 0:
+            index += len(self)
+        if index not in self._waypoints:
+            if not 0 <= index < len(self):
+                raise IndexError("route index out of range")
+            self._waypoints[index] = CarlaDataProvider.get_waypoint(self.transforms[index].location)
+        return self._waypoints[index]
+
+    def advance_index(self, location, index, window):
+        """
+        Returns the furthest route point, among the current one and the next 'window' ones,
+        that the location has already passed. A point has been passed if the location is
+        in front of the plane defined by its position and forward vector.
+
+            :param location (carla.Location): location of the actor
+            :param index (int): current route index
+            :param window (int): amount of route points checked after the current one
+        """
+        end = min(index + window + 1, len(self))
+        offsets = np.array([location.x, location.y, location.z]) - self.positions[index:end]
+        passed = np.flatnonzero(np.einsum('ij,ij->i', offsets, self.forward_vectors[index:end]) > 0)
+        return index + int(passed[-1]) if len(passed) else index
+
+    def closest_index(self, location, index, window):
+        """
+        Returns the closest route point in 2D, among the current one and the next 'window' ones,
+        together with its distance. Ties are resolved in favor of the furthest point.
+
+            :param location (carla.Location): location of the actor
+            :param index (int): current route index
+            :param window (int): amount of route points checked after the current one
+        """
+        end = min(index + window + 1, len(self))
+        if end <= index:
+            return -1, float('inf')
+        distances = np.hypot(self.positions[index:end, 0] - location.x, self.positions[index:end, 1] - location.y)
+        closest = len(distances) - 1 - int(np.argmin(distances[::-1]))
+        return index + closest, float(distances[closest])
+
+    def __len__(self):
+        return len(self.transforms)
+
+
+class RouteProgress(object):
+
+    """
+    Progress of an actor through a route, shared by all the criteria that monitor it.
+    Use RouteProgress.get(actor, route) to subscribe to it and call `update` every tick,
+    the progress is only computed by the first call of each frame.
+
+    Each frame, it stores:
+    - location: location of the actor, None if unknown
+    - index: furthest route point passed by the actor, which never goes backwards
+    - closest_index, deviation: closest route point in 2D and its distance to the actor
+    - speed_totals: accumulated actor speed, mean background speed and number of samples,
+      only computed if some subscriber called `track_speeds`
+    """
+
+    PASSED_WINDOW = 3  # Amount of route points after the current one checked to be passed
+    CLOSEST_WINDOW = 5  # Amount of route points after the closest one checked to be the new closest
+
+    MAX_SHARED_PROGRESSES = 4
+
+    _progresses = OrderedDict()  # (actor id, id(route)) - (route, progress)
+    _progresses_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, actor, route):
+        """
+        Returns the progress of an actor through a route, shared by all its subscribers
+
+            :param actor (carla.Actor): actor following the route
+            :param route (list): list of (carla.Transform, RoadOption) of the route
+        """
+        key = (actor.id, id(route))
+        with cls._progresses_lock:
+            entry = cls._progresses.get(key, None)
+            if entry is not None and entry[0] is route:
+                cls._progresses.move_to_end(key)
+                return entry[1]
+
+            progress = RouteProgress(actor, route)
+            cls._progresses[key] = (route, progress)
+            while len(cls._progresses) > cls.MAX_SHARED_PROGRESSES:
+                cls._progresses.popitem(last=False)
+        return progress
+
+    @classmethod
+    def clear(cls):
+        """
+        Forgets all the shared progresses
+        """
+        with cls._progresses_lock:
+            cls._progresses.clear()
+
+    def __init__(self, actor, route):
+        """
+            :param actor (carla.Actor): actor following the route
+            :param route (list): list of (carla.Transform, RoadOption) of the route
+        """
+        self.actor = actor
+        self.geometry = RouteGeometry.get(route)
+
+        self.frame = None
+        self.location = None
+        self.index = 0
+        self.closest_index = 0
+        self.deviation = float('inf')
+
+        self._track_speeds = False
+        self.speed_totals = np.zeros(3)
+        self.previous_speed_totals = np.zeros(3)
+
+    @property
+    def distance(self):
+        """
+        Returns the distance along the route up to the current route point, in meters
+        """
+        return float(self.geometry.accum_dist[self.index])
+
+    @property
+    def percentage(self):
+        """
+        Returns the percentage of the route completed at the current route point
+        """
+        return self.geometry.get_percentage(self.index)
+
+    def track_speeds(self):
+        """
+        Starts accumulating the speed of the actor and of the background vehicles
+        """
+        self._track_speeds = True
+
+    def update(self):
+        """
+        Updates the progress, if it hasn't been done during this frame
+        """
+        frame = GameTime.get_frame()
+        if frame == self.frame:
+            return self
+        self.frame = frame
+
+        self.location = CarlaDataProvider.get_location(self.actor)
+        if self.location is None:
+            return self
+
+        self.index = self.geometry.advance_index(self.location, self.index, self.PASSED_WINDOW)
+
+        closest_index, deviation = self.geometry.closest_index(self.location, self.closest_index, self.CLOSEST_WINDOW)
+        if closest_index != -1:
+            self.closest_index = closest_index
+            self.deviation = deviation
+
+        self.previous_speed_totals = self.speed_totals
+        if self._track_speeds:
+            self._update_speeds()
+
+        return self
+
+    def _update_speeds(self):
+        """
+        Adds the speed of the actor, and the mean one of the background vehicles, to the totals
+        """
+        speed = CarlaDataProvider.get_velocity(self.actor)
+        if speed is None:
+            return
+
+        all_vehicles = CarlaDataProvider.get_all_actors().filter('vehicle*')
+        background_vehicles = [v for v in all_vehicles if v.attributes['role_name'] == 'background']
+        if not background_vehicles:
+            return
+
+        mean_speed = np.mean([CarlaDataProvider.get_velocity(v) for v in background_vehicles])
+        self.speed_totals = self.speed_totals + (speed, mean_speed, 1)
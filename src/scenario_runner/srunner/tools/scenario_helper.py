@@ -29,13 +29,12 @@ def get_distance_along_route(route, target_location):
     Note: If the location is not along the route, the route length will be returned
     """
 
-    wmap = CarlaDataProvider.get_map()
     covered_distance = 0
     prev_position = None
     found = False
 
     # Don't use the input location, use the corresponding wp as location
-    target_location_from_wp = wmap.get_waypoint(target_location).transform.location
+    target_location_from_wp = CarlaDataProvider.get_waypoint(target_location).transform.location
 
     for position, _ in route:
 
@@ -57,7 +56,7 @@ def get_distance_along_route(route, target_location):
         if distance_squared < 400 and not distance_squared < interval_length_squared:
             # Check if a neighbor lane is closer to the route
             # Do this only in a close distance to correct route interval, otherwise the computation load is too high
-            starting_wp = wmap.get_waypoint(location)
+            starting_wp = CarlaDataProvider.get_waypoint(location)
             wp = starting_wp.get_left_lane()
             while wp is not None:
                 new_location = wp.transform.location
@@ -98,9 +97,9 @@ def get_distance_along_route(route, target_location):
             # An alternative is to compare orientations, however, this also does not work for
             # long route intervals
 
-            curr_wp = wmap.get_waypoint(position)
-            prev_wp = wmap.get_waypoint(prev_position)
-            wp = wmap.get_waypoint(location)
+            curr_wp = CarlaDataProvider.get_waypoint(position)
+            prev_wp = CarlaDataProvider.get_waypoint(prev_position)
+            wp = CarlaDataProvider.get_waypoint(location)
 
             if prev_wp and curr_wp and wp:
                 if wp.road_id in (prev_wp.road_id, curr_wp.road_id):
@@ -18,7 +18,21 @@ except IndexError:
     pass
 
 import carla
+import math
 import random
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EARTH_RADIUS_EQUA = 6378137.0
 
 
 def get_scene_layout(carla_map):
@@ -39,17 +53,7 @@ def get_scene_layout(carla_map):
     map_dict = dict()
     precision = 0.05
     for waypoint in topology:
-        waypoints = [waypoint]
-        nxt = waypoint.next(precision)
-        if len(nxt) > 0:
-            nxt = nxt[0]
-            while nxt.road_id == waypoint.road_id:
-                waypoints.append(nxt)
-                nxt = nxt.next(precision)
-                if len(nxt) > 0:
-                    nxt = nxt[0]
-                else:
-                    break
+        waypoints = _sample_lane(waypoint, precision)
 
         left_marking = [_lateral_shift(w.transform, -w.lane_width * 0.5) for w in waypoints]
         right_marking = [_lateral_shift(w.transform, w.lane_width * 0.5) for w in waypoints]
@@ -118,6 +122,265 @@ def get_scene_layout(carla_map):
     return waypoints_graph
 
 
+def _sample_lane(waypoint, precision):
+    """
+    Returns the waypoints of a lane every 'precision' meters, until the road changes
+    """
+    waypoints = [waypoint]
+    nxt = waypoint.next(precision)
+    if len(nxt) > 0:
+        nxt = nxt[0]
+        while nxt.road_id == waypoint.road_id:
+            waypoints.append(nxt)
+            nxt = nxt.next(precision)
+            if len(nxt) > 0:
+                nxt = nxt[0]
+            else:
+                break
+    return waypoints
+
+
+def _get_layout_lanes(carla_map):
+    """
+    Returns the first waypoint of each lane, as a dictionary of roads containing a dictionary of lanes.
+    Lanes repeated in the topology and the order of roads and lanes are the ones of get_scene_layout
+    """
+    topology = [x[0] for x in carla_map.get_topology()]
+    topology = sorted(topology, key=lambda w: w.transform.location.z)
+
+    lanes = dict()
+    for waypoint in topology:
+        if lanes.get(waypoint.road_id) is None:
+            lanes[waypoint.road_id] = {}
+        lanes[waypoint.road_id][waypoint.lane_id] = waypoint
+    return lanes
+
+
+def get_geo_reference(carla_map):
+    """
+    Returns the (latitude, longitude, altitude) of the map origin
+    """
+    reference = carla_map.transform_to_geolocation(carla.Location(0, 0, 0))
+    return reference.latitude, reference.longitude, reference.altitude
+
+
+def locations_to_geolocations(locations, geo_reference):
+    """
+    Vectorized version of carla.Map.transform_to_geolocation, using the same Mercator projection.
+
+    :param locations: array of (x, y, z) locations with shape (N, 3)
+    :param geo_reference: (latitude, longitude, altitude) of the map origin, see get_geo_reference
+    :return: array of (latitude, longitude, altitude) with shape (N, 3)
+    """
+    locations = np.asarray(locations, dtype=float).reshape(-1, 3)
+    lat_ref, lon_ref, alt_ref = geo_reference
+
+    scale = math.cos(math.radians(lat_ref))
+    mx = scale * math.radians(lon_ref) * EARTH_RADIUS_EQUA + locations[:, 0]
+    my = scale * EARTH_RADIUS_EQUA * math.log(math.tan(math.radians(90.0 + lat_ref) / 2.0)) - locations[:, 1]
+
+    lon = np.degrees(mx / (EARTH_RADIUS_EQUA * scale))
+    lat = 360.0 * np.arctan(np.exp(my / (EARTH_RADIUS_EQUA * scale))) / math.pi - 90.0
+    return np.stack([lat, lon, alt_ref + locations[:, 2]], axis=1)
+
+
+def _get_lane_arrays(waypoints, geo_reference):
+    """
+    Returns the waypoint ids, positions, orientations and margin positions of the waypoints of a lane
+    """
+    ids = np.array([w.id for w in waypoints], dtype=np.uint64)
+    transforms = [w.transform for w in waypoints]
+    locations = np.array([[t.location.x, t.location.y, t.location.z] for t in transforms])
+    orientations = np.array([[t.rotation.roll, t.rotation.pitch, t.rotation.yaw] for t in transforms])
+    widths = np.array([w.lane_width for w in waypoints])
+
+    # Same lateral shift as get_scene_layout, along the forward vector of the yaw rotated 90 degrees
+    pitch = np.radians(orientations[:, 1])
+    yaw = np.radians(orientations[:, 2] + 90)
+    lateral = np.stack([np.cos(pitch) * np.cos(yaw), np.cos(pitch) * np.sin(yaw), np.sin(pitch)], axis=1)
+    left_margins = locations - 0.5 * widths[:, np.newaxis] * lateral
+    right_margins = locations + 0.5 * widths[:, np.newaxis] * lateral
+
+    return {
+        "waypoint_ids": ids,
+        "positions": locations_to_geolocations(locations, geo_reference),
+        "orientations": orientations,
+        "left_margin_positions": locations_to_geolocations(left_margins, geo_reference),
+        "right_margin_positions": locations_to_geolocations(right_margins, geo_reference)
+    }
+
+
+def _get_neighbour_indices(lane_keys, lane_offsets, side):
+    """
+    Returns, for each waypoint, the index of the waypoint at the same position in the
+    left (side=-1) or right (side=1) lane, or -1, following the rules of get_scene_layout
+    """
+    lane_index = {key: i for i, key in enumerate(lane_keys)}
+    indices = np.full(lane_offsets[-1], -1, dtype=np.int64)
+    for i, (road_id, lane_id) in enumerate(lane_keys):
+        neighbour_id = lane_id + side if lane_id + side != 0 else lane_id + 2 * side
+        neighbour = lane_index.get((road_id, neighbour_id), None)
+        if neighbour is None:
+            continue
+        start, end = lane_offsets[i], lane_offsets[i + 1]
+        neighbour_start, neighbour_end = lane_offsets[neighbour], lane_offsets[neighbour + 1]
+        amount = min(end - start, neighbour_end - neighbour_start)
+        indices[start:start + amount] = np.arange(neighbour_start, neighbour_start + amount)
+    return indices
+
+
+def get_compact_scene_layout(carla_map, precision=0.05):
+    """
+    Compact version of get_scene_layout, with the waypoints stored as NumPy arrays ordered by lane.
+    Instead of the list of all the later waypoints of the lane, each waypoint stores its successor
+    as CSR offsets: the successors of the waypoint i are next_indices[next_offsets[i]:next_offsets[i+1]],
+    and the rest of the lane can be found through lane_offsets.
+
+    :return: a dictionary of arrays describing the scene.
+    """
+    geo_reference = get_geo_reference(carla_map)
+
+    lane_keys = []
+    lane_offsets = [0]
+    columns = {}
+    for road_id, lanes in _get_layout_lanes(carla_map).items():
+        for lane_id, waypoint in lanes.items():
+            arrays = _get_lane_arrays(_sample_lane(waypoint, precision), geo_reference)
+            for name, array in arrays.items():
+                columns.setdefault(name, []).append(array)
+            lane_keys.append((road_id, lane_id))
+            lane_offsets.append(lane_offsets[-1] + len(arrays["waypoint_ids"]))
+
+    layout = {name: np.concatenate(arrays) for name, arrays in columns.items()}
+    layout.update(_get_lane_structure(lane_keys, lane_offsets))
+    return layout
+
+
+def _get_lane_structure(lane_keys, lane_offsets):
+    """
+    Returns the arrays with the lanes, successors and neighbours of the compact scene layout
+    """
+    lane_offsets = np.array(lane_offsets, dtype=np.int64)
+    lane_keys_array = np.array(lane_keys, dtype=np.int64).reshape(-1, 2)
+    lane_sizes = np.diff(lane_offsets)
+    amount = int(lane_offsets[-1])
+
+    # Every waypoint but the last one of its lane has the next waypoint as successor
+    is_last = np.zeros(amount, dtype=bool)
+    is_last[lane_offsets[1:][lane_sizes > 0] - 1] = True
+    next_offsets = np.concatenate([[0], np.cumsum(~is_last)]).astype(np.int64)
+    next_indices = np.flatnonzero(~is_last) + 1
+
+    return {
+        "lane_keys": lane_keys_array,
+        "lane_offsets": lane_offsets,
+        "road_ids": np.repeat(lane_keys_array[:, 0], lane_sizes),
+        "lane_ids": np.repeat(lane_keys_array[:, 1], lane_sizes),
+        "next_offsets": next_offsets,
+        "next_indices": next_indices.astype(np.int64),
+        "left_lane_indices": _get_neighbour_indices(lane_keys, lane_offsets, -1),
+        "right_lane_indices": _get_neighbour_indices(lane_keys, lane_offsets, 1)
+    }
+
+
+def write_scene_layout(carla_map, path, precision=0.05):
+    """
+    Writes the compact scene layout to a .npz or .parquet file, lane by lane, so that only
+    one lane is kept in memory at a time. The npz file has the same arrays as get_compact_scene_layout.
+    The parquet file has one row per waypoint, ordered by lane, with the road, lane, index in the lane,
+    waypoint id, position, orientation and margins. It requires pyarrow.
+
+    :param carla_map: carla.Map to be described
+    :param path: output file, its extension selects the format
+    :param precision: distance between the waypoints of a lane
+    """
+    if path.endswith('.parquet'):
+        _write_parquet_layout(carla_map, path, precision)
+    else:
+        _write_npz_layout(carla_map, path, precision)
+
+
+def _iter_layout_lanes(carla_map, precision):
+    """
+    Yields the road id, lane id and arrays of each lane of the compact scene layout
+    """
+    geo_reference = get_geo_reference(carla_map)
+    for road_id, lanes in _get_layout_lanes(carla_map).items():
+        for lane_id, waypoint in lanes.items():
+            yield road_id, lane_id, _get_lane_arrays(_sample_lane(waypoint, precision), geo_reference)
+
+
+def _write_npz_layout(carla_map, path, precision):
+    """
+    Streams each array to a temporary file, and packs them in the npz file at the end
+    """
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        lane_keys = []
+        lane_offsets = [0]
+        files = {}
+        dtypes = {}
+        for road_id, lane_id, arrays in _iter_layout_lanes(carla_map, precision):
+            for name, array in arrays.items():
+                if name not in files:
+                    files[name] = open(os.path.join(tmp_dir, name), 'wb')
+                    dtypes[name] = array.dtype
+                array.tofile(files[name])
+            lane_keys.append((road_id, lane_id))
+            lane_offsets.append(lane_offsets[-1] + len(arrays["waypoint_ids"]))
+        for tmp_file in files.values():
+            tmp_file.close()
+
+        amount = lane_offsets[-1]
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for name, dtype in dtypes.items():
+                shape = (amount,) if name == "waypoint_ids" else (amount, 3)
+                with archive.open(name + '.npy', 'w', force_zip64=True) as entry:
+                    np.lib.format.write_array_header_2_0(
+                        entry, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape})
+                    with open(os.path.join(tmp_dir, name), 'rb') as tmp_file:
+                        shutil.copyfileobj(tmp_file, entry)
+
+            for name, array in _get_lane_structure(lane_keys, lane_offsets).items():
+                with archive.open(name + '.npy', 'w', force_zip64=True) as entry:
+                    np.lib.format.write_array(entry, np.ascontiguousarray(array))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def _write_parquet_layout(carla_map, path, precision):
+    """
+    Writes each lane as a row group of the parquet file
+    """
+    if pyarrow is None:
+        raise RuntimeError("cannot import pyarrow, make sure pyarrow package is installed")
+
+    writer = None
+    try:
+        for road_id, lane_id, arrays in _iter_layout_lanes(carla_map, precision):
+            amount = len(arrays["waypoint_ids"])
+            columns = {
+                "road_id": np.full(amount, road_id, dtype=np.int64),
+                "lane_id": np.full(amount, lane_id, dtype=np.int64),
+                "index_in_lane": np.arange(amount, dtype=np.int64),
+                "waypoint_id": arrays["waypoint_ids"]
+            }
+            for name, prefix in (("positions", "position"), ("left_margin_positions", "left_margin"),
+                                 ("right_margin_positions", "right_margin")):
+                for i, axis in enumerate(("latitude", "longitude", "altitude")):
+                    columns["{}_{}".format(prefix, axis)] = arrays[name][:, i]
+            for i, axis in enumerate(("roll", "pitch", "yaw")):
+                columns["orientation_{}".format(axis)] = arrays["orientations"][:, i]
+
+            table = pyarrow.table(columns)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
 def get_dynamic_objects(carla_world, carla_map):
     # Private helper functions
     def _get_bounding_box(actor):